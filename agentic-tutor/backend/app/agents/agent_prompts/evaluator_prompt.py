@@ -48,6 +48,7 @@ STRICT RULES:
 - NO stray dicts like {"3":1,"7":1}.
 - NO missing keys ("type" is mandatory).
 - expected_solution MUST NOT contain multiple expressions glued together.
+- If "avoid_prompts" is given, every question MUST differ from those prompts.
 - For eigenvalues: use format EXACTLY:
     "eigenvals(): {3:1, 1:1}"
 - For eigenvectors:
@@ -77,6 +78,19 @@ When grading answers:
   "misconceptions": ["...", "..."]
 }
 
+For task "grade_single_question" return ONLY:
+
+{ "score": <number>, "feedback": "<1-2 sentences>", "confidence": <0-1, how sure you are of the score> }
+
+For task "grade_answers_batch" (one question, several student answers),
+grade each answer independently with the same rules and return ONLY:
+
+{
+  "grades": [
+    { "id": <id from student_answers>, "score": <number>, "feedback": "<1-2 sentences>", "confidence": <0-1> }
+  ]
+}
+
 ABSOLUTE RULES:
 - NEVER output chain of thought.
 - NEVER output any text outside JSON.
@@ -1,45 +1,137 @@
 # backend/app/agents/evaluator_agent.py
+import asyncio
 import json
+import logging
+import os
 import re
+import time
 from uuid import uuid4
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional
 from pathlib import Path
 
 from backend.app.agents.base_agent import BaseAgent
 from backend.app.core.llm_client import LLMClient
+from backend.app.core.semantic_cache import SemanticCache, normalize_topic
+from backend.app.core.grading_memo import GradingMemo, normalize_answer
+from backend.app.core.grading_cascade import (
+    CASCADE_LARGE_MODEL, cascade_stats, embedding_tier, exact_tier, llm_verdict, resolved, symbolic_verdict,
+)
 from backend.app.core.tools.tavily_search import tavily_search
+from backend.app.core.rag.context_assembler import assemble_context, budget_for
+from backend.app.utils.rate_limiter import limiter
 from backend.app.core.tools.sympy_tool import SymPyVerifier  # ← Your SymPy tool
+from backend.app.core.tools.sympy_sandbox import SymPySandbox
+from backend.app.core.tools.answer_compare import answer_mode, question_hash
+from backend.app.core.tools.question_templates import generate_procedural
 from backend.app.agents.agent_prompts.evaluator_prompt import evaluator_prompt
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Questions graded at once; LLM fallbacks are additionally spaced by the global rate limiter
+GRADING_CONCURRENCY = int(os.getenv("GRADING_CONCURRENCY", "4"))
+# Batch grading: distinct answers in flight at once (symbolic checks beyond the pool size just queue)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "32"))
+# LLM fallbacks for one question are sent together, up to this many answers per prompt,
+# after waiting at most this long for more to arrive
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "16"))
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "50"))
+# Seconds one question type's generation may take before the quiz goes out without it
+GENERATION_TYPE_TIMEOUT = float(os.getenv("GENERATION_TYPE_TIMEOUT", "45"))
+
 
 def _safe_merge_context(rag_context: str, tavily_snippets: List[Dict[str, Any]]) -> str:
-    parts = []
+    """RAG context first, then de-duplicated web snippets, within the evaluator's token budget."""
+    passages = []
     if rag_context:
-        parts.append(rag_context.strip())
+        passages.append({"text": rag_context.strip(), "source": "rag"})
 
     for s in tavily_snippets:
         snip = s.get("snippet", "")
         snip = re.sub(r"https?://\S+", "", snip)
         snip = re.sub(r"\s+", " ", snip).strip()
         if snip:
-            parts.append(snip)
-    return "\n\n".join(parts)
+            passages.append({"text": snip, "source": "tavily"})
+    context, _ = assemble_context(passages, budget_for("evaluator"))
+    return context
+
+
+SCALAR = "scalar"
+
+
+def symbolic_mode(q: Dict[str, Any]) -> Optional[str]:
+    """SCALAR or a matrix comparison mode for symbolically gradable questions, None otherwise."""
+    expected = q.get("expected_solution", "")
+    if q.get("type", "conceptual") not in ("procedural", "application") or not expected or "?" in expected:
+        return None
+    # Detect if it's a matrix / eigen answer or a scalar expression
+    is_matrix = ("[[" in expected) or ("matrix" in expected.lower())
+    mode = answer_mode(q, expected)
+    return mode if is_matrix or mode != "elementwise" else SCALAR
+
+
+class _LLMBatcher:
+    """
+    Collects the LLM fallback gradings of one batch run and sends the answers
+    to each question as one prompt: a batch goes out when it is full or
+    LLM_BATCH_WINDOW_MS after its first answer arrived.
+    """
+
+    def __init__(self, agent: "EvaluatorAgent"):
+        self.agent = agent
+        self._pending: Dict[str, list] = {}  # qid -> [(question, answer, future)]
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._sending = set()  # keeps flush tasks referenced until done
+        self.prompts = 0
+
+    async def grade(self, q: Dict[str, Any], student_answer: str) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        qid = q["qid"]
+        self._pending.setdefault(qid, []).append((q, student_answer, future))
+        if len(self._pending[qid]) >= LLM_BATCH_SIZE:
+            self._flush(qid)
+        elif qid not in self._timers:
+            self._timers[qid] = loop.call_later(LLM_BATCH_WINDOW_MS / 1000, self._flush, qid)
+        return await future
+
+    def _flush(self, qid: str):
+        timer = self._timers.pop(qid, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(qid, [])
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: list):
+        self.prompts += 1
+        try:
+            grades = await self.agent._llm_grade_many(batch[0][0], [answer for _, answer, _ in batch])
+        except Exception as e:
+            grades = [{"error": str(e)}] * len(batch)
+        for (_, _, future), grade in zip(batch, grades):
+            if not future.done():
+                future.set_result(grade)
 
 
 class EvaluatorAgent(BaseAgent):
     def __init__(self, name: str = "evaluator", model: str = "llama-3.1-8b-instant"):
         super().__init__(name)
         self.llm = LLMClient(model=model)
+        self.llm_large = LLMClient(model=CASCADE_LARGE_MODEL)  # last grading tier only
         self.sympy = SymPyVerifier()  # ← Instance for symbolic checks
+        self.sandbox = SymPySandbox()  # untrusted answers are verified in worker processes
+        self.memo = GradingMemo()
 
         self.template = evaluator_prompt
 
-    async def _call_llm_for_generation(self, user_payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def _call_llm_for_generation(self, user_payload: Dict[str, Any], llm: Optional[LLMClient] = None) -> Dict[str, Any]:
         user_prompt = json.dumps(user_payload, ensure_ascii=False)
-        raw = await self.llm.chat(system_prompt=self.template, user_prompt=user_prompt)
+        raw = await (llm or self.llm).chat(system_prompt=self.template, user_prompt=user_prompt)
         try:
             return json.loads(raw)
         except Exception:
@@ -51,8 +143,33 @@ class EvaluatorAgent(BaseAgent):
                     return {"error": "llm_parse_error", "raw": raw}
             return {"error": "llm_parse_error", "raw": raw}
 
-    async def generate_questions(self, topic: str, q_types: List[str], counts: Dict[str, int], rag_context: str = "") -> Dict[str, Any]:
-        need_web = any(qt in ("application", "open-ended") for qt in q_types)
+    async def generate_questions(self, topic: str, q_types: List[str], counts: Dict[str, int], rag_context: str = "",
+                                 avoid_prompts: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        One LLM generation per question type, run concurrently and merged in
+        `q_types` order with qids Q1..Qn. A type whose call fails, times out
+        or returns nothing usable is listed in "failed_types" and the rest of
+        the quiz still goes out. `avoid_prompts` (bank refills, short quizzes) asks
+        for new questions and bypasses the semantic cache.
+        """
+        # Same question mix for a near-identical topic -> reuse the generated set
+        cache = SemanticCache()
+        cache_request = normalize_topic(topic)
+        cache_key = json.dumps({"q_types": q_types, "counts": counts}, sort_keys=True)
+        if cache.enabled("generate_questions") and avoid_prompts is None:
+            cached = await asyncio.to_thread(cache.lookup, "generate_questions", cache_request, cache_key)
+            if cached is not None:
+                return cached
+
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        # Procedural items for curriculum topics come from templates (computed answers, no LLM call)
+        if "procedural" in q_types:
+            templated = await asyncio.to_thread(generate_procedural, topic, counts.get("procedural", 0))
+            if templated:
+                by_type["procedural"] = templated
+        llm_types = [t for t in q_types if t not in by_type and counts.get(t, 0) > 0]
+
+        need_web = any(qt in ("application", "open-ended") for qt in llm_types)
         tavily_snips = []
 
         if need_web and not rag_context:
@@ -63,132 +180,215 @@ class EvaluatorAgent(BaseAgent):
 
         merged_context = _safe_merge_context(rag_context, tavily_snips)
 
+        # Largest type first: it uses the caller's limiter slot, the others queue for their own
+        order = sorted(llm_types, key=lambda t: -counts[t])
+        generated = await asyncio.gather(*(
+            self._generate_type(topic, t, counts[t], merged_context, avoid_prompts, extra_slot=i > 0)
+            for i, t in enumerate(order)
+        ))
+        by_type.update((t, qs) for t, qs in zip(order, generated) if qs)
+
+        questions = []
+        for t in q_types:
+            questions.extend(by_type.get(t, []))
+        for n, q in enumerate(questions, 1):
+            q["qid"] = f"Q{n}"
+        result: Dict[str, Any] = {"questions": questions}
+        failed = [t for t in llm_types if t not in by_type]
+        if failed:
+            result["failed_types"] = failed
+            if not questions:
+                result["error"] = "generation_failed"
+        if questions:
+            await self._precompile_expected(questions)
+        if cache.enabled("generate_questions") and avoid_prompts is None and not failed and questions:
+            await asyncio.to_thread(cache.store, "generate_questions", cache_request, result, cache_key)
+        return result
+
+    async def _generate_type(self, topic: str, q_type: str, count: int, context: str,
+                             avoid_prompts: Optional[List[str]], extra_slot: bool) -> List[Dict[str, Any]]:
+        """Questions of one type; malformed items are dropped, and a failed call yields []."""
         payload = {
             "task": "generate_questions",
             "topic": topic,
-            "q_types": q_types,
-            "counts": counts,
-            "embedded_context": merged_context,
+            "q_types": [q_type],
+            "counts": {q_type: count},
+            "embedded_context": context,
             "require_symbolic_solutions": True  # ← Critical for SymPy
         }
-        return await self._call_llm_for_generation(payload)
+        if avoid_prompts:
+            payload["avoid_prompts"] = avoid_prompts
+        try:
+            if extra_slot:
+                await limiter.wait()
+            result = await asyncio.wait_for(self._call_llm_for_generation(payload), GENERATION_TYPE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Question generation for '{topic}' ({q_type}) timed out after {GENERATION_TYPE_TIMEOUT}s")
+            return []
+        except Exception as e:
+            logger.warning(f"Question generation for '{topic}' ({q_type}) failed: {e}")
+            return []
+        items = result.get("questions") if isinstance(result.get("questions"), list) else []
+        questions = [q for q in items if isinstance(q, dict) and q.get("prompt")][:count]
+        for q in questions:
+            q["type"] = q_type
+        return questions
+
+    async def _precompile_expected(self, questions: List[Dict[str, Any]]):
+        """
+        Compile every expected solution once, now, instead of once per student
+        at grading time; questions whose expected answer doesn't parse are
+        flagged so grading skips straight to the LLM.
+        """
+        async def check(q):
+            q["content_hash"] = question_hash(q)
+            mode = symbolic_mode(q)
+            if mode is None:
+                return
+            args = () if mode == SCALAR else (mode,)
+            status = await self.sandbox.verify("check_expected", q["expected_solution"], *args)
+            q["symbolic_gradable"] = bool(status.get("ok"))
+            if not q["symbolic_gradable"]:
+                q["expected_parse_error"] = status.get("error") or status.get("feedback")
+
+        await asyncio.gather(*(check(q) for q in questions if isinstance(q, dict)))
 
     async def grade_answers(self, eval_record: Dict[str, Any], student_answers: List[Dict[str, Any]]) -> Dict[str, Any]:
-
+        """
+        Grade every question concurrently (at most GRADING_CONCURRENCY at a time)
+        and merge the results in question order, so output is deterministic.
+        """
         questions = eval_record.get("questions", [])
         student_map = {a["qid"]: a["answer"] for a in student_answers}
 
+        semaphore = asyncio.Semaphore(GRADING_CONCURRENCY)
+
+        async def bounded(q):
+            async with semaphore:
+                return await self._grade_question(q, student_map.get(q["qid"], "").strip())
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(bounded(q) for q in questions))
+        grading_result = self._summarize(questions, results)
+        grading_result["timings"]["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return grading_result
+
+    async def grade_batch(self, eval_record: Dict[str, Any],
+                          submissions: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Grade a whole class against one question set. Yields each student's
+        result (grade_answers format plus "student_id") as soon as all of
+        their answers are graded, then one {"summary": ...} item.
+
+        Answers that normalize the same are graded once per question, the
+        symbolic checks share the sandbox pool, and the LLM fallbacks for a
+        question go out as one prompt per LLM_BATCH_SIZE answers.
+        """
+        started = time.perf_counter()
+        questions = [q for q in eval_record.get("questions", []) if isinstance(q, dict)]
+        if any("content_hash" not in q for q in questions):
+            await self._precompile_expected(questions)
+        by_qid = {q["qid"]: q for q in questions}
+
+        unique = {}  # (qid, normalized answer) -> first spelling seen
+        students = []  # (student_id, {qid: answer}, {qid: key})
+        for sub in submissions:
+            answers = {a["qid"]: (a.get("answer") or "").strip() for a in sub.get("answers", [])}
+            keys = {}
+            for q in questions:
+                text = answers.get(q["qid"], "")
+                keys[q["qid"]] = (q["qid"], normalize_answer(text))
+                unique.setdefault(keys[q["qid"]], text)
+            students.append((sub.get("student_id"), answers, keys))
+
+        waiting = {}  # key -> indices of students who gave that answer
+        remaining = []
+        for i, (_, _, keys) in enumerate(students):
+            remaining.append(len(set(keys.values())))
+            for key in set(keys.values()):
+                waiting.setdefault(key, []).append(i)
+
+        def student_result(i: int) -> Dict[str, Any]:
+            student_id, answers, keys = students[i]
+            results = [{**graded[keys[q["qid"]]], "student": answers.get(q["qid"], "")} for q in questions]
+            return {"student_id": student_id, **self._summarize(questions, results)}
+
+        for i, count in enumerate(remaining):
+            if count == 0:  # empty question set
+                yield student_result(i)
+
+        batcher = _LLMBatcher(self)
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        graded = {}
+
+        async def grade_unique(key):
+            async with semaphore:
+                return key, await self._grade_question(by_qid[key[0]], unique[key], llm_grade=batcher.grade)
+
+        tasks = [asyncio.create_task(grade_unique(key)) for key in unique]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                key, result = await next_done
+                graded[key] = result
+                for i in waiting[key]:
+                    remaining[i] -= 1
+                    if remaining[i] == 0:
+                        yield student_result(i)
+        finally:
+            for task in tasks:
+                task.cancel()  # client went away mid-stream
+
+        yield {
+            "summary": {
+                "students": len(students),
+                "questions": len(questions),
+                "answers": len(students) * len(questions),
+                "unique_answers": len(unique),
+                "llm_prompts": batcher.prompts,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+        }
+
+    def _summarize(self, questions: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Per-question results (in question order) -> grade_answers output."""
         grading_result = {
             "grading": {},
             "overall_score": 0.0,
             "misconceptions": [],
-            "symbolic_checks": {}
+            "symbolic_checks": {},
+            "timings": {}
         }
 
         total_obtained = 0.0
         total_possible = 0.0
-
-        for q in questions:
+        for q, r in zip(questions, results):
             qid = q["qid"]
-            qtype = q.get("type", "conceptual")
-            expected = q.get("expected_solution", "")
-            rubric = q.get("rubric", {"full_marks": 10})
-            student_answer = student_map.get(qid, "").strip()
-
-            marks = 0.0
-            feedback = ""
-            sympy_used = False
-            sympy_correct = False
-
-            # ===============================
-            # 1. SYMBOLIC GRADING (If relevant)
-            # ===============================
-            sympy_should_run = (
-                qtype in ("procedural", "application") 
-                and expected 
-                and "?" not in expected
-                and "??" not in expected
-            )
-
-            if sympy_should_run:
-                try:
-                    sympy_used = True
-
-                    # Detect if it's a matrix or scalar expression
-                    is_matrix = ("[[" in expected) or ("matrix" in expected.lower())
-
-                    if is_matrix:
-                        result = self.sympy.verify_matrix(student_answer, expected)
-                    else:
-                        result = self.sympy.verify_equality(student_answer, expected)
-
-                    sympy_correct = result.get("correct", False)
-                    parse_success = result.get("parse_success", True)
-                    sympy_feedback = result.get("feedback", "")
-                    feedback += f" [SymPy] {sympy_feedback}"
-
-                    # Only award marks if SymPy parsing succeeded
-                    if parse_success:
-                        if sympy_correct:
-                            marks = rubric.get("full_marks", 10)
-                        else:
-                            # Partial credit for correct format but wrong solution
-                            marks = 0 
-                    else:
-                        marks = 0  # force LLM fallback
-
-                except Exception as e:
-                    # SymPy crashed OR input is not parsible
-                    sympy_used = True
-                    sympy_correct = False
-                    marks = 0  # force LLM grading
-                    feedback += f" [SymPy Error: fallback to LLM]"
-
-            # ===============================
-            # 2. LLM FALLBACK GRADING
-            #    Triggered only when marks == 0
-            # ===============================
-            if marks == 0:
-                payload = {
-                    "task": "grade_single_question",
-                    "question": q,
-                    "student_answer": student_answer
-                }
-                llm_grade = await self._call_llm_for_generation(payload)
-
-                marks = llm_grade.get("score", 0)
-                llm_feedback = llm_grade.get("feedback", "No feedback provided.")
-
-                if not sympy_used:
-                    llm_feedback = "[LLM Graded] " + llm_feedback
-
-                feedback = llm_feedback
-
-            # ===============================
-            # 3. Store scores & bookkeeping
-            # ===============================
-            max_marks = rubric.get("full_marks", 10)
+            marks, max_marks = r["marks"], r["max_marks"]
             total_obtained += marks
             total_possible += max_marks
 
             grading_result["grading"][qid] = {
                 "obtained": round(marks, 2),
                 "possible": max_marks,
-                "feedback": feedback.strip(),
-                "sympy_used": sympy_used,
-                "sympy_correct": sympy_correct
+                "feedback": r["feedback"].strip(),
+                "sympy_used": r["sympy_used"],
+                "sympy_correct": r["sympy_correct"],
+                "tier": r.get("tier")
             }
 
             grading_result["symbolic_checks"][qid] = {
-                "used": sympy_used,
-                "correct": sympy_correct,
-                "expected": expected,
-                "student": student_answer
+                "used": r["sympy_used"],
+                "correct": r["sympy_correct"],
+                "status": r["sympy_status"],
+                "tier": r["sympy_tier"],
+                "expected": r["expected"],
+                "student": r["student"]
             }
+            grading_result["timings"][qid] = r["timings"]
 
             # Misconceptions
             if marks < 0.6 * max_marks:
-                concept = q.get("concept", qtype)
+                concept = q.get("concept", q.get("type", "conceptual"))
                 grading_result["misconceptions"].append(f"Weakness in {concept}")
 
         # Final Score
@@ -198,6 +398,160 @@ class EvaluatorAgent(BaseAgent):
 
         return grading_result
 
+    async def _grade_question(self, q: Dict[str, Any], student_answer: str,
+                              llm_grade: Optional[Callable[..., Awaitable[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        """
+        Memoized on (question content hash, normalized answer): students who
+        give the same answer, up to notation or canonical SymPy form, share
+        one grading.
+        """
+        started = time.perf_counter()
+        qhash = q.get("content_hash") or question_hash(q)
+        forms = [normalize_answer(student_answer)]
+        mode = symbolic_mode(q)
+        if self.memo.get(qhash, forms) is None and mode is not None and q.get("symbolic_gradable", True):
+            args = () if mode == SCALAR else (mode,)
+            text = student_answer.replace("$", "")  # inline-math delimiters
+            canonical = (await self.sandbox.verify("canonical_form", text, *args)).get("canonical")
+            if canonical:
+                forms.append("sympy:" + canonical)
+
+        result, hit = await self.memo.get_or_grade(qhash, forms, lambda: self._grade_uncached(q, student_answer, llm_grade))
+        if not hit:
+            return result
+        return {
+            **result,
+            "student": student_answer,
+            "timings": {"memo_hit": True, "total_ms": round((time.perf_counter() - started) * 1000, 1)},
+        }
+
+    async def _grade_uncached(self, q: Dict[str, Any], student_answer: str,
+                              llm_grade: Optional[Callable[..., Awaitable[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        """
+        Cheap-first cascade: exact match, SymPy check (in the sandbox pool),
+        MiniLM similarity, the small LLM, then the large one. Every tier gives
+        a confidence and the first at or above CASCADE_CONFIDENCE decides; if
+        none does, the most confident verdict stands. `llm_grade(q, answer)`
+        replaces the small model's single-answer call (batch grading passes
+        its batcher).
+        """
+        expected = q.get("expected_solution", "")
+        full_marks = q.get("rubric", {"full_marks": 10}).get("full_marks", 10)
+        mode = symbolic_mode(q)
+        started = time.perf_counter()
+        tier_ms = {}
+        verdicts = []
+
+        sympy_used = False
+        sympy_correct = False
+        sympy_status = None
+        sympy_tier = None
+        cacheable = True
+
+        def decided() -> bool:
+            return resolved(verdicts[-1]) if verdicts else False
+
+        def timed(tier: str, since: float):
+            tier_ms[tier] = round((time.perf_counter() - since) * 1000, 3)
+
+        # 1. Exact / normalized match (and blank answers)
+        t = time.perf_counter()
+        verdicts.append(exact_tier(q, student_answer))
+        timed("exact", t)
+
+        # 2. SymPy; questions whose expected solution failed to compile at generation time skip it
+        if not decided() and mode is not None and q.get("symbolic_gradable", True):
+            t = time.perf_counter()
+            sympy_used = True
+            try:
+                # timeouts / crashes come back as parse failures, so later tiers take over
+                if mode == SCALAR:
+                    result = await self.sandbox.verify("verify_equality", student_answer, expected)
+                else:
+                    result = await self.sandbox.verify("verify_matrix", student_answer, expected, mode)
+            except Exception as e:
+                result = {"correct": False, "parse_success": False, "status": "error", "feedback": str(e)}
+            sympy_status = result.get("status", "ok")
+            sympy_tier = result.get("tier")
+            sympy_correct = bool(result.get("correct", False))
+            cacheable = sympy_status not in ("timeout", "crashed", "unavailable", "memory", "error")
+            verdicts.append(symbolic_verdict(result, full_marks))
+            timed("symbolic", t)
+
+        # 3. Embedding similarity: prose answers only, it says nothing about formulas
+        if not decided() and mode is None:
+            t = time.perf_counter()
+            try:
+                verdicts.append(await asyncio.to_thread(embedding_tier, q, student_answer))
+            except Exception:
+                pass  # embedding model unavailable: escalate
+            timed("embedding", t)
+
+        # 4-5. Small model, then the large one for answers it isn't sure about
+        for tier, call in (("llm_small", llm_grade or self._llm_grade), ("llm_large", self._llm_grade_large)):
+            if decided():
+                break
+            t = time.perf_counter()
+            grade = await call(q, student_answer)
+            cacheable = cacheable and "error" not in grade
+            verdicts.append(llm_verdict(tier, grade, prefix="" if sympy_used else "[LLM Graded] "))
+            timed(tier, t)
+
+        # undecided: the most confident verdict, the latest one on ties (a failed LLM call explains itself)
+        final = verdicts[-1] if decided() else max(reversed(verdicts), key=lambda v: v["confidence"])
+        cascade_stats.record({"tier": final["tier"], "tier_ms": tier_ms})
+        timings = {f"{tier}_ms": round(ms, 1) for tier, ms in tier_ms.items()}
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return {
+            "marks": final["marks"],
+            "max_marks": full_marks,
+            "feedback": final["feedback"],
+            "tier": final["tier"],
+            "confidence": final["confidence"],
+            "sympy_used": sympy_used,
+            "sympy_correct": sympy_correct,
+            "sympy_status": sympy_status,
+            "sympy_tier": sympy_tier,
+            "expected": expected,
+            "student": student_answer,
+            "timings": timings,
+            "cacheable": cacheable
+        }
+
+    async def _llm_grade(self, q: Dict[str, Any], student_answer: str, llm: Optional[LLMClient] = None) -> Dict[str, Any]:
+        payload = {
+            "task": "grade_single_question",
+            "question": q,
+            "student_answer": student_answer
+        }
+        # concurrent fallbacks share the global limiter, so they are spaced like any other call
+        await limiter.wait()
+        return await self._call_llm_for_generation(payload, llm)
+
+    async def _llm_grade_large(self, q: Dict[str, Any], student_answer: str) -> Dict[str, Any]:
+        return await self._llm_grade(q, student_answer, self.llm_large)
+
+    async def _llm_grade_many(self, q: Dict[str, Any], answers: List[str]) -> List[Dict[str, Any]]:
+        """Grade several answers to one question in one LLM call; answers the reply omits are graded singly."""
+        if len(answers) == 1:
+            return [await self._llm_grade(q, answers[0])]
+        payload = {
+            "task": "grade_answers_batch",
+            "question": q,
+            "student_answers": [{"id": i, "answer": a} for i, a in enumerate(answers)]
+        }
+        await limiter.wait()
+        reply = await self._call_llm_for_generation(payload)
+        by_id = {}
+        for grade in reply.get("grades", []) if isinstance(reply.get("grades"), list) else []:
+            try:
+                by_id[int(grade["id"])] = grade
+            except (KeyError, TypeError, ValueError):
+                continue
+        missing = [i for i in range(len(answers)) if i not in by_id]
+        for i, grade in zip(missing, await asyncio.gather(*(self._llm_grade(q, answers[i]) for i in missing))):
+            by_id[i] = grade
+        return [by_id[i] for i in range(len(answers))]
 
     async def run(self, goal: str, context: Dict[str, Any]) -> Dict[str, Any]:
         gp = context.get("goal_params") or {}
@@ -206,7 +560,8 @@ class EvaluatorAgent(BaseAgent):
                 topic=gp.get("topic", "linear algebra"),
                 q_types=gp.get("q_types", ["conceptual", "procedural"]),
                 counts=gp.get("counts", {"conceptual": 2, "procedural": 2}),
-                rag_context=gp.get("embedded_context", gp.get("rag_context", ""))
+                rag_context=gp.get("embedded_context", gp.get("rag_context", "")),
+                avoid_prompts=gp.get("avoid_prompts")
             )
         elif goal == "grade_answers":
             return await self.grade_answers(
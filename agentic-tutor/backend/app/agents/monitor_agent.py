@@ -5,7 +5,8 @@ from typing import Dict, Any, Optional
 from backend.app.agents.base_agent import BaseAgent
 from backend.app.core.llm_client import LLMClient
 from backend.app.database.session import get_session
-from backend.app.database.models import StudentProfile, Event
+from backend.app.database.models import StudentProfile, Event, TopicStats
+from backend.app.database import rolling_stats, score_history
 from backend.app.agents.agent_prompts.monitor_prompt import monitor_prompt
 from datetime import datetime, timezone
 from pathlib import Path
@@ -14,25 +15,24 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-def _compute_risk_score(recent_scores: list, confidence_gap: float = 0.0) -> float:
+# Scores per topic after which the decision loop is cut short
+RECENT_SCORES = 5
+
+def _compute_risk_score(stats: TopicStats, confidence_gap: float = 0.0) -> float:
     """
     Compute a risk score in [0,1]. Higher means more risk.
     Simple heuristic: combination of recent decline & confidence_gap.
-    recent_scores: most recent N overall scores (0..1)
+    stats: the topic's running aggregates, already including the current score
+    (EWMA mean/variance stand in for a recent-score window, so this is O(1))
     """
-    if not recent_scores:
+    if not stats.count:
         return 0.0
-    # trend: negative if scores declining
-    n = len(recent_scores)
-    # normalized volatility/trend
-    mean = sum(recent_scores) / n
-    # slope approx: last - mean
-    slope = recent_scores[-1] - mean
+    # slope approx: last - recent mean
+    slope = stats.last_score - stats.ewma_mean
     # volatility
-    var = sum((s - mean) ** 2 for s in recent_scores) / n
-    vol = math.sqrt(var)
+    vol = math.sqrt(max(stats.ewma_var, 0.0))
     # risk components: low current performance, negative slope, high vol, big confidence gap
-    current_risk = max(0.0, (0.5 - recent_scores[-1])) * 2.0  # maps 0.5->1.0 risk when low
+    current_risk = max(0.0, (0.5 - stats.last_score)) * 2.0  # maps 0.5->1.0 risk when low
     slope_risk = max(0.0, -slope) * 2.0
     vol_risk = min(1.0, vol * 2.0)
     conf_risk = min(1.0, abs(confidence_gap))
@@ -95,56 +95,39 @@ class MonitorAgent(BaseAgent):
         except Exception:
             profile = None
 
-        # recent scores: read from profile.history if present
-        recent_scores = []
-        if profile and isinstance(profile.history, list):
-            # extract last upto 5 eval overall scores from history items
-            for ev in reversed(profile.history):
-                if isinstance(ev, dict) and ev.get("type") == "eval_completed":
-                    payload = ev.get("payload", {})
-                    score = payload.get("score")
-                    if isinstance(score, (int, float)):
-                        recent_scores.append(float(score))
-                    if len(recent_scores) >= 5:
-                        return {
-                                "next_action": "advance",   # force exit
-                                "decision": {
-                                    "allow_advance": True,
-                                    "remediation_plan": None,
-                                    "escalate": False,
-                                    "notes": "Insufficient data to make decision."
-                                }
-                            }
-            recent_scores = list(reversed(recent_scores))
-        # append current score for risk calc
-        recent_scores.append(overall)
+        # running aggregates for this topic: constant-time reads, whatever the history length
+        topic_key = gp.get("topic", gp.get("grading_topic", "unknown"))
+        mastery_threshold = policy.get("mastery_threshold", 0.8)
+        stats = rolling_stats.get_stats(session, student_id, topic_key, mastery_threshold)
+        cut_short = stats.count >= RECENT_SCORES
+        # every evaluation is recorded and folded into the aggregates, whatever is decided below
+        score_history.record_score(session, student_id, topic_key, overall)
+        rolling_stats.update(stats, overall, mastery_threshold)
+        if cut_short:
+            session.commit()
+            return {
+                    "next_action": "advance",   # force exit
+                    "decision": {
+                        "allow_advance": True,
+                        "remediation_plan": None,
+                        "escalate": False,
+                        "notes": "Insufficient data to make decision."
+                    }
+                }
 
         # compute risk
-        risk_score = _compute_risk_score(recent_scores, confidence_gap=confidence_gap)
+        risk_score = _compute_risk_score(stats, confidence_gap=confidence_gap)
 
         # decision rules
         allow = False
         escalate = False
         remediation_plan = None
+        plan = {}
 
-        # rule: pass if overall >= mastery_threshold
-        if overall >= policy.get("mastery_threshold", 0.8):
-            # check consecutive requirement
+        # rule: pass if overall >= mastery_threshold and the streak (current included) is long enough
+        if overall >= mastery_threshold:
             consec_req = int(policy.get("consec_required", 2))
-            # count last consec scores >= threshold
-            consec = 0
-            # include current
-            for s in reversed(recent_scores):
-                if s >= policy.get("mastery_threshold", 0.8):
-                    consec += 1
-                else:
-                    break
-            if consec >= consec_req:
-                allow = True
-            else:
-                allow = False
-        else:
-            allow = False
+            allow = stats.streak >= consec_req
 
         # escalation rules
         if overall < policy.get("escalate_threshold", 0.4):
@@ -159,7 +142,11 @@ class MonitorAgent(BaseAgent):
                 "student_id": str(student_id),
                 "profile_snapshot": {
                     "mastery_map": profile.mastery_map if profile else {},
-                    "history": profile.history if profile else []
+                    "history": [
+                        {"topic": r.topic, "score": r.score, "ts": r.ts.isoformat()}
+                        for r in score_history.recent_scores(session, student_id, topic_key, n=RECENT_SCORES)
+                    ],
+                    "topic_stats": rolling_stats.as_dict(stats)
                 },
                 "eval_summary": {
                     "overall_score": overall,
@@ -202,7 +189,6 @@ class MonitorAgent(BaseAgent):
             session.refresh(profile)
 
         # update mastery map: naive update = max(previous, overall)
-        topic_key = gp.get("topic", gp.get("grading_topic", "unknown"))
         if topic_key:
             try:
                 current_val = float(profile.mastery_map.get(topic_key, 0.0))
@@ -212,13 +198,6 @@ class MonitorAgent(BaseAgent):
             new_val = round(max(current_val, 0.6 * current_val + 0.4 * overall), 3)
             profile.mastery_map[topic_key] = new_val
 
-        # append event to history
-        hist_item = {
-            "type": "eval_completed",
-            "ts": datetime.now(timezone.utc).isoformat(),
-            "payload": {"score": overall, "topic": topic_key}
-        }
-        profile.history = (profile.history or []) + [hist_item]
         profile.risk_score = round(risk_score, 3)
         profile.last_updated = datetime.now(timezone.utc)
         session.add(profile)
@@ -3,6 +3,7 @@ import json
 from typing import Dict, Any
 from backend.app.agents.base_agent import BaseAgent
 from backend.app.core.llm_client import LLMClient
+from backend.app.core.semantic_cache import SemanticCache, normalize_topic, profile_bucket
 from pathlib import Path
 import asyncio
 from backend.app.agents.agent_prompts.tutor_prompt import tutor_prompt
@@ -46,6 +47,20 @@ class TutorAgent(BaseAgent):
             if gp.get("embedded_context"):
                 payload["embedded_context"] = gp["embedded_context"]
 
+            # Near-identical lessons (same topic wording modulo case/punctuation/synonyms,
+            # same learner bucket) are served from the semantic cache
+            cache = SemanticCache()
+            cache_request = normalize_topic(topic)
+            cache_key = json.dumps({
+                "level": profile_bucket(student_profile, topic),
+                "target_mastery": target_mastery,
+                "constraints": payload["constraints"],
+            }, sort_keys=True)
+            if cache.enabled(goal):
+                cached = await asyncio.to_thread(cache.lookup, goal, cache_request, cache_key)
+                if cached is not None:
+                    return cached
+
             user_input = json.dumps(payload)
             system_prompt = self.template
             user_prompt = f"Input JSON:\n{user_input}\n\nReturn the required JSON ONLY."
@@ -86,7 +101,10 @@ class TutorAgent(BaseAgent):
                     "metadata": {},
                     "error": "LLM returned non-dict JSON"
                 }
-            return {"plan": plan_json.get("plan", []), "expected_metrics": plan_json.get("expected_metrics", {}), "metadata": plan_json.get("metadata", {})}
+            result = {"plan": plan_json.get("plan", []), "expected_metrics": plan_json.get("expected_metrics", {}), "metadata": plan_json.get("metadata", {})}
+            if cache.enabled(goal) and result["plan"] and "error" not in plan_json:
+                await asyncio.to_thread(cache.store, goal, cache_request, result, cache_key)
+            return result
 
         elif goal == "provide_hint":
             qtext = gp.get("question", "")
@@ -0,0 +1,122 @@
+# backend/app/core/grading_cascade.py
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.app.core.grading_memo import normalize_answer
+from backend.app.core.tools.sympy_tool import TierStats
+
+logger = logging.getLogger(__name__)
+
+# A tier's verdict is final at or above this confidence; below it the next tier runs
+CASCADE_CONFIDENCE = float(os.getenv("CASCADE_CONFIDENCE", "0.8"))
+# A final answer that parsed and is provably not equal to the expected one
+CASCADE_SYMBOLIC_WRONG_CONFIDENCE = float(os.getenv("CASCADE_SYMBOLIC_WRONG_CONFIDENCE", "0.9"))
+# MiniLM cosine similarity to the expected solution: accept above, reject below, escalate between
+CASCADE_EMBED_ACCEPT = float(os.getenv("CASCADE_EMBED_ACCEPT", "0.85"))
+CASCADE_EMBED_REJECT = float(os.getenv("CASCADE_EMBED_REJECT", "0.25"))
+# Last resort for answers the small model isn't sure about
+CASCADE_LARGE_MODEL = os.getenv("CASCADE_LARGE_MODEL", "llama-3.3-70b-versatile")
+
+TIERS = ("exact", "symbolic", "embedding", "llm_small", "llm_large")
+
+_STOPWORDS = {
+    "that", "this", "with", "from", "have", "each", "their", "there", "which", "when", "then", "than",
+    "into", "only", "also", "such", "some", "will", "would", "they", "them", "these", "those", "where",
+    "because", "every", "must", "does", "being", "about", "other", "answer", "solution",
+}
+
+# Which tier resolved each answer, and the time spent in every tier that ran
+cascade_stats = TierStats()
+
+
+def verdict(tier: str, marks: float, confidence: float, feedback: str = "") -> Dict[str, Any]:
+    return {"tier": tier, "marks": marks, "confidence": round(float(confidence), 3), "feedback": feedback}
+
+
+def resolved(result: Optional[Dict[str, Any]]) -> bool:
+    return result is not None and result["confidence"] >= CASCADE_CONFIDENCE
+
+
+def exact_tier(q: Dict[str, Any], student_answer: str) -> Dict[str, Any]:
+    """Blank answers and answers equal to the expected solution up to notation."""
+    full = q.get("rubric", {}).get("full_marks", 10)
+    normalized = normalize_answer(student_answer)
+    if not normalized:
+        return verdict("exact", 0, 1.0, "No answer given.")
+    expected = normalize_answer(q.get("expected_solution", ""))
+    if expected and normalized == expected:
+        return verdict("exact", full, 1.0, "Correct: matches the expected solution.")
+    return verdict("exact", 0, 0.0)
+
+
+def symbolic_verdict(result: Dict[str, Any], full_marks: float) -> Dict[str, Any]:
+    """
+    Confidence of a sandbox check: certain when equal, high when parsed but
+    unequal, none when unparsed or when a decimal answer is off by no more
+    than rounding (0.333 for 1/3), which a model should judge.
+    """
+    feedback = f"[SymPy] {result.get('feedback', '')}"
+    if result.get("parse_success", True) and result.get("correct"):
+        return verdict("symbolic", full_marks, 1.0, feedback)
+    if result.get("parse_success", True) and result.get("status", "ok") == "ok" and not result.get("rounded"):
+        return verdict("symbolic", 0, CASCADE_SYMBOLIC_WRONG_CONFIDENCE, feedback)
+    return verdict("symbolic", 0, 0.0, feedback)
+
+
+def llm_verdict(tier: str, grade: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Model grades carry their own 0-1 confidence; replies without one are trusted, failed calls are not."""
+    if "error" in grade:
+        return verdict(tier, 0, 0.0, "Automatic grading failed; marks pending review.")
+    try:
+        confidence = min(1.0, max(0.0, float(grade.get("confidence", 1.0))))
+    except (TypeError, ValueError):
+        confidence = 1.0
+    return verdict(tier, grade.get("score", 0), confidence, prefix + grade.get("feedback", "No feedback provided."))
+
+
+def keywords(q: Dict[str, Any], limit: int = 8) -> List[str]:
+    """Rubric keywords when the question has them, else the content words of the expected solution."""
+    given = (q.get("rubric") or {}).get("keywords")
+    if isinstance(given, list) and given:
+        return [str(k).lower() for k in given][:limit]
+    words = re.findall(r"[a-z][a-z\-]{3,}", (q.get("expected_solution") or "").lower())
+    seen = []
+    for w in words:
+        if w not in _STOPWORDS and w not in seen:
+            seen.append(w)
+    return seen[:limit]
+
+
+def keyword_coverage(q: Dict[str, Any], student_answer: str) -> float:
+    terms = keywords(q)
+    if not terms:
+        return 0.0
+    text = student_answer.lower()
+    # prefix match tolerates inflections ("independent" / "independence")
+    return sum(1 for t in terms if t[: max(4, len(t) - 3)] in text) / len(terms)
+
+
+def embedding_tier(q: Dict[str, Any], student_answer: str) -> Dict[str, Any]:
+    """
+    MiniLM similarity to the expected solution plus rubric keyword coverage.
+    Confident only at the ends of the scale; the middle band escalates.
+    """
+    from backend.app.core.rag.vector_store import VectorStore
+
+    full = q.get("rubric", {}).get("full_marks", 10)
+    store = VectorStore()
+    a = store.embed_query(student_answer.strip())
+    e = store.embed_query(q.get("expected_solution", "").strip())
+    similarity = float(np.dot(a, e) / max(np.linalg.norm(a) * np.linalg.norm(e), 1e-12))
+    coverage = keyword_coverage(q, student_answer)
+    detail = f"similarity {similarity:.2f}, key terms {coverage:.0%}"
+    if similarity >= CASCADE_EMBED_ACCEPT and coverage >= 0.5:
+        return verdict("embedding", full, similarity, f"Correct ({detail}).")
+    if similarity <= CASCADE_EMBED_REJECT and coverage == 0:
+        return verdict("embedding", 0, 1 - similarity, f"Does not address the question ({detail}).")
+    # provisional marks, only used if every later tier fails
+    return verdict("embedding", round(full * (similarity + coverage) / 2, 1), 0.5, detail)
@@ -0,0 +1,148 @@
+# backend/app/core/grading_memo.py
+import asyncio
+import logging
+import os
+import re
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.app.utils.bounded_cache import BoundedCache
+
+logger = logging.getLogger(__name__)
+
+GRADING_MEMO_SIZE = int(os.getenv("GRADING_MEMO_SIZE", "20000"))
+GRADING_MEMO_TTL = int(os.getenv("GRADING_MEMO_TTL", str(24 * 3600)))
+
+# LaTeX / Unicode spellings -> ASCII
+_EQUIVALENTS = [
+    (re.compile(r"\\(?:left|right|displaystyle|,|;|!|quad)"), ""),
+    (re.compile(r"\\(?:cdot|times|ast)|[×·∗]"), "*"),
+    (re.compile(r"[−–—]"), "-"),
+    (re.compile(r"\\lambda|λ"), "lambda"),
+    (re.compile(r"\\sqrt\s*\{([^{}]*)\}"), r"sqrt(\1)"),
+    (re.compile(r"√"), "sqrt"),
+    (re.compile(r"\\[{}]"), lambda m: m.group(0)[1]),
+    (re.compile(r"\^"), "**"),
+    (re.compile(r"\\(?=[a-z])"), ""),
+]
+_FRAC = re.compile(r"\\[dt]?frac\s*\{([^{}]*)\}\s*\{([^{}]*)\}")
+_SPACE = re.compile(r"\s+")
+_WORD = re.compile(r"[\w.]")
+
+
+def _space(match: re.Match) -> str:
+    """Whitespace between two word characters separates entries ("[1 2 3]", "x y"); elsewhere it is dropped."""
+    text, start, end = match.string, match.start(), match.end()
+    if 0 < start and end < len(text) and _WORD.match(text[start - 1]) and _WORD.match(text[end]):
+        return " "
+    return ""
+
+
+def normalize_answer(text: str) -> str:
+    """
+    Notation-insensitive form of an answer ("λ = 3 , 1" -> "lambda=3,1").
+    Case is kept (X and x are different symbols) and a run of whitespace
+    between word characters becomes one space, so "[1 2 3]" != "[123]".
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    while True:
+        replaced = _FRAC.sub(r"(\1)/(\2)", text)
+        if replaced == text:
+            break
+        text = replaced
+    for pattern, repl in _EQUIVALENTS:
+        text = pattern.sub(repl, text)
+    text = _SPACE.sub(_space, text.replace("$", "").strip())
+    return text.rstrip(".").rstrip()
+
+
+class GradingMemo:
+    """
+    Grade each distinct answer to a question once.
+
+    Keys are (question content hash, answer form), where the form is the
+    normalized text and, when the sandbox could parse it, the canonical SymPy
+    form, so "x*x", "x^2" and "x ** 2" share one grading. A question whose
+    prompt, expected solution or rubric changes gets a new content hash, so
+    stale grades are never served; they age out through the TTL/LRU bound or
+    can be dropped with invalidate(). Concurrent requests for the same key
+    wait for the first grading instead of repeating it.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._cache = BoundedCache(GRADING_MEMO_SIZE, ttl=GRADING_MEMO_TTL)
+            cls._instance._inflight = {}  # (question hash, form) -> Future of the grading in progress
+            cls._instance.counts = {"hits": 0, "coalesced": 0, "graded": 0}
+        return cls._instance
+
+    def get(self, question_hash: str, forms: List[str]) -> Optional[Dict[str, Any]]:
+        for form in forms:
+            hit = self._cache.get((question_hash, form))
+            if hit is not None:
+                return hit
+        return None
+
+    def put(self, question_hash: str, forms: List[str], result: Dict[str, Any]):
+        for form in forms:
+            self._cache.put((question_hash, form), result)
+
+    async def get_or_grade(self, question_hash: str, forms: List[str],
+                           grade: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], bool]:
+        """(result, memo_hit). Results marked "cacheable": False (timeouts, LLM errors) are not kept."""
+        cached = self.get(question_hash, forms)
+        if cached is not None:
+            self.counts["hits"] += 1
+            return cached, True
+        pending = next((self._inflight[(question_hash, f)] for f in forms if (question_hash, f) in self._inflight), None)
+        if pending is not None:
+            # alias our other forms to the same grading, so later arrivals spelled like us also wait
+            aliases = [(question_hash, f) for f in forms if (question_hash, f) not in self._inflight]
+            for key in aliases:
+                self._inflight[key] = pending
+            try:
+                result = await asyncio.shield(pending)
+            finally:
+                for key in aliases:
+                    if self._inflight.get(key) is pending:
+                        del self._inflight[key]
+            if result.get("cacheable", True):
+                self.put(question_hash, forms, result)
+                self.counts["coalesced"] += 1
+                return result, True
+            # the first grading failed transiently; grade this one ourselves
+
+        self.counts["graded"] += 1
+        future = asyncio.get_running_loop().create_future()
+        owned = [(question_hash, form) for form in forms if (question_hash, form) not in self._inflight]
+        for key in owned:
+            self._inflight[key] = future
+        try:
+            result = await grade()
+        except BaseException:
+            future.set_result({"cacheable": False})  # waiters grade for themselves
+            raise
+        finally:
+            for key in owned:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+        future.set_result(result)
+        if result.get("cacheable", True):
+            self.put(question_hash, forms, result)
+        return result, False
+
+    def invalidate(self, question_hash: str) -> int:
+        """Drop every memoized grade for a question (e.g. after a rubric edit or regrade request)."""
+        dropped = self._cache.invalidate(lambda key: key[0] == question_hash)
+        logger.info(f"Grading memo: dropped {dropped} entries for question {question_hash}")
+        return dropped
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        total = sum(self.counts.values())
+        reused = self.counts["hits"] + self.counts["coalesced"]
+        return {"size": len(self._cache), **self.counts, "reuse_rate": round(reused / total, 3) if total else 0.0}
@@ -8,6 +8,7 @@ from backend.app.database.session import get_session
 from backend.app.database.models import Event, StudentProfile
 from langgraph.checkpoint.memory import MemorySaver
 from backend.app.core.rag.rag_service import RAGService
+from backend.app.core.question_bank import QuestionBank, shortfall
 
 import uuid
 from datetime import datetime
@@ -67,6 +68,10 @@ def get_fallback_response(agent_name: str, goal: str) -> Dict[str, Any]:
         "MonitorAgent": {"allow_advance": False, "remediation_plan": {"action": "review", "steps": ["Re-read lesson"]}} }
     return fallbacks.get(agent_name, fallbacks["MonitorAgent"])
 
+def _curriculum_topics() -> List[str]:
+    from backend.app.routers.topic_router import get_curriculum_topics
+    return [t for group in get_curriculum_topics().values() for t in group]
+
 # =================================================================
 # 1. Shared State
 # =================================================================
@@ -80,6 +85,7 @@ class AgentState(TypedDict):
     tutor_messages: Annotated[List[Dict], "append"]
 
     questions: Optional[List[Dict[str, Any]]]
+    eval_id: Optional[str]
     student_answers: Optional[List[Dict[str, Any]]]
     grading_result: Optional[Dict[str, Any]]
 
@@ -102,6 +108,8 @@ class Orchestrator:
         self.monitor = MonitorAgent()
 
         asyncio.create_task(self._init_rag())
+        self.question_bank = QuestionBank()
+        self.question_bank.start(self._generate_for_bank, _curriculum_topics())
         self.memory = MemorySaver()
         self.graph = self._build_graph()
 
@@ -138,6 +146,15 @@ class Orchestrator:
 
         return workflow.compile(checkpointer=self.memory)
 
+    async def _generate_for_bank(self, **params) -> Dict[str, Any]:
+        """Background question generation (the bank takes its own low-priority limiter slot)."""
+        rag_context = await asyncio.to_thread(RAGService.get_context, params["topic"], use_tavily=False, agent="evaluator")
+        try:
+            return await self.evaluator.generate_questions(rag_context=rag_context, **params)
+        except Exception as e:
+            logger.warning(f"Background question generation failed for {params['topic']}: {e}")
+            return {"questions": []}
+
     # =================================================================
     # RATE-LIMITED AGENT CALLS
     # =================================================================
@@ -158,7 +175,9 @@ class Orchestrator:
     # =================================================================
     async def tutor_node(self, state: AgentState) -> Dict[str, Any]:
         profile = state.get("profile_snapshot") or await self._get_profile(state["student_id"])
-        rag_context = RAGService.get_context(f"explain {state['topic']} with examples", use_tavily=False)
+        rag_context = RAGService.get_context(
+            f"explain {state['topic']} with examples", use_tavily=False, sources=["curriculum"], agent="tutor"
+        )
 
         result = await self._call_tutor({
             "goal_params": {
@@ -179,23 +198,40 @@ class Orchestrator:
         }
 
     async def generate_questions_node(self, state: AgentState) -> Dict[str, Any]:
-        rag_context = RAGService.get_context(state["topic"], use_tavily=False)
-
-        result = await self._call_evaluator("generate_questions", {
-            "goal_params": {
-                "topic": state["topic"],
-                "embedded_context": rag_context
-            }
-        })
+        rag_context = RAGService.get_context(state["topic"], use_tavily=False, agent="evaluator")
+        bank = self.question_bank
+
+        # Quizzes come from the pre-generated bank; the LLM runs here only for the types the bank can't fill yet
+        questions = await asyncio.to_thread(bank.sample, state["student_id"], state["topic"])
+        missing = shortfall(questions)
+        source = "bank" if not missing else ("bank+generated" if questions else "generated")
+        if missing:
+            # avoid_prompts also bypasses the semantic cache, which would hand back questions already banked
+            existing = await asyncio.to_thread(bank.prompts, state["topic"])
+            result = await self._call_evaluator("generate_questions", {
+                "goal_params": {
+                    "topic": state["topic"],
+                    "q_types": list(missing),
+                    "counts": missing,
+                    "embedded_context": rag_context,
+                    "avoid_prompts": existing[-20:] or None
+                }
+            })
+            await bank.add(state["topic"], result.get("questions", []))
+            questions += await asyncio.to_thread(bank.sample, state["student_id"], state["topic"], missing)
+            for n, q in enumerate(questions, 1):
+                q["qid"] = f"Q{n}"
 
-        questions = result.get("questions", [])[:3] or [
+        questions = questions or [
             {"qid": "fb1", "prompt": f"Explain {state['topic']} in your own words.", "type": "conceptual"}
         ]
+        eval_id = await asyncio.to_thread(bank.record_quiz, state["student_id"], state["topic"], questions)
 
-        log_event(state["student_id"], "questions_generated", {"count": len(questions)}, state["thread_id"])
+        log_event(state["student_id"], "questions_generated", {"count": len(questions), "source": source}, state["thread_id"])
 
         return {
             "questions": questions,
+            "eval_id": eval_id,
             "rag_context": rag_context,
             "messages": [{"role": "evaluator", "content": f"{len(questions)} questions generated"}]
         }
@@ -211,6 +247,8 @@ class Orchestrator:
             }
         })
 
+        if state.get("eval_id"):
+            await asyncio.to_thread(self.question_bank.record_grading, state["eval_id"], state["student_answers"], result)
         log_event(state["student_id"], "answers_graded", {"score": result.get("overall_score", 0)}, state["thread_id"])
         return {"grading_result": result}
 
@@ -0,0 +1,305 @@
+# backend/app/core/question_bank.py
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from uuid import UUID
+
+from backend.app.agents.evaluator_agent import SCALAR, symbolic_mode
+from backend.app.core.semantic_cache import normalize_topic
+from backend.app.core.tools.answer_compare import question_hash
+from backend.app.core.tools.question_templates import generate_procedural
+from backend.app.core.tools.sympy_sandbox import SymPySandbox
+from backend.app.database.models import Evaluation, QuestionBankItem, ServedItem
+from backend.app.database.session import get_session
+from backend.app.utils.rate_limiter import limiter
+
+logger = logging.getLogger(__name__)
+
+# Banked questions the background job keeps per (topic, type)
+QBANK_POOL_TARGET = int(os.getenv("QBANK_POOL_TARGET", "30"))
+# A pool is refilled early when a student has fewer unseen items than this left
+QBANK_LOW_WATERMARK = int(os.getenv("QBANK_LOW_WATERMARK", "5"))
+# Hard cap per (topic, type), however many refills students trigger
+QBANK_POOL_MAX = int(os.getenv("QBANK_POOL_MAX", "200"))
+# Questions requested per type in one background generation call
+QBANK_GEN_BATCH = int(os.getenv("QBANK_GEN_BATCH", "5"))
+# Background generation budget: LLM calls per hour, taken only while the rate limiter is idle
+QBANK_GEN_PER_HOUR = int(os.getenv("QBANK_GEN_PER_HOUR", "12"))
+QBANK_JOB_INTERVAL = float(os.getenv("QBANK_JOB_INTERVAL", "600"))
+
+QUIZ_MIX = {"conceptual": 2, "procedural": 1}
+BANK_TYPES = ["conceptual", "procedural", "application"]
+
+_DIFFICULTY = {"conceptual": 1, "geometric": 2, "procedural": 2, "application": 3, "open-ended": 3}
+
+GenerateFn = Callable[..., Awaitable[Dict[str, Any]]]
+
+
+def shortfall(questions: List[Dict[str, Any]], mix: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Questions per type still missing from a sampled quiz."""
+    mix = mix or QUIZ_MIX
+    have = {}
+    for q in questions:
+        have[q.get("type")] = have.get(q.get("type"), 0) + 1
+    return {t: c - have.get(t, 0) for t, c in mix.items() if c > have.get(t, 0)}
+
+
+def difficulty_of(q: Dict[str, Any]) -> int:
+    """The generator's own 1-3 difficulty when it gave one, else by question type."""
+    given = q.get("difficulty")
+    if isinstance(given, (int, float)) and 1 <= given <= 3:
+        return int(given)
+    return _DIFFICULTY.get(q.get("type", "conceptual"), 2)
+
+
+class QuestionBank:
+    """
+    Persistent pool of generated questions per (topic, type).
+
+    Quizzes are sampled from the pool, least-served first, skipping items the
+    student saw in earlier quizzes (every served quiz is an Evaluation row).
+    A background job fills pools for the curriculum topics and refills any
+    pool a student is running out of, spending at most QBANK_GEN_PER_HOUR
+    LLM calls and only while no interactive call is waiting on the rate
+    limiter, so generation stays off the request path.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._topics = {}  # normalized topic -> display name
+            cls._instance._requested = set()  # (topic, qtype) pools running low for some student
+            cls._instance._calls = deque()  # timestamps of background generation calls
+            cls._instance._wake = None
+            cls._instance._job = None
+        return cls._instance
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+    async def add(self, topic: str, questions: List[Dict[str, Any]]) -> int:
+        """Bank generated questions (deduplicated by content hash); returns how many were new."""
+        sandbox = SymPySandbox()
+
+        async def item(q):
+            q.setdefault("content_hash", question_hash(q))
+            canonical = None
+            mode = symbolic_mode(q)
+            if mode is not None and q.get("symbolic_gradable", True):
+                args = () if mode == SCALAR else (mode,)
+                canonical = (await sandbox.verify("canonical_form", q["expected_solution"], *args)).get("canonical")
+            stored = {k: v for k, v in q.items() if k != "qid"}
+            return QuestionBankItem(
+                item_id=q["content_hash"],
+                topic=normalize_topic(topic),
+                qtype=q.get("type", "conceptual"),
+                difficulty=difficulty_of(q),
+                question=stored,
+                expected_solution=q.get("expected_solution", ""),
+                expected_canonical=canonical,
+                symbolic_gradable=bool(canonical),
+            )
+
+        items = await asyncio.gather(*(item(q) for q in questions if isinstance(q, dict) and q.get("prompt")))
+        return await asyncio.to_thread(self._insert, items)
+
+    def _insert(self, items: List[QuestionBankItem]) -> int:
+        added = 0
+        with get_session() as session:
+            for item in items:
+                if session.get(QuestionBankItem, item.item_id) is None:
+                    session.add(item)
+                    added += 1
+            session.commit()
+        return added
+
+    def pool_sizes(self, topic: str) -> Dict[str, int]:
+        with get_session() as session:
+            rows = session.query(QuestionBankItem.qtype).filter(QuestionBankItem.topic == normalize_topic(topic)).all()
+        sizes = {}
+        for (qtype,) in rows:
+            sizes[qtype] = sizes.get(qtype, 0) + 1
+        return sizes
+
+    def seen_items(self, student_id: str) -> Set[str]:
+        with get_session() as session:
+            rows = session.query(ServedItem.item_id).filter(ServedItem.student_id == student_id).all()
+        return {item_id for (item_id,) in rows}
+
+    def backfill_served(self) -> int:
+        """served_item rows for quizzes recorded before the table existed (startup job; adds only missing rows)."""
+        with get_session() as session:
+            existing = set(session.query(ServedItem.student_id, ServedItem.item_id).all())
+            pairs = set()
+            for student_id, questions in session.query(Evaluation.student_id, Evaluation.questions).all():
+                for q in questions or []:
+                    if student_id and isinstance(q, dict) and q.get("content_hash"):
+                        pairs.add((student_id, q["content_hash"]))
+            pairs -= existing
+            session.add_all(ServedItem(student_id=s, item_id=i) for s, i in pairs)
+            session.commit()
+        return len(pairs)
+
+    # ------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------
+    def sample(self, student_id: str, topic: str, mix: Optional[Dict[str, int]] = None,
+               difficulty: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Up to mix[type] unseen questions per type, least-served first (ties
+        broken at random). Pools that leave the student fewer than
+        QBANK_LOW_WATERMARK unseen items are queued for a background refill.
+        The result can be short of `mix` (see shortfall()).
+        """
+        mix = mix or QUIZ_MIX
+        key = normalize_topic(topic)
+        self._topics.setdefault(key, topic)
+        picked = []
+        with get_session() as session:
+            # served items are excluded in SQL, without loading the student's past quizzes
+            seen = session.query(ServedItem.item_id).filter(ServedItem.student_id == student_id)
+            for qtype, count in mix.items():
+                query = session.query(QuestionBankItem).filter(
+                    QuestionBankItem.topic == key, QuestionBankItem.qtype == qtype,
+                    QuestionBankItem.item_id.notin_(seen.scalar_subquery()),
+                )
+                if difficulty is not None:
+                    query = query.filter(QuestionBankItem.difficulty == difficulty)
+                unseen = query.all()
+                random.shuffle(unseen)
+                unseen.sort(key=lambda i: i.times_served)
+                for item in unseen[:count]:
+                    item.times_served += 1
+                    picked.append(dict(item.question))
+                if len(unseen) - count < QBANK_LOW_WATERMARK:
+                    self.request(topic, qtype)
+            session.commit()
+        for n, q in enumerate(picked, 1):
+            q["qid"] = f"Q{n}"
+        return picked
+
+    def record_quiz(self, student_id: str, topic: str, questions: List[Dict[str, Any]]) -> str:
+        """Store a served quiz; its questions count as seen for the student from now on."""
+        evaluation = Evaluation(student_id=student_id, topic=topic, questions=questions)
+        with get_session() as session:
+            session.add(evaluation)
+            for item_id in {q.get("content_hash") for q in questions if isinstance(q, dict)} - {None}:
+                session.merge(ServedItem(student_id=student_id, item_id=item_id))
+            session.commit()
+            return evaluation.eval_id.hex
+
+    def record_grading(self, eval_id: str, student_answers: List[Dict[str, Any]], grading: Dict[str, Any]):
+        with get_session() as session:
+            evaluation = session.get(Evaluation, UUID(eval_id))
+            if evaluation is None:
+                return
+            evaluation.student_answers = student_answers
+            evaluation.grading = grading
+            evaluation.overall_score = grading.get("overall_score", 0.0)
+            session.add(evaluation)
+            session.commit()
+
+    # ------------------------------------------------------------------
+    # Background pre-generation
+    # ------------------------------------------------------------------
+    def request(self, topic: str, qtype: str):
+        """Queue a refill of one pool and wake the job."""
+        key = normalize_topic(topic)
+        self._topics.setdefault(key, topic)
+        self._requested.add((key, qtype))
+        if self._job is not None:
+            # sample() runs in a worker thread
+            self._job.get_loop().call_soon_threadsafe(self._wake.set)
+
+    def start(self, generate: GenerateFn, topics: List[str]):
+        """Start the pre-generation job for `topics` (needs a running event loop; idempotent)."""
+        for topic in topics:
+            self._topics.setdefault(normalize_topic(topic), topic)
+        if self._job is not None and not self._job.done():
+            return
+        try:
+            self._wake = asyncio.Event()
+            self._job = asyncio.get_running_loop().create_task(self._run(generate))
+        except RuntimeError:
+            logger.warning("Question bank: no running event loop, pre-generation not started")
+
+    async def _run(self, generate: GenerateFn):
+        try:
+            backfilled = await asyncio.to_thread(self.backfill_served)
+            if backfilled:
+                logger.info(f"Question bank: backfilled {backfilled} served items from past quizzes")
+        except Exception as e:
+            logger.error(f"Question bank: served-item backfill failed: {e}")
+        while True:
+            try:
+                await self.refill(generate)
+            except Exception as e:
+                logger.error(f"Question bank refill failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=QBANK_JOB_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _needed(self, key: str) -> List[str]:
+        sizes = self.pool_sizes(key)
+        return [
+            t for t in BANK_TYPES
+            if sizes.get(t, 0) < QBANK_POOL_TARGET
+            or ((key, t) in self._requested and sizes.get(t, 0) < QBANK_POOL_MAX)
+        ]
+
+    async def refill(self, generate: GenerateFn):
+        """One pass over the known topics: top up every pool below target or requested by a student."""
+        for key, topic in list(self._topics.items()):
+            q_types = await asyncio.to_thread(self._needed, key)
+            if "procedural" in q_types:
+                # curriculum topics have computed procedural templates: no LLM budget needed
+                templated = await asyncio.to_thread(generate_procedural, topic, QBANK_POOL_TARGET)
+                if templated:
+                    added = await self.add(topic, templated)
+                    logger.info(f"Question bank: +{added} templated questions for '{topic}'")
+                    q_types.remove("procedural")
+                    self._requested.discard((key, "procedural"))
+            if not q_types:
+                continue
+            # one generation call per question type
+            await self._budget(len(q_types))
+            existing = await asyncio.to_thread(self._prompts, key)
+            result = await generate(
+                topic=topic,
+                q_types=q_types,
+                counts={t: QBANK_GEN_BATCH for t in q_types},
+                avoid_prompts=existing[-20:],
+            )
+            added = await self.add(topic, result.get("questions") or [])
+            logger.info(f"Question bank: +{added} questions for '{topic}' ({', '.join(q_types)})")
+            self._requested -= {(key, t) for t in q_types}
+
+    def prompts(self, topic: str) -> List[str]:
+        """Prompts already banked for a topic, oldest first."""
+        return self._prompts(normalize_topic(topic))
+
+    def _prompts(self, key: str) -> List[str]:
+        with get_session() as session:
+            rows = session.query(QuestionBankItem.question).filter(QuestionBankItem.topic == key).all()
+        return [q.get("prompt", "")[:200] for (q,) in rows]
+
+    async def _budget(self, calls: int = 1):
+        """Wait until `calls` slots fit in the hourly budget and the rate limiter is idle, then take them."""
+        # a batch larger than the whole budget waits for an empty hour instead of forever
+        needed = min(calls, QBANK_GEN_PER_HOUR)
+        while True:
+            now = time.time()
+            while self._calls and now - self._calls[0] > 3600:
+                self._calls.popleft()
+            if len(self._calls) + needed <= QBANK_GEN_PER_HOUR and limiter.idle():
+                break
+            await asyncio.sleep(5.0)
+        self._calls.extend([time.time()] * calls)
+        await limiter.wait()
@@ -0,0 +1,222 @@
+# backend/app/core/rag/ann_index.py
+import logging
+import math
+import os
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# flat16 = float16 scalar quantizer, ivfpq / opq = product-quantized IVF codes
+INDEX_TYPES = ("flat", "hnsw", "ivf", "flat16", "ivfpq", "opq")
+COMPRESSED_TYPES = ("flat16", "ivfpq", "opq")
+
+# Defaults, overridable per process via env
+INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "flat")
+IVF_NLIST = int(os.getenv("RAG_IVF_NLIST", "0"))          # 0 = derive from corpus size
+IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "16"))
+HNSW_M = int(os.getenv("RAG_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("RAG_HNSW_EF_SEARCH", "64"))
+PQ_M = int(os.getenv("RAG_PQ_M", "48"))                   # sub-quantizers (8 bits each)
+# Candidates fetched per result for exact re-scoring of compressed indexes (0 = off)
+RESCORE_FACTOR = int(os.getenv("RAG_RESCORE_FACTOR", "4"))
+
+# FAISS wants ~39 training points per IVF list / PQ centroid
+MIN_TRAIN_PER_LIST = 39
+PQ_CENTROIDS = 256
+
+
+def default_nlist(n: int) -> int:
+    """Common rule of thumb: ~4*sqrt(N) lists, bounded by available training data."""
+    return max(1, min(int(4 * math.sqrt(max(n, 1))), n // MIN_TRAIN_PER_LIST))
+
+
+def build_index(index_type: str, vectors: np.ndarray, nlist: int = None,
+                hnsw_m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION,
+                pq_m: int = PQ_M, ids: np.ndarray = None) -> faiss.Index:
+    """
+    Build an L2 index of the requested type and add `vectors` to it.
+    IVF / PQ indexes are trained on the vectors themselves; corpora too
+    small to train fall back to an exact flat index. With `ids`, the index
+    is wrapped in an IndexIDMap2 so searches return those ids.
+    """
+    index_type = (index_type or "flat").lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Choose from {INDEX_TYPES}")
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, dim = vectors.shape
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+    elif index_type == "flat16":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16)
+    elif index_type in ("ivf", "ivfpq", "opq"):
+        nlist = nlist or IVF_NLIST or default_nlist(n)
+        min_train = nlist * MIN_TRAIN_PER_LIST
+        if index_type != "ivf":
+            min_train = max(min_train, PQ_CENTROIDS * MIN_TRAIN_PER_LIST)
+        if n < min_train or nlist < 2:
+            logger.warning(f"{n} vectors is too few to train {index_type} (nlist={nlist}); using flat index")
+            index = faiss.IndexFlatL2(dim)
+        else:
+            if index_type == "ivf":
+                index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist)
+            elif index_type == "ivfpq":
+                index = faiss.index_factory(dim, f"IVF{nlist},PQ{pq_m}")
+            else:
+                index = faiss.index_factory(dim, f"OPQ{pq_m},IVF{nlist},PQ{pq_m}")
+            index.train(vectors)
+    else:
+        index = faiss.IndexFlatL2(dim)
+
+    if ids is not None:
+        index = faiss.IndexIDMap2(index)
+        if n:
+            index.add_with_ids(vectors, np.ascontiguousarray(ids, dtype="int64"))
+    elif n:
+        index.add(vectors)
+    configure_search(index)
+    return index
+
+
+def configure_search(index: faiss.Index, nprobe: int = IVF_NPROBE, ef_search: int = HNSW_EF_SEARCH):
+    """Apply query-time knobs (IVF nprobe, HNSW efSearch); no-op for flat indexes."""
+    ivf = _as_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    hnsw = getattr(_unwrap(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+
+
+def index_type_of(index: faiss.Index) -> str:
+    concrete = _unwrap(index)
+    if isinstance(concrete, faiss.IndexPreTransform):
+        return "opq"
+    if isinstance(concrete, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if _as_ivf(index) is not None:
+        return "ivf"
+    if getattr(concrete, "hnsw", None) is not None:
+        return "hnsw"
+    if isinstance(concrete, faiss.IndexScalarQuantizer):
+        return "flat16"
+    return "flat"
+
+
+def is_compressed(index: faiss.Index) -> bool:
+    return index_type_of(index) in COMPRESSED_TYPES
+
+
+def extract_vectors(index: faiss.Index) -> np.ndarray:
+    """
+    Recover stored vectors (in insertion order) so an index can be rebuilt
+    without re-embedding. Lossy for compressed indexes — prefer VectorFile.
+    """
+    inner = _unwrap(index)
+    ivf = _as_ivf(inner)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return inner.reconstruct_n(0, inner.ntotal)
+
+
+def index_ids(index: faiss.Index) -> np.ndarray:
+    """Ids an index returns from search, in insertion order."""
+    concrete = faiss.downcast_index(index)
+    if isinstance(concrete, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.vector_to_array(concrete.id_map)
+    return np.arange(index.ntotal, dtype="int64")
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """Serialized size — a close proxy for resident memory of the index."""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def search_with_rescore(index: faiss.Index, vectors: np.ndarray, query: np.ndarray, k: int,
+                        factor: int = RESCORE_FACTOR):
+    """
+    Search a (possibly compressed) index, then re-rank the top k*factor
+    candidates by exact L2 distance against the full-precision `vectors`
+    (usually a read-only memmap). Returns (distances, positions) for one query.
+    """
+    query = np.ascontiguousarray(query, dtype="float32").reshape(1, -1)
+    k = min(k, index.ntotal)
+    if k <= 0:
+        return np.empty(0, dtype="float32"), np.empty(0, dtype="int64")
+    if factor <= 1 or vectors is None:
+        dist, idx = index.search(query, k)
+        keep = idx[0] != -1
+        return dist[0][keep], idx[0][keep]
+
+    _, idx = index.search(query, min(k * factor, index.ntotal))
+    cand = idx[0][idx[0] != -1]
+    # sorted row reads keep memmap access sequential-ish
+    order = np.argsort(cand)
+    exact = np.asarray(vectors[cand[order]], dtype="float32")
+    dist = ((exact - query) ** 2).sum(axis=1)
+    best = np.argsort(dist)[:k]
+    return dist[best], cand[order][best]
+
+
+class VectorFile:
+    """
+    Append-only float32 matrix on disk (row i = FAISS position i), memory-mapped
+    read-only for re-scoring. Pages live in the shared OS page cache, so workers
+    don't each pay for a private float32 copy.
+    """
+
+    def __init__(self, path: Path, dim: int):
+        self.path = Path(path)
+        self.dim = dim
+
+    def __len__(self):
+        if not self.path.exists():
+            return 0
+        return self.path.stat().st_size // (4 * self.dim)
+
+    def append(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype="float32").reshape(-1, self.dim)
+        with open(self.path, "ab") as f:
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def write(self, vectors: np.ndarray):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(np.ascontiguousarray(vectors, dtype="float32").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def truncate(self, rows: int):
+        with open(self.path, "r+b") as f:
+            f.truncate(rows * 4 * self.dim)
+
+    def open(self, rows: int = None):
+        """Memory-map the first `rows` vectors (all by default)."""
+        n = len(self) if rows is None else min(rows, len(self))
+        if n == 0:
+            return None
+        return np.memmap(self.path, dtype="float32", mode="r", shape=(n, self.dim))
+
+
+def _unwrap(index: faiss.Index) -> faiss.Index:
+    """The concrete index behind an IndexIDMap wrapper (or the index itself)."""
+    concrete = faiss.downcast_index(index)
+    if isinstance(concrete, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(concrete.index)
+    return concrete
+
+
+def _as_ivf(index: faiss.Index):
+    try:
+        return faiss.extract_index_ivf(index)
+    except Exception:
+        return None
@@ -1,6 +1,8 @@
 import arxiv
 import logging
 
+from .search_cache import SearchCache
+
 logger = logging.getLogger(__name__)
 
 class ArxivSearch:
@@ -9,27 +11,34 @@ class ArxivSearch:
     def search(query: str, limit: int = 3):
         """
         Returns a list of top arXiv paper summaries for the query.
+        Results are served from the persistent search cache when available.
         """
         try:
-            results = arxiv.Search(
-                query=query,
-                max_results=limit,
-                sort_by=arxiv.SortCriterion.Relevance
+            return SearchCache().fetch(
+                "arxiv", query, lambda: ArxivSearch._search_uncached(query, limit), limit=limit
             )
 
-            papers = []
-            for result in results.results():
-                summary = (
-                    f"Title: {result.title}\n"
-                    f"Authors: {', '.join(a.name for a in result.authors)}\n"
-                    f"Published: {result.published.strftime('%Y-%m-%d')}\n"
-                    f"URL: {result.entry_id}\n"
-                    f"Abstract: {result.summary}"
-                )
-                papers.append(summary)
-
-            return papers
-
         except Exception as e:
             logger.warning(f"arXiv search failed: {e}")
             return []
+
+    @staticmethod
+    def _search_uncached(query: str, limit: int):
+        results = arxiv.Search(
+            query=query,
+            max_results=limit,
+            sort_by=arxiv.SortCriterion.Relevance
+        )
+
+        papers = []
+        for result in results.results():
+            summary = (
+                f"Title: {result.title}\n"
+                f"Authors: {', '.join(a.name for a in result.authors)}\n"
+                f"Published: {result.published.strftime('%Y-%m-%d')}\n"
+                f"URL: {result.entry_id}\n"
+                f"Abstract: {result.summary}"
+            )
+            papers.append(summary)
+
+        return papers
@@ -0,0 +1,38 @@
+# backend/app/core/rag/bm25_index.py
+import re
+from collections import defaultdict
+from typing import Dict, List
+
+# Sparse side of hybrid retrieval. BM25 ranking itself is done by SQLite FTS5
+# in ChunkStore; this module owns the shared tokenizer and the rank fusion.
+
+# Small stopword list: math tokens like "a", "i", "qr", "det" must survive, so
+# only drop common English glue words.
+STOPWORDS = {
+    "the", "of", "and", "to", "in", "is", "for", "on", "with", "by", "as", "an",
+    "be", "are", "this", "that", "it", "its", "or", "at", "from", "we", "can",
+    "how", "what", "explain", "examples", "example",
+}
+
+# Normalise spelled-out symbols so "lambda" and "λ" hit the same postings
+SYMBOL_ALIASES = {"lambda": "λ", "determinant": "det", "transpose": "t"}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for tok in _TOKEN_RE.findall((text or "").lower()):
+        tok = SYMBOL_ALIASES.get(tok, tok)
+        if tok not in STOPWORDS:
+            tokens.append(tok)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """Fuse several ranked id lists: score(d) = sum 1 / (k + rank)."""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return [doc_id for doc_id, _ in sorted(scores.items(), key=lambda kv: kv[1], reverse=True)]
@@ -0,0 +1,54 @@
+# backend/app/core/rag/build_index.py
+"""
+Build or rebuild the RAG vector index with a chosen ANN type.
+
+    python -m backend.app.core.rag.build_index --type hnsw
+    python -m backend.app.core.rag.build_index --type ivf --nlist 1024 --ingest-curriculum
+    python -m backend.app.core.rag.build_index --migrate-legacy   # import old pickled store
+"""
+import argparse
+import logging
+import time
+
+from .ann_index import INDEX_TYPE, INDEX_TYPES, index_memory_bytes, index_type_of
+from .curriculum_loader import ingest_curriculum
+from .vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or rebuild the FAISS index")
+    parser.add_argument("--type", choices=INDEX_TYPES, default=INDEX_TYPE)
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default: ~4*sqrt(N))")
+    parser.add_argument("--ingest-curriculum", action="store_true",
+                        help="Embed new or changed files under ./curriculum/ before rebuilding")
+    parser.add_argument("--compact-only", action="store_true",
+                        help="Merge the delta log into the base index without changing its type")
+    parser.add_argument("--migrate-legacy", action="store_true",
+                        help="Import chunks from the old LangChain pickled index (trusted data only)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    vs = VectorStore()
+    if args.migrate_legacy:
+        vs.migrate_legacy()
+    if args.ingest_curriculum:
+        stats = ingest_curriculum()
+        logger.info(f"Ingested {stats['chunks']} curriculum chunks from {stats['files']} files")
+
+    start = time.perf_counter()
+    if args.compact_only:
+        vs.compact()
+    else:
+        vs.rebuild_index(args.type, nlist=args.nlist)
+    elapsed = time.perf_counter() - start
+    size_mb = sum(index_memory_bytes(index) for index in vs.indexes.values()) / 1e6
+    for part, index in sorted(vs.indexes.items()):
+        print(f"  {part}: {index_type_of(index)}, {index.ntotal} vectors")
+    print(f"Built index {vs.version}: {vs.ntotal} vectors in {len(vs.indexes)} partitions, "
+          f"{size_mb:.1f} MB, {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# backend/app/core/rag/chunk_store.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from .bm25_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Also split each source's partition by metadata["topic"] when present
+PARTITION_BY_TOPIC = os.getenv("RAG_PARTITION_BY_TOPIC", "0") == "1"
+
+
+def partition_of(metadata: dict) -> str:
+    """Sub-index a chunk belongs to: its source, optionally "<source>/<topic>"."""
+    metadata = metadata or {}
+    part = str(metadata.get("source") or "default")
+    if PARTITION_BY_TOPIC and metadata.get("topic"):
+        part += f"/{metadata['topic']}"
+    return part
+
+
+def partition_matches(part: str, wanted: Iterable[str]) -> bool:
+    """"curriculum" selects "curriculum" and every "curriculum/<topic>" partition."""
+    return any(part == w or part.startswith(w + "/") for w in wanted)
+
+
+class ChunkStore:
+    """
+    On-disk chunk text + metadata, one SQLite row per FAISS vector
+    (row id == FAISS position). Only the rows for top-k hits are ever read,
+    so process memory doesn't grow with the corpus. An FTS5 table over the
+    tokenized text provides BM25 ranking for hybrid retrieval.
+
+    Rows are never deleted (ids must stay aligned with vector ids): removed
+    chunks are tombstoned and dropped from the FTS table at once; compaction
+    leaves them out of new base partitions and a rebuild purges the rest.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "id INTEGER PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL DEFAULT '{}')"
+            )
+            # Stores the normalized token stream (see bm25_index.tokenize), not the raw text
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(terms, tokenize='unicode61')"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+            if "part" not in columns:
+                self._conn.execute("ALTER TABLE chunks ADD COLUMN part TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_part ON chunks (part, id)")
+            # Source file of curriculum chunks, so a changed file's old rows can be found
+            if "file" not in columns:
+                self._conn.execute("ALTER TABLE chunks ADD COLUMN file TEXT")
+                self._conn.execute("UPDATE chunks SET file = json_extract(metadata, '$.file')")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_file ON chunks (file)")
+            # 0 = live, 1 = tombstoned but maybe still indexed, 2 = purged from the indexes
+            if "deleted" not in columns:
+                self._conn.execute("ALTER TABLE chunks ADD COLUMN deleted INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_dead ON chunks (id) WHERE deleted = 1")
+            # Ingestion bookkeeping (file fingerprints, arXiv watermark / entry ids)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ingest_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+        self._backfill_partitions()
+
+    def _backfill_partitions(self):
+        """Assign partitions to rows written before the part column existed."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, metadata FROM chunks WHERE part = ''").fetchall()
+        if not rows:
+            return
+        updates = [(partition_of(json.loads(meta)), i) for i, meta in rows]
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE chunks SET part = ? WHERE id = ?", updates)
+        logger.info(f"Assigned partitions to {len(updates)} existing chunks")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def add(self, start_id: int, texts: List[str], metadatas: List[dict] = None) -> List[int]:
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(range(start_id, start_id + len(texts)))
+        rows = [
+            (i, t, json.dumps(m or {}, default=str), partition_of(m), (m or {}).get("file"))
+            for i, t, m in zip(ids, texts, metadatas)
+        ]
+        terms = [(i, " ".join(tokenize(t))) for i, t in zip(ids, texts)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO chunks (id, text, metadata, part, file) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._conn.executemany("INSERT INTO chunks_fts (rowid, terms) VALUES (?, ?)", terms)
+        return ids
+
+    def get(self, ids: List[int]) -> Dict[int, Tuple[str, dict]]:
+        ids = [int(i) for i in ids]
+        if not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, text, metadata FROM chunks WHERE id IN ({marks})", ids
+            ).fetchall()
+        return {row[0]: (row[1], json.loads(row[2])) for row in rows}
+
+    def truncate(self, n: int):
+        """Drop rows >= n (used to repair a crash between row and vector writes)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks WHERE id >= ?", (n,))
+            self._conn.execute("DELETE FROM chunks_fts WHERE rowid >= ?", (n,))
+
+    def tombstone_file(self, file: str) -> int:
+        """Tombstone every live chunk of `file`; returns how many rows were removed."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM chunks_fts WHERE rowid IN (SELECT id FROM chunks WHERE file = ? AND deleted = 0)",
+                (file,),
+            )
+            return self._conn.execute(
+                "UPDATE chunks SET deleted = 1 WHERE file = ? AND deleted = 0", (file,)
+            ).rowcount
+
+    def tombstoned(self) -> int:
+        """Tombstoned rows that may still be in a FAISS index."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks WHERE deleted = 1").fetchone()[0]
+
+    def dead_ids(self) -> np.ndarray:
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM chunks WHERE deleted = 1").fetchall()
+        return np.array([row[0] for row in rows], dtype="int64")
+
+    def mark_purged(self, ids: np.ndarray):
+        """Record that these tombstoned rows are no longer in any index."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE chunks SET deleted = 2 WHERE id = ? AND deleted = 1", [(int(i),) for i in ids]
+            )
+
+    def live(self, ids: List[int]) -> List[int]:
+        """`ids` without tombstoned chunks, order preserved."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            dead = {row[0] for row in self._conn.execute(
+                f"SELECT id FROM chunks WHERE id IN ({marks}) AND deleted != 0", ids
+            )}
+        return [i for i in ids if i not in dead]
+
+    def search_text(self, query: str, k: int = 10, partitions: List[str] = None) -> List[int]:
+        """BM25-ranked chunk ids for the query terms (OR semantics), optionally within partitions."""
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        match = " OR ".join(f'"{t}"' for t in terms)
+        where, params = self._partition_filter(partitions)
+        if where:
+            where = f" AND rowid IN (SELECT id FROM chunks WHERE {where})"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH ?{where} "
+                "ORDER BY bm25(chunks_fts) LIMIT ?",
+                (match, *params, k),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def partition_ids(self, min_id: int = 0, max_id: int = None) -> Dict[str, np.ndarray]:
+        """Live chunk ids grouped by partition, for ids in [min_id, max_id)."""
+        sql, params = "SELECT part, id FROM chunks WHERE id >= ? AND deleted = 0", [min_id]
+        if max_id is not None:
+            sql += " AND id < ?"
+            params.append(max_id)
+        groups: Dict[str, list] = {}
+        with self._lock:
+            for part, i in self._conn.execute(sql + " ORDER BY id", params):
+                groups.setdefault(part, []).append(i)
+        return {part: np.array(ids, dtype="int64") for part, ids in groups.items()}
+
+    def ids_in_partitions(self, partitions: List[str], min_id: int = 0) -> np.ndarray:
+        """Live ids >= min_id whose partition matches (used to filter the small delta log)."""
+        where, params = self._partition_filter(partitions)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM chunks WHERE id >= ? AND deleted = 0 AND ({where})", (min_id, *params)
+            ).fetchall()
+        return np.array([row[0] for row in rows], dtype="int64")
+
+    @staticmethod
+    def _partition_filter(partitions: List[str] = None):
+        if not partitions:
+            return "", ()
+        # "x/" < "x/<topic>" < "x0" ('0' sorts right after '/'), so prefixes stay index range scans
+        clauses = " OR ".join("part = ? OR (part > ? AND part < ?)" for _ in partitions)
+        params = [p for name in partitions for p in (name, f"{name}/", f"{name}0")]
+        return clauses, tuple(params)
+
+    def iter_chunks(self, batch_size: int = 1000) -> Iterator[Tuple[int, str, dict]]:
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, text, metadata FROM chunks WHERE id > ? ORDER BY id LIMIT ?",
+                    (last, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0], row[1], json.loads(row[2])
+            last = rows[-1][0]
+
+    def get_state(self, keys: List[str]) -> Dict[str, str]:
+        """Values for the given ingest_state keys; missing keys are omitted."""
+        found = {}
+        keys = list(keys)
+        # stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            marks = ",".join("?" * len(part))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM ingest_state WHERE key IN ({marks})", part
+                ).fetchall()
+            found.update(rows)
+        return found
+
+    def set_state(self, items: Dict[str, str]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO ingest_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                list(items.items()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,162 @@
+# backend/app/core/rag/context_assembler.py
+import logging
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its vocabulary can't be fetched offline
+    _ENCODING = None
+
+logger = logging.getLogger(__name__)
+
+# Per-agent prompt context budgets, in tokens
+CONTEXT_BUDGETS = {
+    "tutor": int(os.getenv("CONTEXT_BUDGET_TUTOR", "1500")),
+    "evaluator": int(os.getenv("CONTEXT_BUDGET_EVALUATOR", "1000")),
+    "default": int(os.getenv("CONTEXT_BUDGET_DEFAULT", "1200")),
+}
+# MMR trade-off: 1.0 = pure relevance, 0.0 = pure diversity
+MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+# Cosine similarity above which a passage counts as a near-duplicate of one already kept
+DUPLICATE_SIMILARITY = float(os.getenv("CONTEXT_DUPLICATE_SIMILARITY", "0.95"))
+# Shortest shared edge treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 40
+
+_WORD = re.compile(r"\w+|[^\w\s]")
+
+
+def budget_for(agent: str) -> int:
+    return CONTEXT_BUDGETS.get(agent, CONTEXT_BUDGETS["default"])
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    # ~1.3 BPE tokens per word/punctuation mark for English technical text
+    return int(len(_WORD.findall(text)) * 1.3)
+
+
+def _truncate_to_tokens(text: str, tokens: int) -> str:
+    if _ENCODING is not None:
+        return _ENCODING.decode(_ENCODING.encode(text, disallowed_special=())[:tokens])
+    return text[: tokens * 3]
+
+
+def _edge_overlap(left: str, right: str, max_chars: int = 400) -> int:
+    """Length of the longest suffix of `left` that is also a prefix of `right`."""
+    for size in range(min(len(left), len(right), max_chars), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _trim_against(text: str, kept: List[str]) -> str:
+    """Cut the text repeated from already-kept neighbours (splitter chunk overlap)."""
+    for other in kept:
+        head = _edge_overlap(other, text)
+        if head:
+            text = text[head:]
+        tail = _edge_overlap(text, other)
+        if tail:
+            text = text[:-tail]
+    return text.strip()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def assemble_context(passages: List[Dict[str, Any]], budget: int,
+                     query_vector: np.ndarray = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Fill a token budget with the most relevant, least redundant passages.
+
+    `passages` are dicts with "text" and "source", in retrieval rank order, and
+    optionally a "vector" (the embedding already computed for retrieval).
+    With vectors and a query vector, passages are picked by MMR and
+    near-duplicates are dropped; otherwise rank order is used. Text overlapping
+    an already-kept passage is trimmed before it is counted.
+
+    Returns (context text, report with tokens kept/dropped per source).
+    """
+    report = {"budget": budget, "used": 0, "sources": {}}
+
+    def tally(source: str, kind: str, tokens: int):
+        entry = report["sources"].setdefault(
+            source, {"kept": 0, "dropped": 0, "kept_tokens": 0, "dropped_tokens": 0}
+        )
+        entry[kind] += 1
+        entry[f"{kind}_tokens"] += tokens
+
+    # exact duplicates (same whitespace-normalized text) never reach the budget
+    seen, unique = set(), []
+    for p in passages:
+        key = " ".join(p["text"].split()).lower()
+        if not key:
+            continue
+        if key in seen:
+            tally(p.get("source", "unknown"), "dropped", count_tokens(p["text"]))
+            continue
+        seen.add(key)
+        unique.append(p)
+    if not unique:
+        return "", report
+
+    use_mmr = query_vector is not None and all(p.get("vector") is not None for p in unique)
+    if use_mmr:
+        vectors = _normalize(np.array([p["vector"] for p in unique], dtype="float32"))
+        query = _normalize(np.asarray(query_vector, dtype="float32").reshape(1, -1))[0]
+        relevance = vectors @ query
+    else:
+        relevance = 1.0 - np.arange(len(unique)) / len(unique)
+
+    remaining = list(range(len(unique)))
+    chosen: List[int] = []
+    kept_texts: List[str] = []
+    while remaining:
+        if use_mmr and chosen:
+            redundancy = (vectors[remaining] @ vectors[chosen].T).max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = MMR_LAMBDA * relevance[remaining] - (1 - MMR_LAMBDA) * redundancy
+        pick = int(np.argmax(scores))
+        idx = remaining.pop(pick)
+        p = unique[idx]
+        source = p.get("source", "unknown")
+
+        original = count_tokens(p["text"])
+        if redundancy[pick] >= DUPLICATE_SIMILARITY:
+            tally(source, "dropped", original)
+            continue
+        text = _trim_against(p["text"], kept_texts)
+        tokens = count_tokens(text)
+        free = budget - report["used"]
+        if tokens > free and not kept_texts and free > 0:
+            # the single best passage is larger than the whole budget: keep its head
+            text = _truncate_to_tokens(text, free)
+            tokens = count_tokens(text)
+        if not text or tokens > free:
+            tally(source, "dropped", original)
+            continue
+        chosen.append(idx)
+        kept_texts.append(text)
+        report["used"] += tokens
+        tally(source, "kept", tokens)
+        # tokens cut by overlap trimming / truncation count as dropped
+        report["sources"][source]["dropped_tokens"] += max(0, original - tokens)
+
+    return "\n\n".join(kept_texts), report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    parts = [
+        f"{source} kept {s['kept']} ({s['kept_tokens']} tok) dropped {s['dropped']} ({s['dropped_tokens']} tok)"
+        for source, s in sorted(report["sources"].items())
+    ]
+    return f"{report['used']}/{report['budget']} tokens; " + "; ".join(parts)
@@ -1,22 +1,206 @@
 # backend/app/core/rag/curriculum_loader.py
+import logging
+import multiprocessing as mp
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-def load_curriculum():
-    curriculum_dir = Path("./curriculum/")
-    texts = []
-    metadatas = []
-
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-
-    for file in curriculum_dir.rglob("*.txt"):
-        content = file.read_text(encoding="utf-8")
-        chunks = splitter.split_text(content)
-        for i, chunk in enumerate(chunks):
-            texts.append(chunk)
-            metadatas.append({
-                "source": "curriculum",
-                "file": str(file),
-                "chunk": i
-            })
-    return texts, metadatas
\ No newline at end of file
+from .snapshots import file_lock
+from .vector_store import VectorStore
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDF support is optional
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+CURRICULUM_DIR = Path(os.getenv("CURRICULUM_DIR", "./curriculum/"))
+SUFFIXES = (".txt", ".md", ".markdown", ".pdf")
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+# Chunks per embed + write batch; bounds peak memory regardless of corpus size
+INGEST_BATCH_SIZE = int(os.getenv("CURRICULUM_INGEST_BATCH", "256"))
+# Chunking processes (1 = chunk in-process)
+INGEST_WORKERS = int(os.getenv("CURRICULUM_INGEST_WORKERS", str(os.cpu_count() or 1)))
+
+# Markdown -> plain text. Single * and _ are left alone: they are usually math (a_i, x*y).
+_MARKDOWN_RULES = [
+    (re.compile(r"^\s*(```|~~~).*$", re.M), ""),            # code fences (keep the code)
+    (re.compile(r"!\[([^\]]*)\]\([^)]*\)"), r"\1"),          # images -> alt text
+    (re.compile(r"\[([^\]]*)\]\([^)]*\)"), r"\1"),           # links -> link text
+    (re.compile(r"^\s{0,3}#{1,6}\s*", re.M), ""),            # heading markers
+    (re.compile(r"^\s{0,3}>\s?", re.M), ""),                 # blockquotes
+    (re.compile(r"<[^>\n]+>"), ""),                          # inline HTML
+    (re.compile(r"(\*\*|__|`)(.+?)\1"), r"\2"),              # bold / inline code
+]
+
+_splitter = None
+
+
+def iter_curriculum_files(root: Path = CURRICULUM_DIR) -> Iterator[Path]:
+    """Lazily walk the curriculum tree in a stable order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(SUFFIXES):
+                yield Path(dirpath) / name
+
+
+def strip_markdown(text: str) -> str:
+    for pattern, repl in _MARKDOWN_RULES:
+        text = pattern.sub(repl, text)
+    return text
+
+
+def extract_text(path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix == ".pdf":
+        if PdfReader is None:
+            logger.warning(f"pypdf is not installed; skipping {path}")
+            return ""
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(str(path)).pages)
+    text = path.read_text(encoding="utf-8", errors="replace")
+    return strip_markdown(text) if suffix in (".md", ".markdown") else text
+
+
+def chunk_file(path: str) -> List[Tuple[str, dict]]:
+    """Extract and split one file. Module-level so it can run in a worker process."""
+    global _splitter
+    if _splitter is None:
+        _splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    try:
+        text = extract_text(Path(path))
+    except Exception as e:
+        logger.warning(f"Could not read {path}: {e}")
+        return []
+    return [
+        (chunk, {"source": "curriculum", "file": path, "chunk": i})
+        for i, chunk in enumerate(_splitter.split_text(text))
+    ]
+
+
+def _pool_context():
+    method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+    return mp.get_context(method)
+
+
+def iter_file_chunks(files: Iterable[Path], workers: int = INGEST_WORKERS) -> Iterator[Tuple[Path, list]]:
+    """
+    Chunk files in a process pool, yielding (path, chunks) in input order.
+    At most 2 * workers files are in flight, so memory doesn't grow with the corpus.
+    """
+    files = iter(files)
+    first = next(files, None)
+    if first is None:
+        return
+    files = chain([first], files)
+    if workers <= 1:
+        for path in files:
+            yield path, chunk_file(str(path))
+        return
+
+    # never fork: this can run inside a server worker with threads and open store handles
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        pending = deque()
+        for path in files:
+            pending.append((path, pool.submit(chunk_file, str(path))))
+            if len(pending) >= 2 * workers:
+                done, future = pending.popleft()
+                yield done, future.result()
+        while pending:
+            done, future = pending.popleft()
+            yield done, future.result()
+
+
+def _fingerprint(path: Path) -> str:
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def ingest_curriculum(root: Path = CURRICULUM_DIR, batch_size: int = INGEST_BATCH_SIZE,
+                      workers: int = INGEST_WORKERS, force: bool = False) -> dict:
+    """
+    Stream the curriculum into the vector store: lazy file walk, parallel
+    chunking, batched embedding and bounded-memory writes. Files already
+    ingested with the same size/mtime are skipped unless `force` is set;
+    a changed (or forced) file's old chunks are tombstoned and re-added.
+    """
+    vs = VectorStore()
+    stats = {"files": 0, "skipped": 0, "chunks": 0}
+    start = time.perf_counter()
+
+    buffer: List[Tuple[str, dict]] = []
+    marks = deque()  # (buffer offset after the file's last chunk, state key, fingerprint)
+    marks_fp = {}
+    appended = flushed = 0
+
+    def pending_files():
+        for path in iter_curriculum_files(root):
+            key = f"curriculum:{path}"
+            fingerprint = _fingerprint(path)
+            seen = vs.chunks.get_state([key]).get(key)
+            if seen == fingerprint and not force:
+                stats["skipped"] += 1
+                continue
+            if seen:
+                logger.info(f"{path} changed since last ingest; re-ingesting")
+            # the file's previous chunks go before the new ones are added
+            vs.remove_file(str(path))
+            marks_fp[path] = (key, fingerprint)
+            yield path
+
+    def flush(batch):
+        nonlocal flushed
+        if batch:
+            texts, metadatas = zip(*batch)
+            vs.add_texts(list(texts), list(metadatas))
+            flushed += len(batch)
+            stats["chunks"] += len(batch)
+        # a file counts as ingested only once all of its chunks are written
+        done = {}
+        while marks and marks[0][0] <= flushed:
+            _, key, fingerprint = marks.popleft()
+            done[key] = fingerprint
+        if done:
+            vs.chunks.set_state(done)
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Curriculum ingest: {stats['files']} files, {stats['chunks']} chunks, "
+            f"{stats['chunks'] / max(elapsed, 1e-9):.1f} chunks/s"
+        )
+
+    # one ingest at a time across workers; the others then find every file already recorded
+    with file_lock(vs.db_path / ".curriculum.lock"):
+        for path, chunks in iter_file_chunks(pending_files(), workers):
+            stats["files"] += 1
+            buffer.extend(chunks)
+            appended += len(chunks)
+            marks.append((appended, *marks_fp.pop(path)))
+            while len(buffer) >= batch_size:
+                flush(buffer[:batch_size])
+                del buffer[:batch_size]
+        if buffer or marks:
+            flush(buffer)
+
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    stats["chunks_per_sec"] = round(stats["chunks"] / max(stats["seconds"], 1e-9), 1)
+    logger.info(f"Curriculum ingest finished: {stats}")
+    return stats
+
+
+def load_curriculum(root: Path = CURRICULUM_DIR):
+    """Chunk the whole curriculum into memory (small corpora / tooling only)."""
+    texts, metadatas = [], []
+    for _, chunks in iter_file_chunks(iter_curriculum_files(root), workers=1):
+        for text, metadata in chunks:
+            texts.append(text)
+            metadatas.append(metadata)
+    return texts, metadatas
@@ -0,0 +1,162 @@
+# backend/app/core/rag/delta_log.py
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class DeltaSegment:
+    def __init__(self, path: Path, start: int, vectors: np.ndarray):
+        self.path = path
+        self.start = start
+        self.vectors = vectors
+
+    def __len__(self):
+        return len(self.vectors)
+
+
+class DeltaLog:
+    """
+    Append-only vectors that have not yet been compacted into the base index.
+
+    Each segment file `delta-<start>.f32` holds raw float32 rows for chunk ids
+    start, start+1, ...; every append is fsync'd, so an acknowledged add is
+    durable without rewriting the base index. Segments are kept in memory for
+    exact brute-force search until compaction folds them into a new base.
+
+    Other processes can open the same directory read-only and reload it when
+    `signature()` changes; only the writer (prune=True) deletes files.
+    """
+
+    def __init__(self, path: Path, dim: int, base_count: int, prune: bool = False):
+        self.path = Path(path)
+        self.dim = dim
+        self.row_bytes = 4 * dim
+        self._lock = threading.Lock()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.segments: List[DeltaSegment] = []
+        self._load(base_count, prune)
+
+    def _load(self, base_count: int, prune: bool):
+        next_id = base_count
+        for file in sorted(self.path.glob("delta-*.f32"), key=lambda p: int(p.stem.split("-")[1])):
+            start = int(file.stem.split("-")[1])
+            try:
+                size = file.stat().st_size
+                if size % self.row_bytes and prune:
+                    # torn write from a crash: drop the partial row
+                    with open(file, "r+b") as f:
+                        f.truncate(size - size % self.row_bytes)
+                # readers only take whole rows; a writer may be mid-append
+                rows = np.fromfile(file, dtype="float32", count=(size // self.row_bytes) * self.dim)
+            except FileNotFoundError:
+                continue  # dropped by a compaction in another process
+            rows = rows.reshape(-1, self.dim)
+            if start + len(rows) <= base_count:
+                if prune:
+                    file.unlink()  # already compacted into the base
+                continue
+            if start != next_id and start > base_count:
+                logger.warning(f"Gap before delta segment {file.name}; ignoring it and later segments")
+                break
+            skip = max(0, base_count - start)
+            self.segments.append(DeltaSegment(file, start + skip, rows[skip:]))
+            next_id = start + len(rows)
+        if not self.segments:
+            self.segments.append(self._new_segment(base_count))
+
+    def _new_segment(self, start: int) -> DeltaSegment:
+        return DeltaSegment(self.path / f"delta-{start}.f32", start, np.empty((0, self.dim), dtype="float32"))
+
+    def __len__(self):
+        return sum(len(s) for s in self.segments)
+
+    def signature(self) -> Tuple:
+        """Cheap (name, size) listing of the segment files; changes whenever any process appends."""
+        entries = []
+        for file in self.path.glob("delta-*.f32"):
+            try:
+                entries.append((file.name, file.stat().st_size))
+            except FileNotFoundError:
+                continue  # dropped by a concurrent compaction
+        return tuple(sorted(entries))
+
+    @property
+    def next_id(self) -> int:
+        last = self.segments[-1]
+        return last.start + len(last)
+
+    def append(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype="float32").reshape(-1, self.dim)
+        with self._lock:
+            active = self.segments[-1]
+            with open(active.path, "ab") as f:
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            active.vectors = np.vstack([active.vectors, vectors])
+
+    def truncate(self, n_rows: int):
+        """Keep only the first n_rows delta rows (repairs rows without a chunk)."""
+        with self._lock:
+            keep, kept = [], 0
+            for seg in self.segments:
+                take = max(0, min(len(seg), n_rows - kept))
+                if take < len(seg):
+                    with open(seg.path, "r+b") as f:
+                        f.truncate(take * self.row_bytes)
+                    seg.vectors = seg.vectors[:take]
+                keep.append(seg)
+                kept += take
+            self.segments = keep
+
+    def seal(self) -> List[DeltaSegment]:
+        """
+        Freeze current segments for compaction; new appends go to a fresh segment.
+        The fresh segment's file is created right away, so other processes that
+        reload the directory append to it too, not to a sealed segment.
+        """
+        with self._lock:
+            sealed = [s for s in self.segments if len(s)]
+            if not sealed:
+                return []
+            fresh = self._new_segment(self.next_id)
+            fresh.path.touch()
+            self.segments = sealed + [fresh]
+            return sealed
+
+    def drop(self, sealed: List[DeltaSegment]):
+        """Forget segments that are now part of the base index."""
+        with self._lock:
+            self.segments = [s for s in self.segments if s not in sealed]
+        for seg in sealed:
+            seg.path.unlink(missing_ok=True)
+
+    def snapshot(self) -> List[Tuple[int, np.ndarray]]:
+        with self._lock:
+            return [(s.start, s.vectors) for s in self.segments if len(s)]
+
+    @staticmethod
+    def search(snapshot: List[Tuple[int, np.ndarray]], query: np.ndarray, k: int, allowed: np.ndarray = None):
+        """
+        Exact L2 search over a snapshot; returns (squared distances, chunk ids).
+        `allowed` restricts the result to those chunk ids (partition filters).
+        """
+        if not snapshot or k <= 0:
+            return np.empty(0, dtype="float32"), np.empty(0, dtype="int64")
+        query = np.asarray(query, dtype="float32").reshape(1, -1)
+        dists, ids = [], []
+        for start, vectors in snapshot:
+            dists.append(((vectors - query) ** 2).sum(axis=1))
+            ids.append(np.arange(start, start + len(vectors), dtype="int64"))
+        dists, ids = np.concatenate(dists), np.concatenate(ids)
+        if allowed is not None:
+            keep = np.isin(ids, allowed)
+            dists, ids = dists[keep], ids[keep]
+        best = np.argsort(dists)[:k]
+        return dists[best], ids[best]
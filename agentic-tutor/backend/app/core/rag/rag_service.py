@@ -2,49 +2,75 @@
 from .vector_store import VectorStore
 from .tavily_client import TavilySearch
 from .arxiv_client import ArxivSearch
-from .curriculum_loader import load_curriculum
+from .context_assembler import assemble_context, budget_for, format_report
+from .curriculum_loader import ingest_curriculum
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+# Candidates retrieved from the store; the agent's token budget decides how many survive
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "6"))
+
 class RAGService:
     _initialized = False
 
     @classmethod
     def initialize(cls):
         if not cls._initialized:
-            texts, metadatas = load_curriculum()
-            if texts:
-                VectorStore().add_texts(texts, metadatas)
+            # unchanged files are skipped, so restarts don't re-embed the curriculum
+            ingest_curriculum()
             cls._initialized = True
             logger.info("RAG Service initialized with curriculum")
 
     @classmethod
-    def get_context(cls, query: str, use_tavily: bool = True, use_arxiv: bool = True) -> str:
+    def get_context(cls, query: str, use_tavily: bool = True, use_arxiv: bool = True,
+                    sources: list = None, agent: str = "default") -> str:
+        context, _ = cls.get_context_with_report(query, use_tavily, use_arxiv, sources, agent)
+        return context
+
+    @classmethod
+    def get_context_with_report(cls, query: str, use_tavily: bool = True, use_arxiv: bool = True,
+                                sources: list = None, agent: str = "default"):
+        """
+        Retrieve store chunks plus optional Tavily / arXiv results, then fit them
+        into `agent`'s token budget (MMR dedup, overlap trimming).
+        Returns (context, report of tokens kept/dropped per source).
+        """
         cls.initialize()
         vs = VectorStore()
 
-        # 1. FAISS retrieval (normal context)
-        docs = vs.search(query, k=5)
-        context = "\n\n".join([doc.page_content for doc in docs])
+        # 1. FAISS retrieval (normal context); `sources` limits it to those partitions
+        docs = vs.search(query, k=RAG_TOP_K, partitions=sources)
+        stored = vs.get_vectors([int(doc.id) for doc in docs])
+        passages = [
+            {"text": doc.page_content, "source": doc.metadata.get("source", "store"), "vector": vec}
+            for doc, vec in zip(docs, stored)
+        ]
 
         # 2. Tavily real-time search
+        external = []
         if use_tavily:
             try:
                 web_results = TavilySearch.search(
                     f"{query} linear algebra real world application"
                 )
-                context += "\n\n" + "\n".join(web_results[:2])
+                external += [{"text": r, "source": "tavily"} for r in web_results[:2]]
             except Exception as e:
                 logger.warning(f"Tavily failed: {e}")
 
-        # 3. arXiv research paper search  (NEW)
+        # 3. arXiv research paper search
         if use_arxiv:
             try:
                 arxiv_results = ArxivSearch.search(query, limit=2)
-                if arxiv_results:
-                    context += "\n\n" + "\n\n".join(arxiv_results)
+                external += [{"text": r, "source": "arxiv_live"} for r in arxiv_results]
             except Exception as e:
                 logger.warning(f"arXiv failed: {e}")
 
-        return context.strip() or "No relevant context found."
+        # live results have no stored vectors; embed them in one local batch
+        if external:
+            for p, vec in zip(external, vs.embeddings.embed_documents([p["text"] for p in external])):
+                p["vector"] = vec
+        context, report = assemble_context(passages + external, budget_for(agent), vs.embed_query(query))
+        logger.info(f"Context for {agent}: {format_report(report)}")
+        return context.strip() or "No relevant context found.", report
@@ -1,21 +1,178 @@
 # backend/app/core/rag/research_ingestor.py
+"""
+Incremental arXiv ingestion. Only papers newer than the persisted watermark and
+not already ingested (by entry id) are embedded, so a weekly run costs work
+proportional to genuinely new papers.
+
+    python -m backend.app.core.rag.research_ingestor [--max-results 500]
+"""
+import argparse
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
 import arxiv
-from datetime import datetime, timedelta
+
 from .vector_store import VectorStore
 
-def ingest_weekly_papers():
-    client = arxiv.Client()
-    search = arxiv.Search(
-        query="linear algebra OR matrix OR eigenvalue OR vector space",
-        max_results=10,
-        sort_by=arxiv.SortCriterion.SubmittedDate
-    )
-
-    week_ago = datetime.now() - timedelta(days=7)
+logger = logging.getLogger(__name__)
+
+ARXIV_QUERY = "linear algebra OR matrix OR eigenvalue OR vector space"
+# Hard cap per run; paging normally stops at the watermark long before this
+ARXIV_INGEST_MAX_RESULTS = int(os.getenv("ARXIV_INGEST_MAX_RESULTS", "500"))
+ARXIV_INGEST_BATCH = int(os.getenv("ARXIV_INGEST_BATCH", "32"))
+ARXIV_PAGE_SIZE = int(os.getenv("ARXIV_PAGE_SIZE", "100"))
+# First run (no watermark yet) looks back this far
+ARXIV_LOOKBACK_DAYS = int(os.getenv("ARXIV_LOOKBACK_DAYS", "7"))
+# arXiv API terms: no more than one request every 3 seconds
+ARXIV_DELAY_SECONDS = 3.0
+# Re-scan this much before the watermark; dedupe by entry id absorbs the overlap
+WATERMARK_OVERLAP = timedelta(days=1)
+
+WATERMARK_KEY = "arxiv:watermark"
+# Set while a capped run left a gap: older papers than this still need paging
+RESUME_KEY = "arxiv:resume_before"
+# The watermark to advance to once that gap is closed
+PENDING_KEY = "arxiv:pending_watermark"
+_VERSION_SUFFIX = re.compile(r"v\d+$")
+_DONE = object()
+
+
+def paper_key(entry_id: str) -> str:
+    """State key for a paper, ignoring the version suffix (v1, v2 ... are the same paper)."""
+    return "arxiv:" + _VERSION_SUFFIX.sub("", entry_id.rstrip("/").rsplit("/abs/", 1)[-1])
+
+
+def _arxiv_date(ts: datetime) -> str:
+    return ts.astimezone(timezone.utc).strftime("%Y%m%d%H%M")
+
+
+def _page_results(client: arxiv.Client, search: arxiv.Search, out: queue.Queue, stop: threading.Event):
+    """Producer: page through results (the client enforces the request delay) into a bounded queue."""
+    try:
+        for paper in client.results(search):
+            while not stop.is_set():
+                try:
+                    out.put(paper, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                return
+    except Exception as e:
+        out.put(e)
+    finally:
+        out.put(_DONE)
+
+
+def ingest_new_papers(query: str = ARXIV_QUERY, max_results: int = ARXIV_INGEST_MAX_RESULTS,
+                      batch_size: int = ARXIV_INGEST_BATCH) -> dict:
+    """
+    Fetch papers newest-first and stop at the watermark. Paging runs in a
+    background thread while earlier pages are deduped, embedded and written
+    in batches. The watermark only advances once everything down to it has
+    been seen; a run cut short by `max_results` records the oldest paper it
+    reached, and the next run pages the rest of that gap first.
+    """
     vs = VectorStore()
+    start = time.perf_counter()
+    stats = {"fetched": 0, "new": 0, "duplicates": 0, "batches": 0, "reached_watermark": False}
+
+    state = vs.chunks.get_state([WATERMARK_KEY, RESUME_KEY, PENDING_KEY])
+    stored = state.get(WATERMARK_KEY)
+    if stored:
+        watermark = datetime.fromisoformat(stored)
+    else:
+        watermark = datetime.now(timezone.utc) - timedelta(days=ARXIV_LOOKBACK_DAYS)
+    cutoff = watermark - WATERMARK_OVERLAP
+    resume = state.get(RESUME_KEY)
+    if resume:
+        # close the gap an earlier capped run left before looking at newer papers
+        newest = datetime.fromisoformat(state.get(PENDING_KEY) or resume)
+        query = f"({query}) AND submittedDate:[{_arxiv_date(cutoff)} TO {_arxiv_date(datetime.fromisoformat(resume))}]"
+        stats["resumed_from"] = resume
+    else:
+        newest = watermark
+    oldest = None
+
+    client = arxiv.Client(page_size=ARXIV_PAGE_SIZE, delay_seconds=ARXIV_DELAY_SECONDS, num_retries=3)
+    search = arxiv.Search(query=query, max_results=max_results, sort_by=arxiv.SortCriterion.SubmittedDate)
+    pages, stop = queue.Queue(maxsize=2 * ARXIV_PAGE_SIZE), threading.Event()
+    producer = threading.Thread(target=_page_results, args=(client, search, pages, stop), daemon=True)
+    producer.start()
+
+    batch = []
+
+    def flush():
+        keys = {paper_key(p.entry_id): p for p in batch}
+        # one lookup per batch, then a single embed + insert for the new papers
+        seen = vs.chunks.get_state(list(keys))
+        fresh = [p for key, p in keys.items() if key not in seen]
+        stats["duplicates"] += len(batch) - len(fresh)
+        if fresh:
+            vs.add_texts(
+                [f"Title: {p.title}\nSummary: {p.summary}\nPublished: {p.published}" for p in fresh],
+                [{"source": "arxiv", "id": p.entry_id, "published": p.published.isoformat()} for p in fresh],
+            )
+            vs.chunks.set_state({paper_key(p.entry_id): p.published.isoformat() for p in fresh})
+            stats["new"] += len(fresh)
+            stats["batches"] += 1
+            for p in fresh:
+                logger.info(f"Ingested: {p.title}")
+        batch.clear()
+
+    try:
+        while True:
+            item = pages.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            stats["fetched"] += 1
+            if item.published < cutoff:
+                stats["reached_watermark"] = True
+                break
+            newest = max(newest, item.published)
+            oldest = item.published if oldest is None else min(oldest, item.published)
+            batch.append(item)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        stop.set()
+
+    # the results ran out before the cap, so nothing between here and the watermark was skipped
+    complete = stats["reached_watermark"] or stats["fetched"] < max_results or oldest is None
+    if complete:
+        vs.chunks.set_state({WATERMARK_KEY: newest.isoformat(), RESUME_KEY: "", PENDING_KEY: ""})
+        stats["watermark"] = newest.isoformat()
+    else:
+        vs.chunks.set_state({RESUME_KEY: oldest.isoformat(), PENDING_KEY: newest.isoformat()})
+        stats["watermark"] = watermark.isoformat()
+        stats["resume_before"] = oldest.isoformat()
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    logger.info(f"arXiv ingest finished: {stats}")
+    return stats
+
+
+def ingest_weekly_papers():
+    return ingest_new_papers()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally ingest new arXiv papers")
+    parser.add_argument("--query", default=ARXIV_QUERY)
+    parser.add_argument("--max-results", type=int, default=ARXIV_INGEST_MAX_RESULTS)
+    parser.add_argument("--batch-size", type=int, default=ARXIV_INGEST_BATCH)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(ingest_new_papers(args.query, args.max_results, args.batch_size))
+
 
-    for paper in client.results(search):
-        if paper.published > week_ago:
-            text = f"Title: {paper.title}\nSummary: {paper.summary}\nPublished: {paper.published}"
-            vs.add_texts([text], [{"source": "arxiv", "id": paper.entry_id}])
-            print(f"Ingested: {paper.title}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
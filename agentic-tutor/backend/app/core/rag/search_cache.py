@@ -0,0 +1,238 @@
+# backend/app/core/rag/search_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = Path(os.getenv("SEARCH_CACHE_PATH", "./rag_data/search_cache.db"))
+CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+OFFLINE = os.getenv("SEARCH_OFFLINE", "0").lower() in ("1", "true", "yes")
+
+# Fresh lifetime per source (seconds). Entries older than this are still served,
+# but trigger a background refresh until they pass ttl * STALE_FACTOR.
+SOURCE_TTLS = {
+    "tavily": int(os.getenv("SEARCH_CACHE_TTL_TAVILY", str(6 * 3600))),
+    "tavily_api": int(os.getenv("SEARCH_CACHE_TTL_TAVILY", str(6 * 3600))),
+    "arxiv": int(os.getenv("SEARCH_CACHE_TTL_ARXIV", str(24 * 3600))),
+}
+DEFAULT_TTL = 6 * 3600
+STALE_FACTOR = float(os.getenv("SEARCH_CACHE_STALE_FACTOR", "7"))
+
+
+class SearchCacheMiss(LookupError):
+    """Raised in offline mode when a query has never been cached."""
+
+
+class SearchCache:
+    """
+    Persistent, size-bounded cache for external search results (Tavily, arXiv).
+
+    Keys are built from the source, the normalized query and the call parameters.
+    Lookups follow stale-while-revalidate: fresh hits are returned directly, stale
+    hits are returned immediately while a single background refresh runs, and
+    misses fetch synchronously. In offline mode (SEARCH_OFFLINE=1) nothing is
+    fetched and any cached entry, however old, is served.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.path = CACHE_PATH
+            cls._instance.max_entries = CACHE_MAX_ENTRIES
+            cls._instance.offline = OFFLINE
+            cls._instance._refreshing = set()
+            cls._instance._lock = threading.Lock()
+            cls._instance._tasks = set()
+            cls._instance._init_db()
+        return cls._instance
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def _init_db(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    key TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_search_cache_accessed ON search_cache (accessed_at)")
+
+    # ------------------------------------------------------------------
+    # Keys & raw storage
+    # ------------------------------------------------------------------
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+    @classmethod
+    def make_key(cls, source: str, query: str, params: dict = None) -> str:
+        raw = json.dumps([source, cls.normalize_query(query), params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Return (value, age_seconds) or None."""
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT payload, created_at FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0]), time.time() - row[1]
+        except Exception as e:
+            logger.warning(f"Search cache read failed: {e}")
+            return None
+
+    def set(self, key: str, source: str, query: str, value):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, source, query, payload, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, source, self.normalize_query(query), json.dumps(value, default=str), now, now),
+                )
+                # Bound the table size: drop least recently used rows
+                count = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+                if count > self.max_entries:
+                    conn.execute(
+                        "DELETE FROM search_cache WHERE key IN "
+                        "(SELECT key FROM search_cache ORDER BY accessed_at ASC LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+        except Exception as e:
+            logger.warning(f"Search cache write failed: {e}")
+
+    def clear(self, source: str = None):
+        with self._connect() as conn:
+            if source:
+                conn.execute("DELETE FROM search_cache WHERE source = ?", (source,))
+            else:
+                conn.execute("DELETE FROM search_cache")
+
+    # ------------------------------------------------------------------
+    # Stale-while-revalidate lookups
+    # ------------------------------------------------------------------
+    def _classify(self, source: str, cached):
+        """Return 'fresh', 'stale', 'expired' or 'miss' for a cache lookup."""
+        if cached is None:
+            return "miss"
+        ttl = SOURCE_TTLS.get(source, DEFAULT_TTL)
+        age = cached[1]
+        if age <= ttl:
+            return "fresh"
+        if age <= ttl * STALE_FACTOR:
+            return "stale"
+        return "expired"
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_refresh(self, key: str):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def fetch(self, source: str, query: str, fetch_fn, **params):
+        """
+        Synchronous get-or-fetch. `fetch_fn()` performs the real lookup and
+        should raise on failure so errors are never cached.
+        """
+        key = self.make_key(source, query, params)
+        cached = self.get(key)
+        state = self._classify(source, cached)
+
+        if self.offline:
+            if cached is None:
+                raise SearchCacheMiss(f"{source} query not cached (offline mode): {query!r}")
+            return cached[0]
+
+        if state == "fresh":
+            return cached[0]
+
+        if state == "stale":
+            if self._claim_refresh(key):
+                threading.Thread(
+                    target=self._refresh_sync, args=(key, source, query, fetch_fn), daemon=True
+                ).start()
+            return cached[0]
+
+        try:
+            value = fetch_fn()
+        except Exception as e:
+            if cached is not None:
+                logger.warning(f"{source} search failed, serving expired cache entry: {e}")
+                return cached[0]
+            raise
+        self.set(key, source, query, value)
+        return value
+
+    def _refresh_sync(self, key: str, source: str, query: str, fetch_fn):
+        try:
+            self.set(key, source, query, fetch_fn())
+        except Exception as e:
+            logger.warning(f"Background {source} refresh failed: {e}")
+        finally:
+            self._release_refresh(key)
+
+    async def afetch(self, source: str, query: str, fetch_fn, **params):
+        """Async counterpart of `fetch`; `fetch_fn` is a coroutine function."""
+        key = self.make_key(source, query, params)
+        cached = self.get(key)
+        state = self._classify(source, cached)
+
+        if self.offline:
+            if cached is None:
+                raise SearchCacheMiss(f"{source} query not cached (offline mode): {query!r}")
+            return cached[0]
+
+        if state == "fresh":
+            return cached[0]
+
+        if state == "stale":
+            if self._claim_refresh(key):
+                task = asyncio.create_task(self._refresh_async(key, source, query, fetch_fn))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return cached[0]
+
+        try:
+            value = await fetch_fn()
+        except Exception as e:
+            if cached is not None:
+                logger.warning(f"{source} search failed, serving expired cache entry: {e}")
+                return cached[0]
+            raise
+        self.set(key, source, query, value)
+        return value
+
+    async def _refresh_async(self, key: str, source: str, query: str, fetch_fn):
+        try:
+            self.set(key, source, query, await fetch_fn())
+        except Exception as e:
+            logger.warning(f"Background {source} refresh failed: {e}")
+        finally:
+            self._release_refresh(key)
@@ -0,0 +1,204 @@
+# backend/app/core/rag/snapshots.py
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict
+
+import faiss
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: single process, no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+READER_LOCK = "readers.lock"
+# Partition name for snapshots published before the store was partitioned
+UNPARTITIONED = ""
+
+
+class SnapshotManager:
+    """
+    Immutable, versioned index snapshots with an atomic CURRENT pointer.
+
+    Layout under `root`:
+        CURRENT            -> "v000007" (replaced atomically with os.replace)
+        v000007/           part-NNNN.faiss (one per partition), manifest.json, readers.lock
+        .writer.lock       exclusive flock held by whoever mutates the store
+        .compact.lock      exclusive flock held for a whole compaction / rebuild
+
+    A process serving a snapshot holds a shared flock on its readers.lock;
+    garbage collection deletes non-current snapshots only when it can take
+    that lock exclusively, i.e. when no process is still serving them.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.pointer = self.root / "CURRENT"
+
+    # ------------------------------------------------------------------
+    # Locks
+    # ------------------------------------------------------------------
+    def writer_lock(self):
+        """Serialize writers (adds, compactions, rebuilds) across processes."""
+        return file_lock(self.root / ".writer.lock")
+
+    def compact_lock(self):
+        """One compaction or rebuild at a time; held while building, unlike writer_lock."""
+        return file_lock(self.root / ".compact.lock")
+
+    def release(self, handle):
+        if handle is not None:
+            handle.close()  # closing drops the shared flock
+
+    # ------------------------------------------------------------------
+    # Read side
+    # ------------------------------------------------------------------
+    def current_version(self):
+        try:
+            return self.pointer.read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def path(self, version: str, filename: str = "") -> Path:
+        return self.root / version / filename
+
+    def acquire(self, retries: int = 5):
+        """
+        Pin and load the current snapshot.
+        Returns (version, {partition: index}, manifest, lock_handle); release the
+        handle when swapping away. Snapshots written before partitioning come back
+        as a single UNPARTITIONED index.
+        """
+        for _ in range(retries):
+            version = self.current_version()
+            if version is None:
+                return None
+            path = self.root / version
+            try:
+                handle = open(path / READER_LOCK, "r")
+            except FileNotFoundError:
+                continue  # garbage-collected between reading CURRENT and opening; retry
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_SH)
+            if not (path / "manifest.json").exists():
+                handle.close()
+                continue
+            manifest = json.loads((path / "manifest.json").read_text())
+            if "partitions" in manifest:
+                indexes = {
+                    name: faiss.read_index(str(path / info["file"]))
+                    for name, info in manifest["partitions"].items()
+                }
+            else:
+                indexes = {UNPARTITIONED: faiss.read_index(str(path / "index.faiss"))}
+            return version, indexes, manifest, handle
+        raise RuntimeError(f"Could not pin a snapshot under {self.root}")
+
+    # ------------------------------------------------------------------
+    # Write side (call under writer_lock)
+    # ------------------------------------------------------------------
+    def _next_version(self) -> str:
+        existing = [int(p.name[1:]) for p in self.root.glob("v*") if p.name[1:].isdigit()]
+        return f"v{max(existing, default=0) + 1:06d}"
+
+    def publish(self, indexes: Dict[str, faiss.Index], manifest: dict, reuse: Dict[str, Path] = None) -> str:
+        """
+        Write a new snapshot directory, then atomically repoint CURRENT at it.
+        Partitions listed in `reuse` are unchanged; their files are hard-linked
+        from the previous snapshot instead of being serialized again.
+        """
+        return self.commit(*self.stage(indexes, manifest, reuse))
+
+    def stage(self, indexes: Dict[str, faiss.Index], manifest: dict, reuse: Dict[str, Path] = None):
+        """
+        Serialize a snapshot into a temp directory without publishing it (no
+        writer lock needed). Returns (tmp_dir, manifest) for commit() or discard().
+        """
+        reuse = reuse or {}
+        tmp = self.root / f".tmp-{uuid.uuid4().hex}"
+        tmp.mkdir()
+        partitions = {}
+        for n, (name, index) in enumerate(sorted(indexes.items())):
+            filename = f"part-{n:04d}.faiss"
+            if name in reuse:
+                try:
+                    os.link(reuse[name], tmp / filename)
+                except OSError:
+                    shutil.copyfile(reuse[name], tmp / filename)
+            else:
+                faiss.write_index(index, str(tmp / filename))
+                _fsync_path(tmp / filename)
+            partitions[name] = {"file": filename, "ntotal": int(index.ntotal)}
+        (tmp / READER_LOCK).touch()
+        return tmp, {**manifest, "partitions": partitions}
+
+    def discard(self, tmp: Path):
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    def commit(self, tmp: Path, manifest: dict) -> str:
+        """Name a staged snapshot, then atomically repoint CURRENT at it (call under writer_lock)."""
+        version = self._next_version()
+        manifest = {**manifest, "version": version, "created_at": datetime.now(timezone.utc).isoformat()}
+        (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2))
+        _fsync_path(tmp / "manifest.json")
+        os.rename(tmp, self.root / version)
+
+        pointer_tmp = self.root / "CURRENT.tmp"
+        pointer_tmp.write_text(version)
+        _fsync_path(pointer_tmp)
+        os.replace(pointer_tmp, self.pointer)
+        _fsync_path(self.root)
+        logger.info(
+            f"Published index snapshot {version} ({manifest['ntotal']} vectors, "
+            f"{len(manifest['partitions'])} partitions)"
+        )
+        return version
+
+    def gc(self, max_tmp_age: float = 3600.0):
+        """Delete old snapshots no process is serving, plus abandoned temp dirs."""
+        if fcntl is None:
+            return
+        current = self.current_version()
+        for path in self.root.iterdir():
+            if path.name.startswith(".tmp-") and time.time() - path.stat().st_mtime > max_tmp_age:
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            if not path.is_dir() or not path.name.startswith("v") or path.name == current:
+                continue
+            try:
+                with open(path / READER_LOCK, "r") as f:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    shutil.rmtree(path, ignore_errors=True)
+                    logger.info(f"Garbage-collected index snapshot {path.name}")
+            except (BlockingIOError, FileNotFoundError):
+                continue
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Exclusive cross-process lock on `path` (a no-op where fcntl is unavailable)."""
+    with open(path, "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _fsync_path(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
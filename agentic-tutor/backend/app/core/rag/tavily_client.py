@@ -2,6 +2,8 @@
 import os
 from tavily import TavilyClient
 
+from .search_cache import SearchCache
+
 class TavilySearch:
     _client = None
 
@@ -16,6 +18,12 @@ class TavilySearch:
 
     @classmethod
     def search(cls, query: str, max_results: int = 3):
+        return SearchCache().fetch(
+            "tavily", query, lambda: cls._search_uncached(query, max_results), max_results=max_results
+        )
+
+    @classmethod
+    def _search_uncached(cls, query: str, max_results: int):
         client = cls.get_client()
         results = client.search(query, max_results=max_results)
-        return [r["content"] for r in results["results"]]
\ No newline at end of file
+        return [r["content"] for r in results["results"]]
@@ -1,35 +1,467 @@
 # backend/app/core/rag/vector_store.py
-from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.documents import Document
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 import logging
+import os
+import threading
+import time
+
+import faiss
+import numpy as np
+
+from .ann_index import (
+    INDEX_TYPE, VectorFile, build_index, configure_search, extract_vectors, index_ids, index_type_of,
+    is_compressed, search_with_rescore,
+)
+from .bm25_index import reciprocal_rank_fusion
+from .chunk_store import ChunkStore, partition_matches
+from .delta_log import DeltaLog
+from .snapshots import UNPARTITIONED, SnapshotManager
 
 logger = logging.getLogger(__name__)
 
+# "hybrid" = BM25 + dense fused with RRF, "dense" = FAISS similarity only
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")
+HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+# Delta rows that trigger a background merge into a new base index
+COMPACT_THRESHOLD = int(os.getenv("RAG_COMPACT_THRESHOLD", "5000"))
+# How often each process checks for snapshots / delta rows written elsewhere (0 = never)
+SNAPSHOT_POLL_SECONDS = float(os.getenv("RAG_SNAPSHOT_POLL_SECONDS", "5"))
+# Threads for searching several partitions at once (FAISS releases the GIL)
+PARTITION_SEARCH_THREADS = int(os.getenv("RAG_PARTITION_THREADS", "4"))
+
+STORE_PATH = Path(os.getenv("RAG_STORE_PATH", "./rag_data/store"))
+# LangChain FAISS.save_local layout (index.faiss + pickled docstore) used before ChunkStore
+LEGACY_PATH = Path("./rag_data/faiss_index")
+
 class VectorStore:
+    """
+    FAISS vectors + SQLite chunk store. Chunk row i owns vector id i, so a
+    search only reads text/metadata for the hits and nothing is unpickled.
+
+    The base is partitioned by chunk source (optionally source/topic): one
+    ID-mapped FAISS index per partition, so a filtered search only touches
+    the partitions it needs and several partitions are searched in parallel.
+
+    Writes never rewrite the base index: new vectors go to an fsync'd delta
+    log that is searched alongside the base, and a background compaction
+    periodically folds the delta into a new base snapshot.
+
+    Base indexes are immutable versioned snapshots behind an atomic CURRENT
+    pointer. Every process polls the pointer and the delta directory and
+    swaps in new state from a background thread; searches never take a lock.
+    """
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-            cls._instance.db_path = Path("./rag_data/faiss_index")
-            cls._instance.db_path.parent.mkdir(exist_ok=True)
+            # the same query is embedded for retrieval and again for context assembly
+            cls._instance.embed_query = lru_cache(maxsize=256)(cls._instance._embed_query)
+            cls._instance.db_path = STORE_PATH
+            cls._instance.vectors_path = cls._instance.db_path / "vectors.f32"
+            cls._instance.db_path.mkdir(parents=True, exist_ok=True)
+            cls._instance.snapshots = SnapshotManager(cls._instance.db_path / "snapshots")
+            cls._instance._write_lock = threading.Lock()
+            cls._instance._compact_lock = threading.Lock()
+            # guards swapping index/delta state (not held by searches)
+            cls._instance._swap_lock = threading.RLock()
+            cls._instance._pool = ThreadPoolExecutor(
+                max_workers=PARTITION_SEARCH_THREADS, thread_name_prefix="rag-partition"
+            )
             cls._instance._load_or_create()
+            cls._instance._start_poller()
         return cls._instance
 
     def _load_or_create(self):
-        if self.db_path.exists():
-            self.db = FAISS.load_local(self.db_path, self.embeddings, allow_dangerous_deserialization=True)
-            logger.info("Loaded existing FAISS index")
+        self.chunks = ChunkStore(self.db_path / "chunks.db")
+        self.version, self._pin, self.manifest = None, None, {}
+        with self.snapshots.writer_lock():
+            if self.snapshots.current_version() is None:
+                self._bootstrap()
+            self._pin_current()
+            if UNPARTITIONED in self.indexes:
+                self._partition_base()
+            logger.info(
+                f"Loaded FAISS snapshot {self.version} with {self.ntotal} vectors "
+                f"in {len(self.indexes)} partitions"
+            )
+
+            # Full-precision vectors on disk, memory-mapped for exact re-scoring
+            if self.vectors is None and self.ntotal:
+                if any(is_compressed(index) for index in self.indexes.values()):
+                    logger.warning("vectors.f32 missing or out of sync; compressed index will not be re-scored")
+                else:
+                    self.vector_file.write(self._extract_all())
+                    self._set_base(self.indexes, self.ntotal)
+
+            self._reload_delta(prune=True)
+            # Chunk rows are written before their vectors; repair an interrupted add
+            total = self.delta.next_id
+            if self.chunks.count() > total:
+                logger.warning("Chunk store ahead of vectors (interrupted write); truncating")
+                self.chunks.truncate(total)
+            elif self.chunks.count() < total:
+                self.delta.truncate(self.chunks.count() - self.ntotal)
+                self._delta_sig = self.delta.signature()
+            if len(self.delta):
+                logger.info(f"Replayed {len(self.delta)} uncompacted vectors from the delta log")
+
+        if self.indexes:
+            largest = max(self.indexes.values(), key=lambda index: index.ntotal)
+            if index_type_of(largest) != INDEX_TYPE:
+                logger.warning(
+                    f"Loaded a {index_type_of(largest)} index but RAG_INDEX_TYPE={INDEX_TYPE}; "
+                    "run `python -m backend.app.core.rag.build_index` to rebuild it"
+                )
+
+    def _bootstrap(self):
+        """Publish the first snapshot: the pre-snapshot store/index.faiss if present, else an empty store."""
+        flat_file = self.db_path / "index.faiss"
+        if flat_file.exists():
+            index = faiss.read_index(str(flat_file))
+            # partitioned right after pinning, see _partition_base
+            self.snapshots.publish({UNPARTITIONED: index}, {"ntotal": int(index.ntotal), "dim": index.d})
+            flat_file.unlink()
+            return
+        if (LEGACY_PATH / "index.pkl").exists():
+            logger.warning(
+                f"Found a legacy pickled index at {LEGACY_PATH}; import it with "
+                "`python -m backend.app.core.rag.build_index --migrate-legacy`"
+            )
+        dim = len(self.embeddings.embed_query("dimension probe"))
+        self.snapshots.publish({}, {"ntotal": 0, "dim": dim})
+        logger.info("Created new FAISS index")
+
+    def _partition_base(self):
+        """Split a single-index snapshot into per-partition indexes of the same type."""
+        index = self.indexes[UNPARTITIONED]
+        if len(self.vector_file) >= index.ntotal:
+            vectors = self.vector_file.open(rows=index.ntotal)
+        else:
+            vectors = extract_vectors(index)
+        index_type = index_type_of(index)
+        indexes = {
+            part: build_index(index_type, vectors[ids], ids=ids)
+            for part, ids in self.chunks.partition_ids(0, index.ntotal).items()
+        }
+        self._publish(indexes, index.ntotal)
+        self._pin_current()
+        logger.info(f"Partitioned the base index into {sorted(indexes)}")
+
+    def _publish(self, indexes: dict, ntotal: int, reuse: dict = None) -> str:
+        return self.snapshots.publish(indexes, {"ntotal": int(ntotal), "dim": self.dim}, reuse=reuse)
+
+    def _pin_current(self):
+        """Load the snapshot CURRENT points at and hold a reader lease on it."""
+        version, indexes, manifest, handle = self.snapshots.acquire()
+        for index in indexes.values():
+            configure_search(index)
+        self.dim = manifest["dim"]
+        self.vector_file = VectorFile(self.vectors_path, self.dim)
+        self._set_base(indexes, manifest["ntotal"])
+        old, self.version, self.manifest, self._pin = self._pin, version, manifest, handle
+        self.snapshots.release(old)
+
+    def _set_base(self, indexes: dict, ntotal: int):
+        """Swap in new base indexes; searches read the (indexes, vectors) pair atomically."""
+        # vectors.f32 is shared and append-only; each snapshot maps just its own rows
+        in_sync = len(self.vector_file) >= ntotal
+        vectors = self.vector_file.open(rows=ntotal) if in_sync else None
+        self.indexes = indexes
+        self.ntotal = ntotal
+        self.vectors = vectors
+        self._base = (indexes, vectors)
+
+    def _extract_all(self) -> np.ndarray:
+        """Reassemble the id-ordered vector matrix from the partition indexes."""
+        vectors = np.zeros((self.ntotal, self.dim), dtype="float32")
+        for index in self.indexes.values():
+            vectors[index_ids(index)] = extract_vectors(index)
+        return vectors
+
+    def _reload_delta(self, prune: bool = False):
+        self.delta = DeltaLog(self.db_path / "delta", self.dim, self.ntotal, prune=prune)
+        self._delta_sig = self.delta.signature()
+
+    def refresh(self) -> bool:
+        """Pick up snapshots and delta rows written by other processes. Cheap when nothing changed."""
+        with self._swap_lock:
+            version = self.snapshots.current_version()
+            if version and version != self.version:
+                previous = self.version
+                self._pin_current()
+                self._reload_delta()
+                logger.info(f"Swapped FAISS snapshot {previous} -> {self.version}")
+                return True
+            if self.delta.signature() != self._delta_sig:
+                self._reload_delta()
+                return True
+        return False
+
+    def _start_poller(self):
+        if SNAPSHOT_POLL_SECONDS <= 0:
+            return
+        threading.Thread(target=self._poll_loop, daemon=True, name="rag-snapshot-poll").start()
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(SNAPSHOT_POLL_SECONDS)
+            try:
+                if self.refresh():
+                    self.snapshots.gc()
+            except Exception as e:
+                logger.error(f"Snapshot refresh failed: {e}")
+
+    def add_texts(self, texts: list[str], metadatas: list[dict] = None) -> list[int]:
+        vectors = np.array(self.embeddings.embed_documents(texts), dtype="float32")
+        return self._add_embedded(texts, vectors, metadatas)
+
+    def _add_embedded(self, texts: list[str], vectors: np.ndarray, metadatas: list[dict] = None) -> list[int]:
+        """Durable append: chunk rows, then fsync'd delta vectors. Cost is O(len(texts))."""
+        with self._write_lock, self.snapshots.writer_lock(), self._swap_lock:
+            self.refresh()  # another process may have appended or compacted
+            ids = self.chunks.add(self.delta.next_id, texts, metadatas)
+            self.delta.append(vectors)
+            self._delta_sig = self.delta.signature()
+        if len(self.delta) >= COMPACT_THRESHOLD:
+            self.compact_async()
+        return ids
+
+    def remove_file(self, file: str) -> int:
+        """Tombstone a source file's chunks (e.g. before re-ingesting a changed file)."""
+        removed = self.chunks.tombstone_file(file)
+        if removed:
+            logger.info(f"Tombstoned {removed} chunks of {file}")
+        return removed
+
+    def compact_async(self):
+        if self._compact_lock.locked():
+            return
+        threading.Thread(target=self.compact, daemon=True).start()
+
+    def compact(self):
+        """
+        Merge the sealed delta log into a new base snapshot and swap it in.
+        The writer lock is held only to seal the delta and, after the new
+        partitions are built and written, to commit the snapshot and drop
+        the sealed segments; adds go on meanwhile into a fresh segment.
+        """
+        with self._compact_lock, self.snapshots.compact_lock():
+            with self.snapshots.writer_lock():
+                self.refresh()
+                sealed = self.delta.seal()
+                if not sealed:
+                    return
+                self._delta_sig = self.delta.signature()
+                version, manifest, base_indexes, base_total = self.version, self.manifest, self.indexes, self.ntotal
+
+            first = sealed[0].start
+            vectors = np.vstack([s.vectors for s in sealed])
+            # only partitions that received rows are copied and re-serialized
+            indexes = dict(base_indexes)
+            new_type = INDEX_TYPE
+            if indexes:
+                new_type = index_type_of(max(indexes.values(), key=lambda index: index.ntotal))
+            touched = self.chunks.partition_ids(first, first + len(vectors))
+            for part, ids in touched.items():
+                rows = vectors[ids - first]
+                if part in indexes:
+                    # copy-on-write: readers keep using the old base until the swap
+                    merged = faiss.deserialize_index(faiss.serialize_index(indexes[part]))
+                    configure_search(merged)
+                    merged.add_with_ids(rows, ids)
+                else:
+                    merged = build_index(new_type, rows, ids=ids)
+                indexes[part] = merged
+            reuse = {
+                part: self.snapshots.path(version, manifest["partitions"][part]["file"])
+                for part in indexes if part not in touched
+            }
+            # rows past the base are left over from a compaction that died before publishing
+            if len(self.vector_file) > base_total:
+                self.vector_file.truncate(base_total)
+            if len(self.vector_file) == base_total:
+                self.vector_file.append(vectors)
+            staged = self.snapshots.stage(indexes, {"ntotal": base_total + len(vectors), "dim": self.dim}, reuse)
+
+            with self.snapshots.writer_lock():
+                if self.snapshots.current_version() != version:
+                    # another writer published meanwhile; the sealed rows are merged next time
+                    self.snapshots.discard(staged[0])
+                    logger.warning(f"Snapshot moved past {version} during compaction; discarded the merge")
+                    return
+                self.snapshots.commit(*staged)
+                with self._swap_lock:
+                    self._pin_current()
+                    self._reload_delta()
+                    self.delta.drop(sealed)
+                    self._delta_sig = self.delta.signature()
+            logger.info(
+                f"Compacted {len(vectors)} delta vectors into {sorted(touched)}; base now {self.ntotal}"
+            )
+            self.snapshots.gc()
+
+    def rebuild_index(self, index_type: str = None, nlist: int = None):
+        """Rebuild every partition (any INDEX_TYPES entry) from the stored vectors and publish it."""
+        self.compact()
+        with self._compact_lock, self.snapshots.compact_lock():
+            with self.snapshots.writer_lock():
+                self.refresh()
+                if self.ntotal == 0:
+                    return
+                if len(self.vector_file) >= self.ntotal:
+                    vectors = self.vector_file.open(rows=self.ntotal)
+                else:
+                    vectors = self._extract_all()
+                    self.vector_file.write(vectors)
+                dead = self.chunks.dead_ids()
+                indexes = {}
+                for part, index in self.indexes.items():
+                    ids = np.sort(index_ids(index))
+                    # tombstoned chunks are dropped for good here
+                    ids = ids[~np.isin(ids, dead)]
+                    if len(ids):
+                        indexes[part] = build_index(index_type or INDEX_TYPE, vectors[ids], nlist=nlist, ids=ids)
+                self._publish(indexes, self.ntotal)
+                with self._swap_lock:
+                    self._pin_current()
+                self.chunks.mark_purged(dead)
+            self.snapshots.gc()
+        types = sorted({index_type_of(index) for index in self.indexes.values()})
+        logger.info(f"Rebuilt FAISS partitions as {types} with {self.ntotal} vectors")
+
+    def migrate_legacy(self, legacy_path: Path = LEGACY_PATH) -> int:
+        """
+        One-off import of a LangChain FAISS directory. This is the only place the
+        pickled docstore is still deserialized — run it on trusted local data only.
+        A directory already imported is skipped, so re-running it adds nothing.
+        """
+        from langchain_community.vectorstores import FAISS
+
+        marker = f"legacy:{Path(legacy_path).resolve()}"
+        done = self.chunks.get_state([marker]).get(marker)
+        if done is not None:
+            logger.info(f"{legacy_path} was already migrated ({done} chunks); skipping")
+            return 0
+
+        legacy = FAISS.load_local(legacy_path, self.embeddings, allow_dangerous_deserialization=True)
+        vectors = extract_vectors(legacy.index)
+        texts, metadatas, keep = [], [], []
+        for pos in range(legacy.index.ntotal):
+            doc = legacy.docstore.search(legacy.index_to_docstore_id[pos])
+            # skip the "initial" placeholder the old store seeded itself with
+            if not hasattr(doc, "page_content") or (doc.page_content == "initial" and not doc.metadata):
+                continue
+            texts.append(doc.page_content)
+            metadatas.append(doc.metadata)
+            keep.append(pos)
+        if keep:
+            self._add_embedded(texts, vectors[keep], metadatas)
+            self.compact()
+        self.chunks.set_state({marker: str(len(keep))})
+        logger.info(f"Migrated {len(keep)} chunks from {legacy_path}")
+        return len(keep)
+
+    def get_documents(self, ids: list[int]) -> list[Document]:
+        """Fetch chunk rows for the given ids, preserving order. Document.id is the chunk id."""
+        rows = self.chunks.get(ids)
+        return [Document(id=str(i), page_content=rows[i][0], metadata=rows[i][1]) for i in ids if i in rows]
+
+    def get_vectors(self, ids: list[int]) -> np.ndarray:
+        """Stored embeddings for chunk ids (base memmap or delta), without re-embedding."""
+        indexes, vectors = self._base
+        delta = {start: rows for start, rows in self.delta.snapshot()}
+        out = np.zeros((len(ids), self.dim), dtype="float32")
+        for row, doc_id in enumerate(int(i) for i in ids):
+            if doc_id < self.ntotal and vectors is not None and doc_id < len(vectors):
+                out[row] = vectors[doc_id]
+                continue
+            for start, rows in delta.items():
+                if start <= doc_id < start + len(rows):
+                    out[row] = rows[doc_id - start]
+                    break
+            else:
+                for index in indexes.values():
+                    try:
+                        out[row] = index.reconstruct(doc_id)  # IndexIDMap2 looks up by id
+                        break
+                    except RuntimeError:
+                        continue
+        return out
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        vec = np.array(self.embeddings.embed_query(query), dtype="float32")
+        vec.setflags(write=False)  # shared by the LRU cache
+        return vec
+
+    def search(self, query: str, k: int = 5, mode: str = None, partitions: list[str] = None):
+        """
+        Top-k chunks for the query. `partitions` limits the search to those
+        sources (e.g. ["curriculum"]); "curriculum" also covers "curriculum/<topic>".
+        """
+        if (mode or RETRIEVAL_MODE) == "dense":
+            return self.get_documents(self._dense_ids(query, k, partitions))
+        return self.hybrid_search(query, k=k, partitions=partitions)
+
+    def hybrid_search(self, query: str, k: int = 5, candidates: int = HYBRID_CANDIDATES,
+                      partitions: list[str] = None):
+        """Reciprocal-rank fusion of dense (FAISS) and sparse (FTS5 BM25) candidate lists."""
+        dense_ids = self._dense_ids(query, candidates, partitions)
+        sparse_ids = self.chunks.search_text(query, candidates, partitions=partitions)
+        fused = reciprocal_rank_fusion([dense_ids, sparse_ids], k=RRF_K)[:k]
+        return self.get_documents(fused)
+
+    def _dense_ids(self, query: str, k: int, partitions: list[str] = None) -> list[int]:
+        """Top-k live ids; tombstoned chunks still in an index are over-fetched past and dropped."""
+        dead = self.chunks.tombstoned()
+        fetch = k
+        while True:
+            ids = self._dense_candidates(query, fetch, partitions)
+            if not dead:
+                return ids
+            live = self.chunks.live(ids)
+            if len(live) >= k or len(ids) < fetch or fetch >= k + dead:
+                return live[:k]
+            fetch = min(fetch * 2, k + dead)
+
+    def _dense_candidates(self, query: str, k: int, partitions: list[str] = None) -> list[int]:
+        vec = self.embed_query(query)
+        indexes, vectors = self._base
+        selected = [
+            index for part, index in indexes.items()
+            if not partitions or partition_matches(part, partitions)
+        ]
+
+        def search_partition(index):
+            # Compressed codes only shortlist; exact distances come from the memmap
+            return search_with_rescore(index, vectors if is_compressed(index) else None, vec, k)
+
+        if len(selected) > 1:
+            results = list(self._pool.map(search_partition, selected))
         else:
-            self.db = FAISS.from_texts(["initial"], self.embeddings)
-            self.db.save_local(self.db_path)
-            logger.info("Created new FAISS index")
+            results = [search_partition(index) for index in selected]
 
-    def add_texts(self, texts: list[str], metadatas: list[dict] = None):
-        self.db.add_texts(texts, metadatas)
-        self.db.save_local(self.db_path)
+        snapshot = self.delta.snapshot()
+        allowed = None
+        if partitions and snapshot:
+            allowed = self.chunks.ids_in_partitions(partitions, min_id=snapshot[0][0])
+        results.append(DeltaLog.search(snapshot, vec, k, allowed))
 
-    def search(self, query: str, k: int = 5):
-        return self.db.similarity_search(query, k=k)
\ No newline at end of file
+        # Merge by distance; a row can briefly appear in both right after a compaction
+        dists = np.concatenate([d for d, _ in results])
+        cands = np.concatenate([i for _, i in results])
+        ids, seen = [], set()
+        for pos in np.argsort(dists):
+            doc_id = int(cands[pos])
+            if doc_id not in seen:
+                seen.add(doc_id)
+                ids.append(doc_id)
+            if len(ids) == k:
+                break
+        return ids
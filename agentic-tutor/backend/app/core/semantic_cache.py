@@ -0,0 +1,242 @@
+# backend/app/core/semantic_cache.py
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_PATH = Path(os.getenv("SEMANTIC_CACHE_PATH", "./rag_data/semantic_cache.db"))
+# Cosine similarity (MiniLM, normalized) needed to reuse a prior output
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", str(7 * 24 * 3600)))
+# Entries kept across all keys; least recently used go first
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+# Neighbours checked per lookup, so an expired nearest one doesn't hide a fresh one
+LOOKUP_CANDIDATES = 4
+# How often each process drops index entries another worker evicted
+RECONCILE_SECONDS = 60.0
+# Agent goals whose outputs may be reused; empty disables the cache
+SEMANTIC_CACHE_GOALS = {
+    g.strip() for g in os.getenv("SEMANTIC_CACHE_GOALS", "teach_topic,generate_questions").split(",") if g.strip()
+}
+
+
+def normalize_topic(topic: str) -> str:
+    """"Eigenvalues & Eigenvectors!" -> "eigenvalues and eigenvectors"."""
+    text = topic.lower().replace("&", " and ")
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def profile_bucket(profile: Dict[str, Any], topic: str) -> str:
+    """Coarse learner level for the topic: new / low / mid / high."""
+    mastery = (profile or {}).get("mastery_map") or {}
+    if topic not in mastery:
+        return "new"
+    score = float(mastery[topic] or 0.0)
+    if score < 0.4:
+        return "low"
+    return "mid" if score < 0.75 else "high"
+
+
+class SemanticCache:
+    """
+    Reuse agent outputs for near-identical requests.
+
+    A request is split into an exact key (goal, learner bucket, question mix...)
+    that must match and a free-text part (the topic) that is embedded. Each
+    exact key gets a small in-memory FAISS inner-product index over normalized
+    embeddings; the nearest neighbour above the threshold and within the TTL
+    is a hit. Entries persist in SQLite, and rows written by other workers are
+    picked up on the next miss. Expired rows are purged and the table is
+    capped at SEMANTIC_CACHE_MAX_ENTRIES (least recently used evicted), and
+    the indexes drop the same entries, so both stay small.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.path = SEMANTIC_CACHE_PATH
+            cls._instance.threshold = SEMANTIC_CACHE_THRESHOLD
+            cls._instance.ttl = SEMANTIC_CACHE_TTL
+            cls._instance.goals = set(SEMANTIC_CACHE_GOALS)
+            cls._instance.max_entries = SEMANTIC_CACHE_MAX_ENTRIES
+            cls._instance._lock = threading.Lock()
+            cls._instance._indexes = {}
+            cls._instance._entries = {}  # row id -> (index key, created_at)
+            cls._instance._last_id = 0
+            cls._instance._reconciled = time.time()
+            cls._instance._init_db()
+        return cls._instance
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def _init_db(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS semantic_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    goal TEXT NOT NULL,
+                    exact_key TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(semantic_cache)")}
+            if "last_used" not in columns:
+                conn.execute("ALTER TABLE semantic_cache ADD COLUMN last_used REAL")
+                conn.execute("UPDATE semantic_cache SET last_used = created_at")
+            conn.execute("CREATE INDEX IF NOT EXISTS semantic_cache_created ON semantic_cache (created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS semantic_cache_used ON semantic_cache (last_used)")
+            self._purge(conn)
+
+    def _purge(self, conn: sqlite3.Connection) -> int:
+        """Delete expired rows, then the least recently used beyond the size cap."""
+        expired = conn.execute("DELETE FROM semantic_cache WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+        evicted = conn.execute(
+            "DELETE FROM semantic_cache WHERE id IN "
+            "(SELECT id FROM semantic_cache ORDER BY last_used DESC, id DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        return expired + evicted
+
+    def enabled(self, goal: str) -> bool:
+        return goal in self.goals
+
+    def _embed(self, text: str) -> np.ndarray:
+        # share the process-wide MiniLM model (and its query LRU) with retrieval
+        from backend.app.core.rag.vector_store import VectorStore
+
+        vec = np.array(VectorStore().embed_query(text), dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vec)
+        return vec
+
+    def _sync(self, purge: bool = False):
+        """
+        Index rows added since the last sync (by this or another worker) and
+        drop expired entries. With `purge` (after a store) the table is also
+        trimmed; entries other workers deleted are dropped every RECONCILE_SECONDS.
+        """
+        now = time.time()
+        live = None
+        with self._connect() as conn:
+            purged = self._purge(conn) if purge else 0
+            rows = conn.execute(
+                "SELECT id, goal, exact_key, vector, created_at FROM semantic_cache "
+                "WHERE id > ? AND created_at >= ? ORDER BY id",
+                (self._last_id, now - self.ttl),
+            ).fetchall()
+            if purged or now - self._reconciled > RECONCILE_SECONDS:
+                live = {row_id for (row_id,) in conn.execute("SELECT id FROM semantic_cache")}
+                self._reconciled = now
+        with self._lock:
+            for row_id, goal, exact_key, blob, created_at in rows:
+                if row_id <= self._last_id:
+                    continue
+                vec = np.frombuffer(blob, dtype="float32").reshape(1, -1)
+                index = self._indexes.get((goal, exact_key))
+                if index is None:
+                    index = faiss.IndexIDMap2(faiss.IndexFlatIP(vec.shape[1]))
+                    self._indexes[(goal, exact_key)] = index
+                index.add_with_ids(vec, np.array([row_id], dtype="int64"))
+                self._entries[row_id] = ((goal, exact_key), created_at)
+                self._last_id = row_id
+            stale = [
+                row_id for row_id, (_, created_at) in self._entries.items()
+                if now - created_at > self.ttl or (live is not None and row_id not in live)
+            ]
+            self._forget(stale)
+
+    def _forget(self, row_ids):
+        """Remove entries from their indexes (call under _lock); empty indexes are dropped."""
+        by_key = {}
+        for row_id in row_ids:
+            entry = self._entries.pop(row_id, None)
+            if entry is not None:
+                by_key.setdefault(entry[0], []).append(row_id)
+        for key, ids in by_key.items():
+            index = self._indexes[key]
+            index.remove_ids(np.array(ids, dtype="int64"))
+            if index.ntotal == 0:
+                del self._indexes[key]
+
+    def _nearest(self, goal: str, exact_key: str, vec: np.ndarray):
+        """Up to LOOKUP_CANDIDATES (row id, score) pairs above the threshold, best first."""
+        with self._lock:
+            index = self._indexes.get((goal, exact_key))
+            if index is None or index.ntotal == 0:
+                return []
+            scores, ids = index.search(vec, min(LOOKUP_CANDIDATES, index.ntotal))
+        return [(int(i), float(score)) for i, score in zip(ids[0], scores[0]) if i >= 0 and score >= self.threshold]
+
+    def _first_fresh(self, goal: str, exact_key: str, vec: np.ndarray):
+        """The best candidate that is unexpired and still stored; stale ones are dropped on the way."""
+        stale = []
+        found = None
+        with self._connect() as conn:
+            for row_id, score in self._nearest(goal, exact_key, vec):
+                row = conn.execute(
+                    "SELECT request, payload, created_at FROM semantic_cache WHERE id = ?", (row_id,)
+                ).fetchone()
+                if row is None or time.time() - row[2] > self.ttl:
+                    stale.append(row_id)
+                    continue
+                conn.execute("UPDATE semantic_cache SET last_used = ? WHERE id = ?", (time.time(), row_id))
+                found = (score, row)
+                break
+        if stale:
+            with self._lock:
+                self._forget(stale)
+        return found
+
+    def lookup(self, goal: str, request: str, exact_key: str = "") -> Optional[Dict[str, Any]]:
+        """Prior output for a semantically equivalent request, or None."""
+        if not self.enabled(goal):
+            return None
+        vec = self._embed(request)
+        found = self._first_fresh(goal, exact_key, vec)
+        if found is None:
+            self._sync()
+            found = self._first_fresh(goal, exact_key, vec)
+        if found is None:
+            return None
+        score, (cached_request, payload, _) = found
+        logger.info(f"Semantic cache hit for {goal}: '{request}' ~ '{cached_request}' ({score:.3f})")
+        return json.loads(payload)
+
+    def store(self, goal: str, request: str, payload: Dict[str, Any], exact_key: str = ""):
+        if not self.enabled(goal):
+            return
+        vec = self._embed(request)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO semantic_cache (goal, exact_key, request, vector, payload, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (goal, exact_key, request, vec.tobytes(), json.dumps(payload, default=str), now, now),
+            )
+        self._sync(purge=True)
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM semantic_cache")
+        with self._lock:
+            self._indexes.clear()
+            self._entries.clear()
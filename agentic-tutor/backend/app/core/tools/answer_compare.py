@@ -0,0 +1,318 @@
+# backend/app/core/tools/answer_compare.py
+import hashlib
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Tolerances for numeric entries (student answers are often rounded decimals)
+ANSWER_RTOL = float(os.getenv("ANSWER_RTOL", "1e-6"))
+ANSWER_ATOL = float(os.getenv("ANSWER_ATOL", "1e-9"))
+# Relative error a decimal answer may have and still be put down to rounding (0.333 for 1/3)
+ROUNDING_RTOL = float(os.getenv("ROUNDING_RTOL", "1e-2"))
+
+# elementwise: same shape, same entries      set: order and repeats ignored
+# multiset: order ignored, repeats count     scale: vectors equal up to a nonzero multiple
+MODES = ("elementwise", "set", "multiset", "scale")
+
+# Prefixes the question generator uses for expected solutions
+_KIND = re.compile(r"^\s*(eigenvals|eigenvects|charpoly)\s*(?:\(\s*\))?\s*:\s*", re.I)
+_WRAPPER = re.compile(r"^\s*matrix\s*\((.*)\)\s*$", re.I | re.S)
+_EIGENVAL_PAIR = re.compile(r"([^{},:]+):\s*(\d+)")
+_NUMBER_CHARS = re.compile(r"^[0-9.eE+\-/ji]+$")
+# "2*i" / "3*j": the only product parse_number folds itself
+_IMAG_PRODUCT = re.compile(r"\*(?=[ij]$)")
+_BARE_ROW = re.compile(r"[-+]?[\w.]+(?:\s+[-+]?[\w.]+)+")
+
+
+def split_kind(text: str) -> Tuple[Optional[str], str]:
+    """'eigenvals(): {3:1}' -> ('eigenvals', '{3:1}'); plain answers -> (None, text)."""
+    match = _KIND.match(text or "")
+    if match is None:
+        return None, text or ""
+    return match.group(1).lower(), text[match.end():]
+
+
+def question_hash(question: Dict[str, Any]) -> str:
+    """Content hash of everything that determines how a question is graded."""
+    content = {k: question.get(k) for k in ("type", "prompt", "expected_solution", "rubric", "answer_mode")}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+def answer_mode(question: Dict[str, Any], expected: str = "") -> str:
+    """Comparison semantics for a question: explicit `answer_mode`, else inferred from the expected form and wording."""
+    explicit = question.get("answer_mode")
+    if explicit in MODES:
+        return explicit
+    kind, _ = split_kind(expected or question.get("expected_solution", ""))
+    if kind == "eigenvects":
+        return "scale"
+    if kind == "eigenvals":
+        return "multiset"
+    text = f"{question.get('concept', '')} {question.get('prompt', '')}".lower()
+    if "eigenvector" in text:
+        return "scale"
+    if "eigenvalue" in text:
+        return "set" if "distinct" in text else "multiset"
+    return "elementwise"
+
+
+def parse_number(token: str) -> Optional[complex]:
+    """
+    '3', '-0.5', '1/3', '2+3i', '2+3*I', '1e-3' -> number; anything symbolic,
+    and any other product ("2*3"), -> None so the SymPy path evaluates it.
+    """
+    t = _IMAG_PRODUCT.sub("", token.replace(" ", "").replace("I", "i"))
+    if not t or not _NUMBER_CHARS.match(t):
+        return None
+    if t.endswith("i"):
+        t = t[:-1] + "j"
+    try:
+        if "/" in t:
+            num, den = t.split("/", 1)
+            value = complex(float(num) / float(den))
+        else:
+            value = complex(t)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return value if np.isfinite(value) else None
+
+
+def _structure(text: str) -> Optional[list]:
+    """
+    Split bracketed text into nested lists of entry strings. Parentheses that
+    follow a name (sqrt(2)) stay inside the entry; other brackets are lists.
+    """
+    stack: List[list] = [[]]
+    buf: List[str] = []
+    depth = 0
+
+    def flush():
+        entry = "".join(buf).strip()
+        buf.clear()
+        if entry:
+            # MATLAB-style "[1 2 3]" rows
+            stack[-1].extend(entry.split() if _BARE_ROW.fullmatch(entry) else [entry])
+
+    for ch in text:
+        if depth == 0 and ch in "[{(" and not (ch == "(" and buf and (buf[-1].isalnum() or buf[-1] == "_")):
+            if "".join(buf).strip():
+                return None
+            buf.clear()
+            stack[-1].append([])
+            stack.append(stack[-1][-1])
+        elif depth == 0 and ch in "]})":
+            flush()
+            if len(stack) == 1:
+                return None
+            stack.pop()
+        elif depth == 0 and ch == ",":
+            flush()
+        else:
+            buf.append(ch)
+            depth += (ch == "(") - (ch == ")")
+    flush()
+    if len(stack) != 1 or depth != 0:
+        return None
+    data = stack[0]
+    while len(data) == 1 and isinstance(data[0], list):
+        data = data[0]
+    return data
+
+
+def _map(data, fn):
+    if isinstance(data, list):
+        out = [_map(x, fn) for x in data]
+        return None if any(x is None for x in out) else out
+    return fn(data)
+
+
+def flatten(data) -> list:
+    if isinstance(data, list):
+        return [y for x in data for y in flatten(x)]
+    return [data]
+
+
+def shape_signature(data) -> str:
+    """Nesting of a parsed answer without its values: [[1, 2], [3, 4]] -> "[[,],[,]]"."""
+    if isinstance(data, list):
+        return "[" + ",".join(shape_signature(x) for x in data) + "]"
+    return ""
+
+
+def parse_answer(text: str, parse_scalar: Callable[[str], Any] = parse_number) -> Optional[list]:
+    """
+    Parse a matrix / vector / list answer into nested lists of scalars.
+    Returns None when any entry can't be parsed by `parse_scalar` (so the
+    default NumPy path rejects symbolic entries). eigenvals() dicts expand to
+    a flat list with multiplicities; eigenvects() to a list of vectors.
+    """
+    kind, body = split_kind(text)
+
+    def scalar(token):
+        try:
+            return parse_scalar(token)
+        except Exception:
+            return None
+
+    if kind == "eigenvals":
+        values = []
+        for key, mult in _EIGENVAL_PAIR.findall(body):
+            value = scalar(key.strip())
+            if value is None:
+                return None
+            values.extend([value] * int(mult))
+        return values or None
+
+    wrapped = _WRAPPER.match(body)
+    if wrapped:
+        body = wrapped.group(1)
+    body = body.strip()
+    if body and body[0] not in "[{(" and re.search(r"[;\n]", body):
+        # "1 2; 3 4" / one row per line
+        rows = [r for r in re.split(r"[;\n]", body) if r.strip()]
+        body = "[" + ",".join(f"[{r}]" for r in rows) + "]"
+    data = _structure(body)
+    if data is None:
+        return None
+
+    if kind == "eigenvects":
+        # [(value, multiplicity, [v1, v2...]), ...] -> [v1, v2, ...]
+        vectors = []
+        for item in data:
+            if not isinstance(item, list) or len(item) != 3 or not isinstance(item[2], list):
+                return None
+            basis = item[2] if all(isinstance(v, list) for v in item[2]) else [item[2]]
+            vectors.extend(flatten(v) for v in basis)
+        data = vectors
+    return _map(data, scalar)
+
+
+# ----------------------------------------------------------------------
+# NumPy comparison (all entries numeric)
+# ----------------------------------------------------------------------
+def _close(a, b, rtol: float = ANSWER_RTOL) -> np.ndarray:
+    return np.abs(a - b) <= ANSWER_ATOL + rtol * np.maximum(np.abs(a), np.abs(b))
+
+
+def _match(ok: np.ndarray) -> bool:
+    """Greedy one-to-one pairing of rows with columns in a boolean "close" matrix."""
+    if ok.shape[0] != ok.shape[1]:
+        return False
+    used = np.zeros(ok.shape[1], dtype=bool)
+    for row in ok:
+        free = np.flatnonzero(row & ~used)
+        if free.size == 0:
+            return False
+        used[free[0]] = True
+    return True
+
+
+def _unique(values: np.ndarray, rtol: float = ANSWER_RTOL) -> np.ndarray:
+    kept = []
+    for v in values:
+        if not any(_close(v, k, rtol) for k in kept):
+            kept.append(v)
+    return np.array(kept, dtype=complex)
+
+
+def _vector_sets(data) -> List[np.ndarray]:
+    """Candidate vector lists: a single vector, or the rows and the columns of a 2-D answer."""
+    arr = np.array(data, dtype=complex)
+    if arr.ndim == 1:
+        return [arr[None, :]]
+    if arr.ndim != 2:
+        return []
+    return [arr, arr.T]
+
+
+def _parallel(s: np.ndarray, e: np.ndarray, rtol: float = ANSWER_RTOL) -> np.ndarray:
+    """|cos| between every student and expected vector is 1 (zero vectors never match)."""
+    ns = np.linalg.norm(s, axis=1)
+    ne = np.linalg.norm(e, axis=1)
+    cos = np.abs(s.conj() @ e.T) / np.maximum(np.outer(ns, ne), 1e-300)
+    return (cos >= 1 - rtol) & (ns[:, None] > ANSWER_ATOL) & (ne[None, :] > ANSWER_ATOL)
+
+
+def compare_numeric(student, expected, mode: str = "elementwise", rtol: float = ANSWER_RTOL) -> bool:
+    """`rtol` loosens the entry tolerance (ROUNDING_RTOL to ask "equal up to rounding?")."""
+    try:
+        if mode in ("set", "multiset"):
+            s = np.array(flatten(student), dtype=complex)
+            e = np.array(flatten(expected), dtype=complex)
+            if mode == "set":
+                s, e = _unique(s, rtol), _unique(e, rtol)
+            return s.size == e.size and _match(_close(s[:, None], e[None, :], rtol))
+        if mode == "scale":
+            e_sets = _vector_sets(expected)
+            if not e_sets:
+                return False
+            e = e_sets[0]
+            return any(s.shape == e.shape and _match(_parallel(s, e, rtol)) for s in _vector_sets(student))
+        s = np.squeeze(np.array(student, dtype=complex))
+        e = np.squeeze(np.array(expected, dtype=complex))
+        return s.shape == e.shape and bool(np.all(_close(s, e, rtol)))
+    except ValueError:  # ragged nesting
+        return False
+
+
+# ----------------------------------------------------------------------
+# Generic comparison (symbolic entries, caller supplies equality)
+# ----------------------------------------------------------------------
+def _match_items(s: list, e: list, equal: Callable[[Any, Any], bool]) -> bool:
+    if len(s) != len(e):
+        return False
+    unused = list(range(len(e)))
+    for a in s:
+        hit = next((j for j in unused if equal(a, e[j])), None)
+        if hit is None:
+            return False
+        unused.remove(hit)
+    return True
+
+
+def _dedupe(values: list, equal) -> list:
+    kept = []
+    for v in values:
+        if not any(equal(v, k) for k in kept):
+            kept.append(v)
+    return kept
+
+
+def _rows(data) -> List[list]:
+    if all(not isinstance(x, list) for x in data):
+        return [data]
+    return [flatten(x) for x in data]
+
+
+def compare_items(student, expected, mode: str, equal: Callable[[Any, Any], bool],
+                  is_zero: Callable[[Any], bool]) -> bool:
+    """Same semantics as compare_numeric for entries NumPy can't evaluate (e.g. SymPy expressions)."""
+    if mode in ("set", "multiset"):
+        s, e = flatten(student), flatten(expected)
+        if mode == "set":
+            s, e = _dedupe(s, equal), _dedupe(e, equal)
+        return _match_items(s, e, equal)
+
+    if mode == "scale":
+        def parallel(u, v):
+            if len(u) != len(v) or all(is_zero(x) for x in u) or all(is_zero(x) for x in v):
+                return False
+            # u ∥ v  <=>  every 2x2 minor u_i v_j - u_j v_i vanishes
+            return all(is_zero(u[i] * v[j] - u[j] * v[i]) for i in range(len(u)) for j in range(i + 1, len(u)))
+
+        e = _rows(expected)
+        candidates = [_rows(student)]
+        try:
+            candidates.append([list(col) for col in zip(*candidates[0])])
+        except TypeError:
+            pass
+        return any(_match_items(s, e, parallel) for s in candidates)
+
+    s_arr = np.array(student, dtype=object)
+    e_arr = np.array(expected, dtype=object)
+    if np.squeeze(s_arr).shape != np.squeeze(e_arr).shape:
+        return False
+    return all(equal(a, b) for a, b in zip(flatten(student), flatten(expected)))
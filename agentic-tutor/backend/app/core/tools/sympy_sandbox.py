@@ -0,0 +1,237 @@
+# backend/app/core/tools/sympy_sandbox.py
+import asyncio
+import functools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, the wall-clock kill still applies
+    resource = None
+
+from backend.app.core.tools.sympy_tool import tier_stats
+
+logger = logging.getLogger(__name__)
+
+SYMPY_POOL_SIZE = int(os.getenv("SYMPY_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+# Per-task deadline; a worker still busy after this is killed and replaced
+SYMPY_TIMEOUT_SECONDS = float(os.getenv("SYMPY_TIMEOUT_SECONDS", "5"))
+# Address-space cap per worker (0 = unlimited)
+SYMPY_MEMORY_MB = int(os.getenv("SYMPY_MEMORY_MB", "1024"))
+# Workers are replaced after this many tasks so SymPy's caches can't grow without bound
+SYMPY_MAX_TASKS_PER_WORKER = int(os.getenv("SYMPY_MAX_TASKS_PER_WORKER", "200"))
+STARTUP_TIMEOUT_SECONDS = 60.0
+
+METHODS = ("verify_equality", "verify_matrix", "verify_solution", "check_expected", "canonical_form")
+
+
+def failure_result(status: str, feedback: str) -> Dict[str, Any]:
+    """Result for a check that produced no verdict; callers fall through to the next grading tier."""
+    return {
+        "correct": False,
+        "parse_success": False,
+        "status": status,
+        "timeout": status == "timeout",
+        "feedback": feedback,
+    }
+
+
+def _worker_main(conn, memory_mb: int):
+    """Worker loop: limit resources, warm SymPy, then serve (method, args) tasks until told to stop."""
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    from backend.app.core.tools.sympy_tool import SymPyVerifier
+
+    SymPyVerifier.verify_equality("x + 1", "1 + x")  # warm the parser and simplify caches
+    conn.send("ready")
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if task is None:
+            return
+        method, args = task
+        try:
+            result = getattr(SymPyVerifier, method)(*args)
+        except MemoryError:
+            result = failure_result("memory", "Symbolic check ran out of memory.")
+        except Exception as e:
+            result = failure_result("error", f"Symbolic check failed: {e}")
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, ctx, memory_mb: int):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, memory_mb), daemon=True)
+        self.process.start()
+        child.close()
+        self.tasks = 0
+
+    def wait_ready(self, timeout: float) -> bool:
+        try:
+            return self.conn.poll(timeout) and self.conn.recv() == "ready"
+        except (EOFError, OSError):
+            return False
+
+    def stop(self, force: bool = False):
+        if not force:
+            try:
+                self.conn.send(None)
+                self.process.join(1.0)
+            except (OSError, ValueError):
+                pass
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(1.0)
+        self.conn.close()
+
+
+class SymPySandbox:
+    """
+    Warm pool of SymPy worker processes.
+
+    Untrusted answers are parsed and simplified in separate processes with an
+    address-space limit, so a pathological expression can at worst burn one
+    worker: a task that misses its deadline has its worker killed and replaced
+    in the background, and the caller gets a structured "timeout" result
+    instead of an exception. Workers are also recycled after a fixed number of
+    tasks. Forkserver preloads SymPy once, so replacements start warm.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.size = max(1, SYMPY_POOL_SIZE)
+            cls._instance.timeout = SYMPY_TIMEOUT_SECONDS
+            cls._instance.memory_mb = SYMPY_MEMORY_MB
+            cls._instance.max_tasks = SYMPY_MAX_TASKS_PER_WORKER
+            cls._instance._ctx = cls._context()
+            cls._instance._idle = queue.Queue()
+            cls._instance._lock = threading.Lock()
+            cls._instance._started = False
+            # verify() waits for a worker on these threads only, never on the loop's default executor
+            cls._instance._executor = ThreadPoolExecutor(cls._instance.size, thread_name_prefix="sympy-sandbox")
+            cls._instance._stats_lock = threading.Lock()
+            cls._instance.stats = {"tasks": 0, "timeouts": 0, "crashes": 0, "recycled": 0}
+        return cls._instance
+
+    @staticmethod
+    def _context():
+        if "forkserver" in mp.get_all_start_methods():
+            ctx = mp.get_context("forkserver")
+            ctx.set_forkserver_preload(["backend.app.core.tools.sympy_tool"])
+            return ctx
+        return mp.get_context("spawn")
+
+    def start(self):
+        """Start and warm every worker (idempotent; also done lazily on first use)."""
+        with self._lock:
+            if self._started:
+                return
+            workers = [_Worker(self._ctx, self.memory_mb) for _ in range(self.size)]
+            for worker in workers:
+                if worker.wait_ready(STARTUP_TIMEOUT_SECONDS):
+                    self._idle.put(worker)
+                else:
+                    logger.error("SymPy worker failed to start")
+                    worker.stop(force=True)
+                    self._idle.put(None)  # empty slot, respawned on use
+            self._started = True
+            logger.info(f"SymPy sandbox ready: {self.size} workers, {self.timeout}s timeout, {self.memory_mb} MB limit")
+
+    def shutdown(self):
+        with self._lock:
+            while True:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if worker is not None:
+                    worker.stop()
+            self._started = False
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _spawn(self) -> Optional[_Worker]:
+        worker = _Worker(self._ctx, self.memory_mb)
+        if worker.wait_ready(STARTUP_TIMEOUT_SECONDS):
+            return worker
+        logger.error("SymPy worker failed to start")
+        worker.stop(force=True)
+        return None
+
+    def _replace(self, worker: Optional[_Worker], force: bool):
+        if worker is not None:
+            worker.stop(force=force)
+        self._idle.put(self._spawn())
+
+    def _release(self, worker: _Worker, healthy: bool):
+        if healthy and worker.tasks < self.max_tasks:
+            self._idle.put(worker)
+            return
+        if healthy:
+            self._count("recycled")
+        # kill/respawn off the caller's path; the slot returns to the pool once the new worker is warm
+        threading.Thread(target=self._replace, args=(worker, not healthy), daemon=True).start()
+
+    def call(self, method: str, *args, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run SymPyVerifier.<method>(*args) in a worker (blocking)."""
+        if method not in METHODS:
+            raise ValueError(f"Unknown SymPy method: {method}")
+        self.start()
+        timeout = self.timeout if timeout is None else timeout
+
+        worker = self._idle.get()
+        if worker is None or not worker.process.is_alive():
+            if worker is not None:
+                worker.stop(force=True)
+            worker = self._spawn()
+            if worker is None:
+                self._idle.put(None)
+                return failure_result("unavailable", "Symbolic checker unavailable.")
+
+        self._count("tasks")
+        started = time.perf_counter()
+        try:
+            worker.conn.send((method, args))
+            if not worker.conn.poll(timeout):
+                self._count("timeouts")
+                self._release(worker, healthy=False)
+                logger.warning(f"SymPy {method} exceeded {timeout}s; worker killed")
+                tier_stats.record({"tier": "timeout", "tier_ms": {"timeout": round(timeout * 1000, 3)}})
+                return failure_result("timeout", f"Symbolic check timed out after {timeout:g}s.")
+            result = worker.conn.recv()
+        except (EOFError, OSError):
+            # worker died mid-task (memory limit, signal...)
+            self._count("crashes")
+            self._release(worker, healthy=False)
+            logger.warning(f"SymPy worker crashed during {method}")
+            return failure_result("crashed", "Symbolic checker crashed on this answer.")
+
+        worker.tasks += 1
+        self._release(worker, healthy=True)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if "tier" in result:
+            tier_stats.record(result)  # the worker's own counters live in its process
+        return result
+
+    async def verify(self, method: str, *args, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Async wrapper: the blocking wait happens on the sandbox's own threads
+        (one per worker), the work in a worker process. Callers beyond the pool
+        size queue as futures, not as threads parked on the shared executor.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(self.call, method, *args, timeout=timeout))
@@ -1,55 +1,396 @@
 # backend/app/core/tools/sympy_verifier.py
-from sympy import sympify, simplify, Eq, solve, Matrix, symbols
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import sympy
+from sympy import simplify, solve, Matrix, symbols, lambdify
 from sympy.parsing.latex import parse_latex
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, convert_xor
 import logging
 
+from backend.app.core.tools.answer_compare import (
+    ANSWER_ATOL, ANSWER_RTOL, ROUNDING_RTOL, compare_items, compare_numeric, flatten, parse_answer, shape_signature, split_kind,
+)
+from backend.app.utils.bounded_cache import BoundedCache
+
 logger = logging.getLogger(__name__)
 
+# Student answers longer than this are not parsed at all
+MAX_EXPR_CHARS = int(os.getenv("SYMPY_MAX_EXPR_CHARS", "2000"))
+
+# Random points tried by the numeric tier
+NUMERIC_TRIALS = int(os.getenv("SYMPY_NUMERIC_TRIALS", "6"))
+# Relative difference treated as equal (float rounding) / as clearly different
+NUMERIC_RTOL = float(os.getenv("SYMPY_NUMERIC_RTOL", "1e-9"))
+NUMERIC_MISMATCH = 1e-6
+# Compiled expected solutions kept per process (each sandbox worker has its own)
+EXPECTED_CACHE_SIZE = int(os.getenv("EXPECTED_CACHE_SIZE", "2048"))
+
+_TRANSFORMATIONS = standard_transformations + (convert_xor,)
+# Dunders, attribute access, lambdas, strings and statements never appear in a math answer
+_FORBIDDEN = re.compile(r"__|\blambda\b|\.\s*[A-Za-z_]|[;:'\"`@$#!?\\{}]")
+# The only names an answer can resolve to; anything else becomes a Symbol
+_SAFE_NAMES = (
+    "Symbol", "Integer", "Float", "Rational", "Matrix", "I", "E", "pi", "oo",
+    "sqrt", "exp", "log", "ln", "sin", "cos", "tan", "asin", "acos", "atan",
+    "sinh", "cosh", "tanh", "Abs", "re", "im", "conjugate", "factorial", "binomial",
+    "det", "trace", "transpose",
+)
+
+
+def safe_parse(text: str):
+    """
+    Parse untrusted input into a SymPy object without sympify's unrestricted eval:
+    a length cap, a blacklist of non-math syntax, and a global namespace holding
+    only whitelisted SymPy names (no builtins).
+    """
+    text = text.strip()
+    if not text or len(text) > MAX_EXPR_CHARS:
+        raise ValueError("Expression is empty or too long")
+    if _FORBIDDEN.search(text):
+        raise ValueError("Expression contains unsupported syntax")
+    namespace = {name: getattr(sympy, name) for name in _SAFE_NAMES}
+    namespace["__builtins__"] = {}
+    return parse_expr(text, local_dict={}, global_dict=namespace, transformations=_TRANSFORMATIONS)
+
+
+def _parse_scalar(text: str):
+    _, text = split_kind(text)  # "charpoly: x**3 - 1" -> "x**3 - 1"
+    # LaTeX goes through the ANTLR grammar, which never evaluates Python
+    if "\\" in text or "{" in text:
+        if len(text) > MAX_EXPR_CHARS:
+            raise ValueError("Expression is too long")
+        return parse_latex(text)
+    return safe_parse(text)
+
+
+class TierStats:
+    """Which tier decided each check, and the time spent in each tier (fed by the sandbox)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._tiers = {}
+
+    def record(self, result: dict):
+        with self._lock:
+            self._calls += 1
+            for tier, ms in result.get("tier_ms", {}).items():
+                entry = self._tiers.setdefault(tier, {"hits": 0, "runs": 0, "ms": 0.0})
+                entry["runs"] += 1
+                entry["ms"] += ms
+            decided = result.get("tier")
+            if decided:
+                self._tiers.setdefault(decided, {"hits": 0, "runs": 0, "ms": 0.0})["hits"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                tier: {
+                    "hits": e["hits"],
+                    "hit_rate": round(e["hits"] / self._calls, 3) if self._calls else 0.0,
+                    "avg_ms": round(e["ms"] / e["runs"], 3) if e["runs"] else 0.0,
+                }
+                for tier, e in self._tiers.items()
+            }
+
+
+tier_stats = TierStats()
+
+
+def _lambdify(expr) -> Tuple[tuple, Optional[Callable]]:
+    syms = tuple(sorted(getattr(expr, "free_symbols", set()), key=str))
+    try:
+        return syms, lambdify(syms, expr, modules="numpy")
+    except Exception:
+        return syms, None
+
+
+def numeric_equal(s, e, compiled_e: Tuple[tuple, Optional[Callable]] = None,
+                  trials: int = NUMERIC_TRIALS) -> Optional[bool]:
+    """
+    Compare two expressions by evaluating them with NumPy at random complex
+    points. Returns True / False when the evaluation is decisive and None when
+    it is not (non-finite values, unsupported functions, borderline differences).
+    Complex points keep branch-cut identities like sqrt(x**2) = x from passing.
+    `compiled_e` is the (symbols, callable) pair already built for `e`.
+    """
+    s_syms, f_s = _lambdify(s)
+    e_syms, f_e = compiled_e or _lambdify(e)
+    if f_s is None or f_e is None:
+        return None
+    syms = sorted(set(s_syms) | set(e_syms), key=str)
+    # seeded by the expressions, so a given answer always gets the same verdict
+    rng = np.random.default_rng(zlib.crc32(f"{s}|{e}".encode()))
+    trials = trials if syms else 1
+    points = rng.uniform(-2, 2, (trials, len(syms))) + 1j * rng.uniform(-2, 2, (trials, len(syms)))
+
+    agreed = 0
+    with np.errstate(all="ignore"):
+        for point in points:
+            values = dict(zip(syms, point))
+            try:
+                vs = np.asarray(f_s(*(values[x] for x in s_syms)), dtype=complex)
+                ve = np.asarray(f_e(*(values[x] for x in e_syms)), dtype=complex)
+            except Exception:
+                return None
+            if vs.shape != ve.shape or not (np.all(np.isfinite(vs)) and np.all(np.isfinite(ve))):
+                continue
+            diff = float(np.max(np.abs(vs - ve), initial=0.0))
+            scale = max(1.0, float(np.max(np.abs(vs), initial=0.0)), float(np.max(np.abs(ve), initial=0.0)))
+            if diff > NUMERIC_MISMATCH * scale:
+                return False
+            if diff <= NUMERIC_RTOL * scale:
+                agreed += 1
+    return True if agreed == len(points) else None
+
+
+_DECIMAL = re.compile(r"\d*\.\d")
+
+
+def within_rounding(s, e, compiled_e: Tuple[tuple, Optional[Callable]] = None) -> bool:
+    """
+    A decimal answer that missed the exact tolerances but is within ROUNDING_RTOL
+    of the expected value (0.333 for 1/3, 1.414 for sqrt(2)) is not provably
+    wrong. Answers without a Float never are; undecidable cases count as rounded.
+    """
+    if not s.has(sympy.Float):
+        return False
+    s_syms, f_s = _lambdify(s)
+    e_syms, f_e = compiled_e or _lambdify(e)
+    if f_s is None or f_e is None:
+        return True
+    syms = sorted(set(s_syms) | set(e_syms), key=str)
+    rng = np.random.default_rng(zlib.crc32(f"{s}|{e}".encode()))
+    points = rng.uniform(0.5, 2, (NUMERIC_TRIALS if syms else 1, len(syms)))
+    with np.errstate(all="ignore"):
+        for point in points:
+            values = dict(zip(syms, point))
+            try:
+                vs = np.asarray(f_s(*(values[x] for x in s_syms)), dtype=complex)
+                ve = np.asarray(f_e(*(values[x] for x in e_syms)), dtype=complex)
+            except Exception:
+                return True
+            if vs.shape != ve.shape:
+                return False
+            if not (np.all(np.isfinite(vs)) and np.all(np.isfinite(ve))):
+                return True
+            if np.max(np.abs(vs - ve), initial=0.0) > ANSWER_ATOL + ROUNDING_RTOL * np.max(np.abs(ve), initial=0.0):
+                return False
+    return True
+
+
+def _numeric_entries(data):
+    if isinstance(data, list):
+        return [_numeric_entries(x) for x in data]
+    if getattr(data, "free_symbols", None):
+        raise ValueError("symbolic entry")
+    return complex(data.evalf()) if hasattr(data, "evalf") else complex(data)
+
+
+def matrix_within_rounding(student_str: str, expected: dict, mode: str) -> bool:
+    """within_rounding for matrix / list answers: decimal entries matching the expected values up to rounding."""
+    if not _DECIMAL.search(student_str):
+        return False
+    try:
+        s = parse_answer(student_str)
+        if s is None:
+            s = _numeric_entries(parse_answer(student_str, safe_parse))
+        e = expected["numeric"] if expected["numeric"] is not None else _numeric_entries(expected["symbolic"])
+    except Exception:
+        return True
+    return compare_numeric(s, e, mode, rtol=ROUNDING_RTOL)
+
+
+_expected_cache = BoundedCache(EXPECTED_CACHE_SIZE)
+
+
+def compile_expected(expected: str, mode: Optional[str] = None) -> dict:
+    """
+    Parse and compile an expected solution once per process, keyed by a hash of
+    its content (and comparison mode). Scalars (mode None) keep the SymPy
+    expression and its lambdified NumPy callable; matrix / eigen answers keep
+    their numeric and symbolic entry lists. "error" is set when it can't be parsed.
+    """
+    key = hashlib.sha1(f"{mode}\x00{expected}".encode()).hexdigest()
+    return _expected_cache.get_or_create(key, lambda: _compile_expected(expected, mode))
+
+
+def _compile_expected(expected: str, mode: Optional[str]) -> dict:
+    compiled = {"error": None}
+    try:
+        if mode is None:
+            expr = _parse_scalar(expected)
+            compiled["expr"] = expr
+            compiled["lambdified"] = _lambdify(expr)
+        else:
+            compiled["numeric"] = parse_answer(expected)
+            compiled["symbolic"] = parse_answer(expected, safe_parse)
+            if compiled["numeric"] is None and compiled["symbolic"] is None:
+                raise ValueError("not a matrix, vector or list")
+    except Exception as e:
+        compiled["error"] = str(e) or type(e).__name__
+    return compiled
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def _sym_is_zero(x) -> bool:
+    if not x.free_symbols:
+        return abs(complex(x.evalf())) <= ANSWER_ATOL
+    return simplify(x) == 0
+
+
+def _sym_equal(a, b) -> bool:
+    if not (a.free_symbols or b.free_symbols):
+        a, b = complex(a.evalf()), complex(b.evalf())
+        return abs(a - b) <= ANSWER_ATOL + ANSWER_RTOL * max(abs(a), abs(b))
+    return simplify(a - b) == 0
+
+
 class SymPyVerifier:
     @staticmethod
     def verify_equality(student_expr: str, expected_expr: str) -> dict:
-        """Verify if two symbolic expressions are mathematically equal"""
+        """
+        Verify if two symbolic expressions are mathematically equal.
+        Tiered: parse (identical trees are equal), then random-point numeric
+        evaluation, and only when that is inconclusive the (much slower) exact
+        simplify(s - e) == 0. The expected side comes precompiled from the cache.
+        """
+        tier_ms = {}
+        start = time.perf_counter()
+        expected = compile_expected(expected_expr)
+        if expected["error"]:
+            return {"correct": False, "parse_success": False, "tier": "parse", "tier_ms": {"parse": _ms(start)},
+                    "feedback": "The expected solution could not be parsed."}
         try:
-            # Try LaTeX first (common in Linear Algebra)
-            try:
-                s = parse_latex(student_expr)
-                e = parse_latex(expected_expr)
-            except:
-                s = sympify(student_expr, locals={"I": 1j})
-                e = sympify(expected_expr, locals={"I": 1j})
-
-            if simplify(s - e) == 0:
-                return {"correct": True, "feedback": "Perfect! Your expression is mathematically equivalent."}
-            else:
-                return {"correct": False, "feedback": f"Not equivalent. Expected form: {expected_expr}"}
+            s = _parse_scalar(student_expr)
         except Exception as e:
             logger.warning(f"SymPy parsing failed: {e}")
-            return {"correct": False, "feedback": "Could not parse your symbolic answer. Check syntax and LaTeX format."}
+            return {"correct": False, "parse_success": False, "tier": "parse", "tier_ms": {"parse": _ms(start)},
+                    "feedback": "Could not parse your symbolic answer. Check syntax and LaTeX format."}
+        e = expected["expr"]
+        tier_ms["parse"] = _ms(start)
+
+        if s == e:  # structurally identical after parsing
+            return {"correct": True, "tier": "exact", "tier_ms": tier_ms,
+                    "feedback": "Perfect! Your expression is mathematically equivalent."}
+
+        start = time.perf_counter()
+        verdict = numeric_equal(s, e, expected["lambdified"])
+        tier_ms["numeric"] = _ms(start)
+        tier = "numeric"
+        if verdict is None:
+            start = time.perf_counter()
+            try:
+                verdict = simplify(s - e) == 0
+            except Exception as e:
+                logger.warning(f"SymPy comparison failed: {e}")
+                return {"correct": False, "parse_success": False, "tier": "symbolic",
+                        "tier_ms": {**tier_ms, "symbolic": _ms(start)},
+                        "feedback": "Could not compare your answer symbolically."}
+            tier_ms["symbolic"] = _ms(start)
+            tier = "symbolic"
+
+        if verdict:
+            return {"correct": True, "tier": tier, "tier_ms": tier_ms,
+                    "feedback": "Perfect! Your expression is mathematically equivalent."}
+        else:
+            return {"correct": False, "tier": tier, "tier_ms": tier_ms,
+                    "rounded": within_rounding(s, e, expected["lambdified"]),
+                    "feedback": f"Not equivalent. Expected form: {expected_expr}"}
+
+    @staticmethod
+    def verify_matrix(student_str: str, expected_str: str, mode: str = "elementwise") -> dict:
+        """
+        Verify a matrix / vector / eigen answer under `mode` (see answer_compare.MODES).
+        Entries that are all plain numbers are compared with NumPy; SymPy is
+        only used when an entry is symbolic (sqrt(2), a + b...).
+        """
+        tier_ms = {}
+        start = time.perf_counter()
+        expected = compile_expected(expected_str, mode)
+        if expected["error"]:
+            return {"correct": False, "parse_success": False, "tier": "parse", "tier_ms": {"parse": _ms(start)},
+                    "feedback": "The expected solution could not be parsed."}
+        s = parse_answer(student_str)
+        if s is not None and expected["numeric"] is not None:
+            correct = compare_numeric(s, expected["numeric"], mode)
+            tier_ms["numeric"] = _ms(start)
+            tier = "numeric"
+        else:
+            start = time.perf_counter()
+            try:
+                s = parse_answer(student_str, safe_parse)
+                e = expected["symbolic"]
+                if s is None or e is None:
+                    raise ValueError("Unparseable matrix")
+                correct = compare_items(s, e, mode, equal=_sym_equal, is_zero=_sym_is_zero)
+            except Exception:
+                return {"correct": False, "parse_success": False, "tier": "parse",
+                        "tier_ms": {"parse": _ms(start)}, "feedback": "Invalid matrix format."}
+            tier_ms["symbolic"] = _ms(start)
+            tier = "symbolic"
+
+        if correct:
+            return {"correct": True, "tier": tier, "tier_ms": tier_ms, "feedback": "Matrix is correct!"}
+        else:
+            return {"correct": False, "tier": tier, "tier_ms": tier_ms,
+                    "rounded": matrix_within_rounding(student_str, expected, mode),
+                    "feedback": f"Incorrect matrix. Expected:\n{expected_str}"}
+
+    @staticmethod
+    def check_expected(expected_str: str, mode: Optional[str] = None) -> dict:
+        """Compile (and cache) an expected solution at generation time; reports whether it is gradable."""
+        compiled = compile_expected(expected_str, mode)
+        return {"ok": compiled["error"] is None, "error": compiled["error"]}
 
     @staticmethod
-    def verify_matrix(student_str: str, expected_str: str) -> dict:
-        """Verify matrix equality"""
+    def canonical_form(answer: str, mode: Optional[str] = None) -> dict:
+        """
+        Canonical SymPy spelling of an answer ("x*x" and "x^2" -> "x**2"), used
+        to dedupe equivalent submissions. Sets and multisets are sorted.
+        {"canonical": None} when the answer doesn't parse.
+        """
         try:
-            s_matrix = Matrix(sympify(student_str.replace("\n", ",")))
-            e_matrix = Matrix(sympify(expected_str.replace("\n", ",")))
-            if s_matrix.equals(e_matrix):
-                return {"correct": True, "feedback": "Matrix is correct!"}
+            if mode is None:
+                return {"canonical": sympy.srepr(_parse_scalar(answer))}
+            parsed = parse_answer(answer)
+            if parsed is not None:
+                entries = flatten(parsed)
+                text = [f"{complex(v).real:.9g}{complex(v).imag:+.9g}j" for v in entries]
             else:
-                return {"correct": False, "feedback": f"Incorrect matrix. Expected:\n{expected_str}"}
-        except:
-            return {"correct": False, "feedback": "Invalid matrix format."}
+                parsed = parse_answer(answer, safe_parse)
+                if parsed is None:
+                    return {"canonical": None}
+                text = [sympy.srepr(v) for v in flatten(parsed)]
+            if mode in ("set", "multiset"):
+                text = sorted(set(text)) if mode == "set" else sorted(text)
+                return {"canonical": f"{mode}:" + ",".join(text)}
+            # keep the nesting (shape) for elementwise / scale answers
+            return {"canonical": f"{mode}:{shape_signature(parsed)}:" + ",".join(text)}
+        except Exception:
+            return {"canonical": None}
 
     @staticmethod
     def verify_solution(student_answer: str, equation: str, variable: str = "x") -> dict:
         """Verify if student solved equation correctly"""
         try:
             x = symbols(variable)
-            eq = sympify(equation)
-            student_sol = sympify(student_answer)
+            eq = safe_parse(equation)
+            student_sol = safe_parse(student_answer)
             if eq.subs(x, student_sol) == 0:
                 return {"correct": True, "feedback": "Solution is correct!"}
             else:
                 correct = solve(eq, x)
                 return {"correct": False, "feedback": f"Incorrect. Correct solution: {correct}"}
-        except:
-            return {"correct": False, "feedback": "Could not verify solution."}
\ No newline at end of file
+        except Exception:
+            return {"correct": False, "parse_success": False, "feedback": "Could not verify solution."}
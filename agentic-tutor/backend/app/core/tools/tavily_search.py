@@ -4,6 +4,8 @@ import asyncio
 from typing import List, Dict, Any, Optional
 import httpx
 
+from backend.app.core.rag.search_cache import SearchCache
+
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", None)
 # Default placeholder endpoint; replace with the real Tavily endpoint if different.
 TAVILY_API_URL = os.getenv("TAVILY_API_URL", "https://api.tavily.example/search")
@@ -34,9 +36,10 @@ async def tavily_search(query: str, top_k: int = 5, timeout: int = 10) -> List[D
     }
 
     payload = {"q": query, "k": top_k}
-    async with _semaphore:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            try:
+
+    async def _fetch() -> List[Dict[str, Any]]:
+        async with _semaphore:
+            async with httpx.AsyncClient(timeout=timeout) as client:
                 resp = await client.post(TAVILY_API_URL, json=payload, headers=headers)
                 resp.raise_for_status()
                 data = resp.json()
@@ -49,6 +52,10 @@ async def tavily_search(query: str, top_k: int = 5, timeout: int = 10) -> List[D
                         "relevance": item.get("score", item.get("relevance", 1.0))
                     })
                 return results
-            except Exception as e:
-                # On any error, return an empty list (agent will still work with RAG/local context)
-                return [{"title": "tavily_error", "snippet": f"[Tavily error: {str(e)}] - using no external context", "relevance": 0.0}]
+
+    try:
+        # Persistent cache (stale-while-revalidate); errors are never cached
+        return await SearchCache().afetch("tavily_api", query, _fetch, top_k=top_k)
+    except Exception as e:
+        # On any error, return an empty list (agent will still work with RAG/local context)
+        return [{"title": "tavily_error", "snippet": f"[Tavily error: {str(e)}] - using no external context", "relevance": 0.0}]
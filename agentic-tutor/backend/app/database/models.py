@@ -10,7 +10,7 @@ from sqlmodel import SQLModel, Field
 from sqlalchemy import String
 from sqlalchemy import JSON          # works for SQLite, MySQL, PostgreSQL (JSONB if you import JSONB)
 from sqlmodel import SQLModel, Field
-from sqlalchemy import Column, String
+from sqlalchemy import Column, Index, String
 import uuid
 from datetime import datetime
 # ----------------------------------------------------------------------
@@ -56,6 +56,53 @@ class Evaluation(SQLModel, table=True):
     overall_score: float = Field(default=0.0)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class QuestionBankItem(SQLModel, table=True):
+    # question content hash, so the same question is banked once
+    item_id: str = Field(primary_key=True)
+    topic: str = Field(index=True)  # normalize_topic() form
+    qtype: str = Field(index=True)
+    difficulty: int = Field(default=2, index=True)  # 1 (recall) .. 3 (multi-step)
+    question: Dict[str, Any] = json_field(default={})
+    expected_solution: str = ""
+    expected_canonical: Optional[str] = None  # SymPy canonical form, when the expected solution parses
+    symbolic_gradable: bool = Field(default=False)
+    times_served: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ServedItem(SQLModel, table=True):
+    """A bank question a student has been served (so quizzes can skip it without reading old Evaluations)."""
+    __tablename__ = "served_item"
+
+    student_id: str = Field(primary_key=True, foreign_key="student.student_id")
+    item_id: str = Field(primary_key=True)  # QuestionBankItem.item_id / question content hash
+    served_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ScoreHistory(SQLModel, table=True):
+    """One row per completed evaluation (append-only; replaces eval_completed items in StudentProfile.history)."""
+    __tablename__ = "score_history"
+    __table_args__ = (Index("ix_score_history_student_topic_ts", "student_id", "topic", "ts"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    student_id: str = Field(foreign_key="student.student_id")
+    topic: str
+    score: float
+    ts: datetime = Field(default_factory=datetime.utcnow)
+
+class TopicStats(SQLModel, table=True):
+    """Running score aggregates per (student, topic), updated in O(1) as each score arrives."""
+    __tablename__ = "topic_stats"
+
+    student_id: str = Field(primary_key=True, foreign_key="student.student_id")
+    topic: str = Field(primary_key=True)
+    count: int = Field(default=0)
+    last_score: float = Field(default=0.0)
+    ewma_mean: float = Field(default=0.0)
+    ewma_var: float = Field(default=0.0)
+    mean: float = Field(default=0.0)  # Welford running mean / sum of squared deviations
+    m2: float = Field(default=0.0)
+    streak: int = Field(default=0)  # consecutive scores at or above the mastery threshold
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
 class Event(SQLModel, table=True):
     event_id: str = Field(
         default_factory=lambda: uuid.uuid4().hex,
@@ -0,0 +1,75 @@
+# backend/app/database/rolling_stats.py
+import math
+import os
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlmodel import Session, select
+
+from backend.app.database.models import ScoreHistory, TopicStats
+
+# EWMA weight of the newest score; 2 / (N + 1) matches an N=5 score window
+ROLLING_ALPHA = float(os.getenv("ROLLING_ALPHA", str(2 / 6)))
+
+
+def update(stats: TopicStats, score: float, mastery_threshold: float = 0.8) -> TopicStats:
+    """Fold one score into the aggregates in O(1)."""
+    score = float(score)
+    if stats.count == 0:
+        stats.ewma_mean, stats.ewma_var = score, 0.0
+    else:
+        # exponentially weighted mean and variance (West / Finch incremental form)
+        diff = score - stats.ewma_mean
+        incr = ROLLING_ALPHA * diff
+        stats.ewma_mean += incr
+        stats.ewma_var = (1 - ROLLING_ALPHA) * (stats.ewma_var + diff * incr)
+    # Welford running mean / variance over all scores
+    stats.count += 1
+    delta = score - stats.mean
+    stats.mean += delta / stats.count
+    stats.m2 += delta * (score - stats.mean)
+    stats.streak = stats.streak + 1 if score >= mastery_threshold else 0
+    stats.last_score = score
+    stats.updated_at = datetime.utcnow()
+    return stats
+
+
+def get_stats(session: Session, student_id: str, topic: str, mastery_threshold: float = 0.8) -> TopicStats:
+    """
+    The (student, topic) aggregates. A pair with scores but no aggregates yet
+    (histories from before this table) is backfilled once from score_history.
+    """
+    stats = session.get(TopicStats, (student_id, topic))
+    if stats is not None:
+        return stats
+    stats = TopicStats(student_id=student_id, topic=topic)
+    rows = session.exec(
+        select(ScoreHistory.score)
+        .where(ScoreHistory.student_id == student_id, ScoreHistory.topic == topic)
+        .order_by(ScoreHistory.ts, ScoreHistory.id)
+    ).all()
+    for score in rows:
+        update(stats, score, mastery_threshold)
+    session.add(stats)
+    return stats
+
+
+def as_dict(stats: TopicStats) -> Dict[str, Any]:
+    variance = stats.m2 / stats.count if stats.count else 0.0
+    return {
+        "topic": stats.topic,
+        "count": stats.count,
+        "last_score": round(stats.last_score, 3),
+        "ewma_mean": round(stats.ewma_mean, 3),
+        "ewma_std": round(math.sqrt(max(stats.ewma_var, 0.0)), 3),
+        "mean": round(stats.mean, 3),
+        "std": round(math.sqrt(max(variance, 0.0)), 3),
+        "streak": stats.streak,
+        "updated_at": stats.updated_at.isoformat(),
+    }
+
+
+def student_stats(session: Session, student_id: str) -> List[Dict[str, Any]]:
+    """Every topic's aggregates for one student (dashboards read these as stored)."""
+    rows = session.exec(select(TopicStats).where(TopicStats.student_id == student_id)).all()
+    return [as_dict(s) for s in rows]
@@ -0,0 +1,67 @@
+# backend/app/database/score_history.py
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlmodel import Session, select
+
+from backend.app.database.models import ScoreHistory, StudentProfile
+from backend.app.database.session import get_session
+
+logger = logging.getLogger(__name__)
+
+
+def record_score(session: Session, student_id: str, topic: str, score: float,
+                 ts: Optional[datetime] = None) -> ScoreHistory:
+    """Append one score (single-row insert; the caller commits)."""
+    row = ScoreHistory(student_id=student_id, topic=topic, score=float(score), ts=ts or datetime.utcnow())
+    session.add(row)
+    return row
+
+
+def recent_scores(session: Session, student_id: str, topic: str, n: int = 5) -> List[ScoreHistory]:
+    """Last `n` scores for (student, topic), oldest first; an index range scan, whatever the history length."""
+    rows = session.exec(
+        select(ScoreHistory)
+        .where(ScoreHistory.student_id == student_id, ScoreHistory.topic == topic)
+        .order_by(ScoreHistory.ts.desc(), ScoreHistory.id.desc())
+        .limit(n)
+    ).all()
+    return list(reversed(rows))
+
+
+def _parse_ts(value) -> datetime:
+    try:
+        ts = datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+    # stored naive UTC, like every other timestamp column
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def migrate_json_histories() -> int:
+    """
+    Move eval_completed items out of StudentProfile.history into score_history.
+    Migrated items are removed from the JSON list, so running it again is a no-op.
+    """
+    moved = 0
+    with get_session() as session:
+        for profile in session.exec(select(StudentProfile)).all():
+            history = profile.history if isinstance(profile.history, list) else []
+            keep = []
+            for item in history:
+                payload = item.get("payload", {}) if isinstance(item, dict) else {}
+                if not (isinstance(item, dict) and item.get("type") == "eval_completed"
+                        and isinstance(payload.get("score"), (int, float))):
+                    keep.append(item)
+                    continue
+                record_score(session, profile.student_id, payload.get("topic") or "unknown",
+                             payload["score"], _parse_ts(item.get("ts")))
+                moved += 1
+            if len(keep) != len(history):
+                profile.history = keep
+                session.add(profile)
+        session.commit()
+    if moved:
+        logger.info(f"Score history: migrated {moved} scores from profile JSON histories")
+    return moved
@@ -10,7 +10,13 @@ from tenacity import retry, stop_after_attempt, wait_exponential  # pip install
 
 from backend.app.core.orchestrator import Orchestrator
 from backend.app.database.session import init_db, get_session
+from backend.app.database.score_history import migrate_json_histories
+from backend.app.database import rolling_stats
 from backend.app.database.models import Event
+from backend.app.core.tools.sympy_tool import tier_stats
+from backend.app.core.grading_memo import GradingMemo
+from backend.app.core.grading_cascade import cascade_stats
+from backend.app.routers.evaluator import router as evaluator_router
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -40,6 +46,11 @@ app.add_middleware(
 
 # Initialize DB
 init_db()
+# One-off move of JSON profile histories into score_history (no-op once done)
+migrate_json_histories()
+
+# Single and class-batch grading (/api/eval/grade, /api/eval/grade/batch)
+app.include_router(evaluator_router)
 
 # ==================== Request Models ====================
 class StartSessionRequest(BaseModel):
@@ -181,7 +192,8 @@ async def get_student_profile(student_id: str):
                 "misconceptions": profile.misconceptions or [],
                 "overall_score": profile.overall_score or 0.0,
                 "risk_score": profile.risk_score or 0.0,
-                "learning_style": profile.learning_preferences or {}
+                "learning_style": profile.learning_preferences or {},
+                "topic_stats": rolling_stats.student_stats(session, student_id)
             }
     except Exception as e:
         logger.error(f"Profile fetch failed: {e}")
@@ -228,7 +240,10 @@ async def health():
         "status": "healthy",
         "orchestrator": "LangGraph with MemorySaver",
         "active_sessions": active,
-        "rag_ready": True
+        "rag_ready": True,
+        "grading_tiers": tier_stats.snapshot(),
+        "grading_memo": GradingMemo().stats(),
+        "grading_cascade": cascade_stats.snapshot()
     }
 
 # ==================== Run Server ====================
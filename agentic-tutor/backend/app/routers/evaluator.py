@@ -1,10 +1,16 @@
+import json
+
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any
-from backend.app.core.orchestrator import orchestrator
+from backend.app.agents.evaluator_agent import EvaluatorAgent
 
 router = APIRouter()
 
+# Shares the grading memo and SymPy sandbox (both singletons) with the orchestrator's evaluator
+evaluator = EvaluatorAgent()
+
 class EvaluationRecord(BaseModel):
     questions: List[Dict[str, Any]]
 
@@ -16,17 +22,34 @@ class GradeRequest(BaseModel):
     eval_record: EvaluationRecord
     student_answers: List[StudentAnswer]
 
+class StudentSubmission(BaseModel):
+    student_id: str
+    answers: List[StudentAnswer]
+
+class BatchGradeRequest(BaseModel):
+    eval_record: EvaluationRecord
+    submissions: List[StudentSubmission]
+
 
 @router.post("/api/eval/grade")
 async def grade(request: GradeRequest):
-    result = await orchestrator.dispatch(
-        "evaluator",
-        "grade_answers",
-        context={
-            "goal_params": {
-                "eval_record": request.eval_record.dict(),
-                "student_answers": [a.dict() for a in request.student_answers]
-            }
-        }
+    return await evaluator.grade_answers(
+        eval_record=request.eval_record.dict(),
+        student_answers=[a.dict() for a in request.student_answers]
     )
-    return result
+
+
+@router.post("/api/eval/grade/batch")
+async def grade_batch(request: BatchGradeRequest):
+    """
+    Grade a class against one question set. Streams NDJSON: one line per
+    student as soon as their answers are graded, then a {"summary": ...} line.
+    """
+    async def lines():
+        async for item in evaluator.grade_batch(
+            request.eval_record.dict(),
+            [s.dict() for s in request.submissions]
+        ):
+            yield json.dumps(item, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
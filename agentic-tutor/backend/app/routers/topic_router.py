@@ -45,7 +45,8 @@ async def get_emerging_topics():
     try:
         # Search for recent developments
         query = "linear algebra recent developments 2024 applications machine learning"
-        results = TavilySearch.search(query, max_results=5)
+        # Cached lookup; run in a thread so a cache miss doesn't block the event loop
+        results = await asyncio.to_thread(TavilySearch.search, query, max_results=5)
         
         emerging = []
         for result in results:
@@ -1,24 +1,38 @@
 # backend/app/utils/rate_limiter.py
 import asyncio
+import os
 import time
 from functools import wraps
 
 class SimpleRateLimiter:
-    def __init__(self, min_interval: float = 3.5):  # Safe for Groq free tier
+    def __init__(self, min_interval: float = 3.5, burst: int = 1):  # Safe for Groq free tier
         self.min_interval = min_interval
+        self.burst = max(1, burst)
         self.last_called = 0.0
+        self._next_slot = 0.0  # theoretical time of the next call (GCRA)
 
     async def wait(self):
+        # Reserve a slot before sleeping, so concurrent callers queue up one
+        # interval apart instead of all waking at once. Up to `burst` calls may
+        # go back-to-back after an idle period; the long-run rate is unchanged.
         now = time.time()
-        elapsed = now - self.last_called
-        sleep_time = max(0, self.min_interval - elapsed)
+        slot = max(self._next_slot, now)
+        self._next_slot = slot + self.min_interval
+        sleep_time = slot - (self.burst - 1) * self.min_interval - now
         if sleep_time > 0:
             print(f"[Rate Limiter] Sleeping {sleep_time:.2f}s to avoid 429...")
             await asyncio.sleep(sleep_time)
         self.last_called = time.time()
 
+    def idle(self) -> bool:
+        """No call is queued ahead; background work should only take a slot then."""
+        return self._next_slot <= time.time()
+
 # Global limiter
-limiter = SimpleRateLimiter(min_interval=3.8)  # 15–16 calls per minute → safe
+limiter = SimpleRateLimiter(
+    min_interval=3.8,  # 15–16 calls per minute → safe
+    burst=int(os.getenv("LLM_RATE_BURST", "1")),
+)
 
 def with_rate_limit(func):
     @wraps(func)
@@ -0,0 +1,100 @@
+# backend/benchmarks/ann_benchmark.py
+"""
+Scale benchmark for VectorStore ANN index types (Flat / HNSW / IVF).
+
+Builds each index over a synthetic clustered corpus of MiniLM-sized (384-d)
+vectors and reports build time, index memory, single-query p50/p99 latency
+and recall@k against exact Flat search.
+
+Run from the agentic-tutor/ directory:
+    python -m backend.benchmarks.ann_benchmark --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from backend.app.core.rag.ann_index import (
+    INDEX_TYPES, build_index, configure_search, index_memory_bytes, index_type_of,
+)
+
+DIM = 384
+
+
+def synthetic_corpus(n: int, dim: int = DIM, n_clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Gaussian clusters on the unit sphere — closer to sentence embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    out = np.empty((n, dim), dtype="float32")
+    for start in range(0, n, 100_000):
+        stop = min(n, start + 100_000)
+        labels = rng.integers(0, n_clusters, stop - start)
+        out[start:stop] = centers[labels] + 0.35 * rng.standard_normal((stop - start, dim)).astype("float32")
+    faiss.normalize_L2(out)
+    return out
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray, k: int) -> float:
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def latencies_ms(index: faiss.Index, queries: np.ndarray, k: int):
+    times, found = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, idx = index.search(q[None, :], k)
+        times.append((time.perf_counter() - start) * 1000)
+        found.append(idx[0])
+    return np.percentile(times, 50), np.percentile(times, 99), np.array(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN index scale benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 32])
+    args = parser.parse_args()
+
+    header = f"{'N':>9} {'index':<10} {'build s':>9} {'mem MB':>9} {'p50 ms':>8} {'p99 ms':>8} {'R@' + str(args.k):>7}"
+    print(header)
+    print("-" * len(header))
+
+    for n in args.sizes:
+        # Queries come from the same clusters as the corpus but are not indexed
+        data = synthetic_corpus(n + args.queries)
+        corpus, queries = data[:n], data[n:]
+
+        start = time.perf_counter()
+        flat = build_index("flat", corpus)
+        flat_build_s = time.perf_counter() - start
+        _, truth = flat.search(queries, args.k)
+
+        for index_type in args.types:
+            if index_type == "flat":
+                index, build_s = flat, flat_build_s
+            else:
+                start = time.perf_counter()
+                index = build_index(index_type, corpus)
+                build_s = time.perf_counter() - start
+            mem_mb = index_memory_bytes(index) / 1e6
+
+            settings = [None]
+            if index_type_of(index) == "ivf":
+                settings = args.nprobe
+            for nprobe in settings:
+                label = index_type
+                if nprobe is not None:
+                    configure_search(index, nprobe=nprobe)
+                    label = f"ivf/np{nprobe}"
+                p50, p99, found = latencies_ms(index, queries, args.k)
+                recall = recall_at_k(found, truth, args.k)
+                print(f"{n:>9} {label:<10} {build_s:>9.2f} {mem_mb:>9.1f} {p50:>8.3f} {p99:>8.3f} {recall:>7.3f}")
+        del data, corpus
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# backend/benchmarks/answer_benchmark.py
+"""
+Matrix / eigen answer verification: the previous SymPy-only verify_matrix vs
+the NumPy fast path (with SymPy fallback for symbolic entries).
+
+Generates a seeded corpus of linear-algebra answers (matrices in several
+notations, eigenvalue lists, eigenvectors up to scale, symbolic matrices),
+half correct and half wrong, and reports accuracy against the labels plus
+per-answer latency for each category.
+
+Run from the agentic-tutor/ directory:
+    python -m backend.benchmarks.answer_benchmark --n 400
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+from sympy import Matrix, sympify
+
+from backend.app.core.tools.sympy_tool import SymPyVerifier
+
+
+def legacy_verify_matrix(student_str: str, expected_str: str, mode: str = "elementwise") -> dict:
+    """verify_matrix before the NumPy path (mode is ignored: it only knew elementwise)."""
+    try:
+        s_matrix = Matrix(sympify(student_str.replace("\n", ",")))
+        e_matrix = Matrix(sympify(expected_str.replace("\n", ",")))
+        return {"correct": bool(s_matrix.equals(e_matrix))}
+    except Exception:
+        return {"correct": False}
+
+
+def _fmt(x) -> str:
+    x = float(x)
+    return str(int(x)) if x.is_integer() else f"{x:.6g}"
+
+
+def _matrix_text(m: np.ndarray, style: int) -> str:
+    rows = [[_fmt(v) for v in row] for row in m]
+    if style == 0:
+        return "[" + ", ".join("[" + ", ".join(r) + "]" for r in rows) + "]"
+    if style == 1:
+        return "Matrix([" + ", ".join("[" + ", ".join(r) + "]" for r in rows) + "])"
+    return "; ".join(" ".join(r) for r in rows)
+
+
+def matrix_case(rng: random.Random, correct: bool):
+    n = rng.randint(2, 4)
+    m = np.array([[rng.randint(-9, 9) for _ in range(n)] for _ in range(n)], dtype=float)
+    if rng.random() < 0.3:
+        m = m / 4  # decimal entries
+    student = m.copy()
+    if not correct:
+        i, j = rng.randrange(n), rng.randrange(n)
+        student[i, j] += rng.choice([-1, 1]) * rng.choice([1, 0.5, 0.25])
+    return _matrix_text(student, rng.randrange(3)), _matrix_text(m, 0), "elementwise"
+
+
+def eigenvalue_case(rng: random.Random, correct: bool):
+    values = [rng.randint(-6, 6) for _ in range(rng.randint(2, 4))]
+    counts = {}
+    for v in values:
+        counts[v] = counts.get(v, 0) + 1
+    expected = "eigenvals(): {" + ", ".join(f"{v}:{c}" for v, c in counts.items()) + "}"
+    student = values[:]
+    rng.shuffle(student)
+    if not correct:
+        student[rng.randrange(len(student))] += rng.choice([-1, 1])
+    text = ", ".join(str(v) for v in student)
+    return (f"{{{text}}}" if rng.random() < 0.5 else text), expected, "multiset"
+
+
+def _spans_same_lines(rows: np.ndarray, vectors: list) -> bool:
+    """Every row is parallel to a distinct expected vector (rank test, independent of the verifier)."""
+    remaining = [np.array(v, dtype=float) for v in vectors]
+    for row in rows:
+        hit = next((i for i, v in enumerate(remaining) if np.linalg.matrix_rank(np.array([row, v])) == 1), None)
+        if hit is None:
+            return False
+        remaining.pop(hit)
+    return not remaining
+
+
+def eigenvector_case(rng: random.Random, correct: bool):
+    n = rng.randint(2, 3)
+    vectors = []
+    while len(vectors) < n:
+        v = [rng.randint(-3, 3) for _ in range(n)]
+        if any(v) and np.linalg.matrix_rank(np.array(vectors + [v])) == len(vectors) + 1:
+            vectors.append(v)
+    expected = "eigenvects(): [" + ", ".join(
+        f"({k + 1}, 1, [[{', '.join(map(str, v))}]])" for k, v in enumerate(vectors)
+    ) + "]"
+    while True:
+        student = [list(np.array(v) * rng.choice([1, -1, 2, 0.5, -3])) for v in vectors]
+        rng.shuffle(student)
+        if not correct:
+            row = student[rng.randrange(n)]
+            row[rng.randrange(n)] += rng.choice([-1, 1])
+        student_m = np.array(student, dtype=float)
+        # a wrong answer must not match under either orientation
+        if correct or not (_spans_same_lines(student_m, vectors) or _spans_same_lines(student_m.T, vectors)):
+            break
+    if rng.random() < 0.5:
+        student_m = student_m.T  # eigenvectors as columns
+    return _matrix_text(student_m, 0), expected, "scale"
+
+
+def symbolic_case(rng: random.Random, correct: bool):
+    names = ["a", "b", "c", "sqrt(2)", "t"]
+    n = 2
+    expected = [[f"{rng.randint(1, 5)}*{rng.choice(names)}" for _ in range(n)] for _ in range(n)]
+    # the same entries written another way: "3*a" -> "a*3"
+    student = [[f"{e.split('*', 1)[1]}*{e.split('*', 1)[0]}" for e in row] for row in expected]
+    if not correct:
+        student[0][0] = student[0][0] + " + 1"
+    text = lambda m: "[" + ", ".join("[" + ", ".join(r) + "]" for r in m) + "]"
+    return text(student), text(expected), "elementwise"
+
+
+CATEGORIES = {
+    "matrix": matrix_case,
+    "eigenvalues": eigenvalue_case,
+    "eigenvectors": eigenvector_case,
+    "symbolic": symbolic_case,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=400, help="answers per category")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = {
+        name: [(*make(rng, i % 2 == 0), i % 2 == 0) for i in range(args.n)]
+        for name, make in CATEGORIES.items()
+    }
+    engines = {"legacy": legacy_verify_matrix, "numpy": SymPyVerifier.verify_matrix}
+
+    header = f"{'category':<14}{'engine':<8}{'accuracy':>10}{'mean ms':>10}{'p95 ms':>10}{'numeric':>9}"
+    print(f"{args.n} answers per category (half correct)\n")
+    print(header)
+    print("-" * len(header))
+    totals = {name: 0.0 for name in engines}
+    for category, cases in corpus.items():
+        for engine, verify in engines.items():
+            hits, numeric, latencies = 0, 0, []
+            for student, expected, mode, label in cases:
+                start = time.perf_counter()
+                result = verify(student, expected, mode)
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += result["correct"] == label
+                numeric += result.get("tier") == "numeric"
+            latencies.sort()
+            totals[engine] += sum(latencies)
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            print(
+                f"{category:<14}{engine:<8}{hits / len(cases):>10.3f}{statistics.mean(latencies):>10.3f}"
+                f"{p95:>10.3f}{numeric / len(cases):>9.2f}"
+            )
+    print()
+    for engine, ms in totals.items():
+        print(f"{engine:<8} total {ms / 1000:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# backend/benchmarks/cascade_benchmark.py
+"""
+Grading cascade on a labelled answer set: which tier resolves each answer,
+how accurate each tier is against the labels, and its latency.
+
+By default only the cheap tiers run (exact match, SymPy, MiniLM similarity)
+in the order EvaluatorAgent._grade_uncached uses, in-process rather than in
+the sandbox pool; answers none of them is confident about are reported as
+needing a provider call. With --llm the full cascade runs through
+EvaluatorAgent (GROQ_API_KEY required), so the LLM tiers are measured too.
+
+An answer counts as graded correct when it gets at least half the marks.
+
+Run from the agentic-tutor/ directory:
+    python -m backend.benchmarks.cascade_benchmark [--llm]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+
+from backend.app.core.grading_cascade import (
+    CASCADE_CONFIDENCE, TIERS, embedding_tier, exact_tier, resolved, symbolic_verdict,
+)
+from backend.app.core.tools.answer_compare import answer_mode
+from backend.app.core.tools.sympy_tool import SymPyVerifier
+
+LABELS_PATH = Path(__file__).parent / "data" / "grading_labels.json"
+
+
+def symbolic_check(q: dict, answer: str):
+    """SymPyVerifier result for symbolically gradable questions (the sandbox's job in the agent), else None."""
+    expected = q.get("expected_solution", "")
+    if q.get("type", "conceptual") not in ("procedural", "application") or not expected:
+        return None
+    mode = answer_mode(q, expected)
+    if "[[" in expected or "matrix" in expected.lower() or mode != "elementwise":
+        return SymPyVerifier.verify_matrix(answer, expected, mode)
+    return SymPyVerifier.verify_equality(answer, expected)
+
+
+def cheap_cascade(q: dict, answer: str) -> dict:
+    full = q.get("rubric", {}).get("full_marks", 10)
+    tier_ms = {}
+    verdicts = []
+
+    def symbolic():
+        result = symbolic_check(q, answer)
+        return symbolic_verdict(result, full) if result is not None else None
+
+    def embedding():
+        # prose answers only, as in the agent
+        return embedding_tier(q, answer) if symbolic_check(q, "") is None else None
+
+    for tier, step in (("exact", lambda: exact_tier(q, answer)), ("symbolic", symbolic), ("embedding", embedding)):
+        t = time.perf_counter()
+        try:
+            v = step()
+        except Exception:
+            v = None  # e.g. sentence-transformers not installed: escalate
+        if v is None:
+            continue
+        tier_ms[tier] = (time.perf_counter() - t) * 1000
+        verdicts.append(v)
+        if resolved(v):
+            return {**v, "tier_ms": tier_ms}
+    best = max(reversed(verdicts), key=lambda v: v["confidence"])
+    return {**best, "tier": "provider", "tier_ms": tier_ms}
+
+
+async def full_cascade(agent, q: dict, answer: str) -> dict:
+    result = await agent._grade_uncached(q, answer)
+    tier_ms = {k[:-3]: v for k, v in result["timings"].items() if k != "total_ms"}
+    return {"tier": result["tier"], "marks": result["marks"], "confidence": result["confidence"], "tier_ms": tier_ms}
+
+
+async def run(args):
+    data = json.loads(args.labels.read_text(encoding="utf-8"))
+    agent = None
+    if args.llm:
+        from backend.app.agents.evaluator_agent import EvaluatorAgent
+        agent = EvaluatorAgent()
+
+    rows = []
+    for item in data["questions"]:
+        q = item["question"]
+        full = q.get("rubric", {}).get("full_marks", 10)
+        for a in item["answers"]:
+            if agent:
+                r = await full_cascade(agent, q, a["text"])
+            else:
+                r = await asyncio.to_thread(cheap_cascade, q, a["text"])
+            rows.append({**r, "ok": (r["marks"] >= full / 2) == a["correct"]})
+
+    tiers = list(TIERS) + ([] if agent else ["provider"])
+    header = f"{'tier':<12}{'resolved':>10}{'share':>8}{'accuracy':>10}{'avg ms':>10}{'p95 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for tier in tiers:
+        hits = [r for r in rows if r["tier"] == tier]
+        ran = [r["tier_ms"][tier] for r in rows if tier in r["tier_ms"]]
+        accuracy = f"{sum(r['ok'] for r in hits) / len(hits):.3f}" if hits and tier != "provider" else "-"
+        p95 = f"{sorted(ran)[int(0.95 * (len(ran) - 1))]:.2f}" if ran else "-"
+        avg = f"{statistics.mean(ran):.2f}" if ran else "-"
+        print(f"{tier:<12}{len(hits):>10}{len(hits) / len(rows):>8.1%}{accuracy:>10}{avg:>10}{p95:>10}")
+
+    llm_tiers = ("llm_small", "llm_large") if agent else ("provider",)
+    local = [r for r in rows if r["tier"] not in llm_tiers]
+    print(f"\n{len(rows)} answers, confidence threshold {CASCADE_CONFIDENCE}")
+    print(f"resolved without a provider call: {len(local)}/{len(rows)} ({len(local) / len(rows):.1%}), "
+          f"accuracy {sum(r['ok'] for r in local) / max(len(local), 1):.3f}")
+    if agent:
+        print(f"overall accuracy: {sum(r['ok'] for r in rows) / len(rows):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--labels", type=Path, default=LABELS_PATH)
+    parser.add_argument("--llm", action="store_true", help="run the full cascade, LLM tiers included")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
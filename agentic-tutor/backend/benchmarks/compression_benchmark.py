@@ -0,0 +1,76 @@
+# backend/benchmarks/compression_benchmark.py
+"""
+Memory vs recall for compressed vector storage (float16, IVF-PQ, OPQ).
+
+Reports per-worker index memory extrapolated to 1M chunks and recall@k
+against exact Flat search, both from the compressed codes alone and after
+exact re-scoring of the top k*factor candidates from the float32 memmap.
+
+Run from the agentic-tutor/ directory:
+    python -m backend.benchmarks.compression_benchmark --n 200000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.app.core.rag.ann_index import (
+    RESCORE_FACTOR, VectorFile, build_index, index_memory_bytes, index_type_of, search_with_rescore,
+)
+from backend.benchmarks.ann_benchmark import recall_at_k, synthetic_corpus
+
+TYPES = ("flat", "flat16", "ivfpq", "opq")
+
+
+def run_queries(index, vectors, queries, k, factor):
+    found, times = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, idx = search_with_rescore(index, vectors, q, k, factor=factor)
+        times.append((time.perf_counter() - start) * 1000)
+        found.append(idx)
+    return np.array(found), float(np.percentile(times, 50))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressed vector storage benchmark")
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--factor", type=int, default=max(RESCORE_FACTOR, 2))
+    args = parser.parse_args()
+
+    data = synthetic_corpus(args.n + args.queries)
+    corpus, queries = data[:args.n], data[args.n:]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vector_file = VectorFile(Path(tmp) / "vectors.f32", corpus.shape[1])
+        vector_file.write(corpus)
+        memmap = vector_file.open()
+
+        flat = build_index("flat", corpus)
+        _, truth = flat.search(queries, args.k)
+
+        # bytes per vector == MB per million chunks
+        header = (f"{'index':<8} {'MB/1M':>8} {'R@' + str(args.k):>7} "
+                  f"{'R@k rescored':>13} {'p50 ms':>8} {'p50 rescored':>13}")
+        print(f"N={args.n}, dim={corpus.shape[1]}, rescore factor={args.factor}\n")
+        print(header)
+        print("-" * len(header))
+        for index_type in TYPES:
+            index = flat if index_type == "flat" else build_index(index_type, corpus)
+            if index_type_of(index) != index_type:
+                print(f"{index_type:<8} skipped (corpus too small to train)")
+                continue
+            per_vec = index_memory_bytes(index) / args.n
+            found, p50 = run_queries(index, None, queries, args.k, factor=1)
+            found_rs, p50_rs = run_queries(index, memmap, queries, args.k, factor=args.factor)
+            print(f"{index_type:<8} {per_vec:>8.1f} {recall_at_k(found, truth, args.k):>7.3f} "
+                  f"{recall_at_k(found_rs, truth, args.k):>13.3f} {p50:>8.3f} {p50_rs:>13.3f}")
+        del memmap
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# backend/benchmarks/retrieval_benchmark.py
+"""
+Labelled retrieval benchmark: dense-only (current path) vs BM25 vs hybrid RRF.
+
+Run from the agentic-tutor/ directory:
+    python -m backend.benchmarks.retrieval_benchmark [--k 1 3 5]
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from backend.app.core.rag.bm25_index import reciprocal_rank_fusion
+from backend.app.core.rag.chunk_store import ChunkStore
+from backend.app.core.rag.vector_store import HYBRID_CANDIDATES, RRF_K
+
+LABELS_PATH = Path(__file__).parent / "data" / "retrieval_labels.json"
+
+
+def recall_at_k(ranked: list, relevant: list, k: int) -> float:
+    return len(set(ranked[:k]) & set(relevant)) / len(relevant)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--labels", type=Path, default=LABELS_PATH)
+    args = parser.parse_args()
+
+    data = json.loads(args.labels.read_text(encoding="utf-8"))
+    corpus, queries = data["corpus"], data["queries"]
+    ids = [c["id"] for c in corpus]
+
+    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    vectors = np.array(embeddings.embed_documents([c["text"] for c in corpus]), dtype="float32")
+    dense = faiss.IndexFlatL2(vectors.shape[1])
+    dense.add(vectors)
+
+    tmp = tempfile.TemporaryDirectory()
+    chunks = ChunkStore(Path(tmp.name) / "chunks.db")
+    chunks.add(0, [c["text"] for c in corpus])
+
+    def dense_rank(q):
+        vec = np.array([embeddings.embed_query(q)], dtype="float32")
+        _, idx = dense.search(vec, min(HYBRID_CANDIDATES, len(ids)))
+        return [ids[i] for i in idx[0] if i != -1]
+
+    def bm25_rank(q):
+        return [ids[i] for i in chunks.search_text(q, HYBRID_CANDIDATES)]
+
+    def hybrid_rank(q):
+        return reciprocal_rank_fusion([dense_rank(q), bm25_rank(q)], k=RRF_K)
+
+    methods = {"dense": dense_rank, "bm25": bm25_rank, "hybrid": hybrid_rank}
+    header = f"{'method':<8}" + "".join(f"{'R@' + str(k):>8}" for k in args.k) + f"{'p50 ms':>10}{'p95 ms':>10}"
+    print(f"{len(corpus)} chunks, {len(queries)} labelled queries\n")
+    print(header)
+    print("-" * len(header))
+    for name, rank in methods.items():
+        recalls = {k: [] for k in args.k}
+        latencies = []
+        for item in queries:
+            start = time.perf_counter()
+            ranked = rank(item["query"])
+            latencies.append((time.perf_counter() - start) * 1000)
+            for k in args.k:
+                recalls[k].append(recall_at_k(ranked, item["relevant"], k))
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        row = f"{name:<8}" + "".join(f"{statistics.mean(recalls[k]):>8.3f}" for k in args.k)
+        print(row + f"{statistics.median(latencies):>10.2f}{p95:>10.2f}")
+
+    chunks.close()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
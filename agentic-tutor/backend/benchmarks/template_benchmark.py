@@ -0,0 +1,54 @@
+# backend/benchmarks/template_benchmark.py
+"""
+Throughput of the procedural question templates, per curriculum topic.
+
+Each generated item is already checked against an independent NumPy answer;
+with --grade the expected solution is also graded against itself through
+SymPyVerifier (the grader's own path), so an item that would be ungradable
+shows up as a failure.
+
+Run from the agentic-tutor/ directory:
+    python -m backend.benchmarks.template_benchmark --n 500 --grade
+"""
+import argparse
+import time
+
+from backend.app.core.tools.answer_compare import answer_mode
+from backend.app.core.tools.question_templates import TEMPLATES, generate_procedural
+from backend.app.core.tools.sympy_tool import SymPyVerifier
+
+
+def self_grade(q: dict) -> bool:
+    expected = q["expected_solution"]
+    mode = answer_mode(q, expected)
+    if "[" in expected or "matrix" in expected.lower() or mode != "elementwise":
+        return SymPyVerifier.verify_matrix(expected, expected, mode)["correct"]
+    return SymPyVerifier.verify_equality(expected, expected)["correct"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=500, help="items per topic")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--grade", action="store_true", help="also grade every expected solution against itself")
+    args = parser.parse_args()
+
+    header = f"{'topic':<24}{'items':>7}{'items/s':>10}" + (f"{'self-graded':>13}" if args.grade else "")
+    print(header)
+    print("-" * len(header))
+    total_items, total_s = 0, 0.0
+    for topic in TEMPLATES:
+        start = time.perf_counter()
+        questions = generate_procedural(topic, args.n, seed=args.seed)
+        elapsed = time.perf_counter() - start
+        total_items += len(questions)
+        total_s += elapsed
+        line = f"{topic:<24}{len(questions):>7}{len(questions) / elapsed:>10.0f}"
+        if args.grade:
+            line += f"{sum(self_grade(q) for q in questions) / len(questions):>13.3f}"
+        print(line)
+    print(f"\nall topics: {total_items} items in {total_s:.2f}s ({total_items / total_s:.0f} items/s, 0 LLM calls)")
+
+
+if __name__ == "__main__":
+    main()
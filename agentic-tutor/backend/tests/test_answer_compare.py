@@ -0,0 +1,92 @@
+# backend/tests/test_answer_compare.py
+import pytest
+
+from backend.app.core.tools.answer_compare import (
+    ROUNDING_RTOL, answer_mode, compare_items, compare_numeric, parse_answer, parse_number,
+)
+from backend.app.core.tools.sympy_tool import SymPyVerifier
+
+
+def parsed(text):
+    data = parse_answer(text)
+    assert data is not None, text
+    return data
+
+
+@pytest.mark.parametrize("token, value", [
+    ("3", 3), ("-0.5", -0.5), ("1/3", 1 / 3), ("1e-3", 1e-3),
+    ("2+3i", 2 + 3j), ("2+3*I", 2 + 3j), ("3*j", 3j),
+    ("2*3", None), ("x", None), ("sqrt(2)", None),
+])
+def test_parse_number(token, value):
+    assert parse_number(token) == value
+
+
+def test_product_entries_are_evaluated_not_concatenated():
+    assert SymPyVerifier.verify_matrix("[[2*3, 0], [0, 1]]", "[[6, 0], [0, 1]]")["correct"]
+    assert not SymPyVerifier.verify_matrix("[[2*3, 0], [0, 1]]", "[[23, 0], [0, 1]]")["correct"]
+    assert SymPyVerifier.canonical_form("[2*3, 1]") != SymPyVerifier.canonical_form("[23, 1]")
+
+
+@pytest.mark.parametrize("student, expected, mode, ok", [
+    # elementwise: order and shape matter
+    ("[[1, 2], [3, 4]]", "[[1, 2], [3, 4]]", "elementwise", True),
+    ("[[1.0, 2.0], [3.0, 4.0]]", "Matrix([[1, 2], [3, 4]])", "elementwise", True),
+    ("1 2; 3 4", "[[1, 2], [3, 4]]", "elementwise", True),
+    ("[[2, 1], [3, 4]]", "[[1, 2], [3, 4]]", "elementwise", False),
+    ("[1, 2, 3, 4]", "[[1, 2], [3, 4]]", "elementwise", False),
+    # set: order and repeats ignored
+    ("[3, 1]", "[1, 3]", "set", True),
+    ("[1, 3, 3]", "[3, 1]", "set", True),
+    ("[1, 2]", "[1, 3]", "set", False),
+    # multiset: order ignored, multiplicities count
+    ("[2, 1, 2]", "[2, 2, 1]", "multiset", True),
+    ("[1, 2]", "[2, 2, 1]", "multiset", False),
+    ("[1, 1, 2]", "[2, 2, 1]", "multiset", False),
+    ("eigenvals: {2: 2, 1: 1}", "[1, 2, 2]", "multiset", True),
+    # scale: any nonzero multiple of each vector, in any order
+    ("[2, 2]", "[1, 1]", "scale", True),
+    ("[-3, -3]", "[1, 1]", "scale", True),
+    ("[1, -1]", "[1, 1]", "scale", False),
+    ("[0, 0]", "[1, 1]", "scale", False),
+    ("[[-1, 1], [2, 2]]", "[[1, 1], [1, -1]]", "scale", True),
+    ("[[1, 2], [1, -2]]", "[[1, 1], [1, -1]]", "scale", True),  # vectors as columns
+    ("[[1, 1], [1, 1]]", "[[1, 1], [1, -1]]", "scale", False),
+    ("eigenvects: [(3, 1, [[2, 2]]), (1, 1, [[-1, 1]])]", "[[1, 1], [1, -1]]", "scale", True),
+])
+def test_compare_numeric_modes(student, expected, mode, ok):
+    assert compare_numeric(parsed(student), parsed(expected), mode) is ok
+
+
+def test_rounding_tolerance_is_opt_in():
+    assert not compare_numeric(parsed("[0.707, 0.707]"), parsed("[0.70710678, 0.70710678]"))
+    assert compare_numeric(parsed("[0.707, 0.707]"), parsed("[0.70710678, 0.70710678]"), rtol=ROUNDING_RTOL)
+    assert compare_numeric(parsed("[3.0, 1.0]"), parsed("[1, 3]"), "set", rtol=ROUNDING_RTOL)
+    assert not compare_numeric(parsed("[0.5, 0.5]"), parsed("[0.70710678, 0.70710678]"), rtol=ROUNDING_RTOL)
+
+
+def test_compare_items_matches_numeric_semantics():
+    data = lambda text: parse_answer(text, parse_scalar=float)
+
+    def equal(a, b):
+        return abs(a - b) < 1e-9
+
+    def is_zero(a):
+        return abs(a) < 1e-9
+
+    assert compare_items(data("[3, 1, 1]"), data("[1, 3]"), "set", equal, is_zero)
+    assert not compare_items(data("[3, 1, 1]"), data("[1, 3]"), "multiset", equal, is_zero)
+    assert compare_items(data("[[2, 2], [1, -1]]"), data("[[1, -1], [1, 1]]"), "scale", equal, is_zero)
+    assert not compare_items(data("[[2, 3], [1, -1]]"), data("[[1, -1], [1, 1]]"), "scale", equal, is_zero)
+
+
+@pytest.mark.parametrize("question, mode", [
+    ({"prompt": "Find the eigenvalues of A."}, "multiset"),
+    ({"prompt": "List the distinct eigenvalues of A."}, "set"),
+    ({"prompt": "Find an eigenvector of A for eigenvalue 3."}, "scale"),
+    ({"prompt": "Compute A + B."}, "elementwise"),
+    ({"prompt": "Compute A + B.", "answer_mode": "set"}, "set"),
+    ({"prompt": "Diagonalize A.", "expected_solution": "eigenvals: {1: 1, 3: 1}"}, "multiset"),
+])
+def test_answer_mode(question, mode):
+    assert answer_mode(question) == mode
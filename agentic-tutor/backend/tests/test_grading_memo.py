@@ -0,0 +1,151 @@
+# backend/tests/test_grading_memo.py
+import asyncio
+
+import pytest
+
+from backend.app.core.grading_memo import GradingMemo, normalize_answer
+
+
+@pytest.fixture
+def memo():
+    GradingMemo._instance = None
+    yield GradingMemo()
+    GradingMemo._instance = None
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("λ = 3 , 1", "lambda=3,1"),
+    ("  x ^ 2 ", "x**2"),
+    ("  X ^ 2 ", "X**2"),
+    ("$\\frac{1}{2}$", "(1)/(2)"),
+    ("\\dfrac{\\frac{1}{2}}{3}", "((1)/(2))/(3)"),
+    ("2 \\cdot 3", "2*3"),
+    ("3 × 4", "3*4"),
+    ("−5.", "-5"),
+    ("\\sqrt{2}", "sqrt(2)"),
+    ("\\left[ 1, 2 \\right]", "[1,2]"),
+    ("[1  2\t3]", "[1 2 3]"),
+    ("1 2; 3 4", "1 2;3 4"),
+    ("5 .", "5"),
+    ("", ""),
+    (None, ""),
+])
+def test_normalize_answer(raw, expected):
+    assert normalize_answer(raw) == expected
+
+
+@pytest.mark.parametrize("a, b", [
+    ("[1 2 3]", "[123]"),
+    ("1 2; 3 4", "12;34"),
+    ("x y", "xy"),
+    ("X**2", "x**2"),
+])
+def test_distinct_answers_keep_distinct_keys(a, b):
+    assert normalize_answer(a) != normalize_answer(b)
+
+
+def test_cached_result_is_a_hit(memo):
+    calls = []
+
+    async def grade():
+        calls.append(1)
+        return {"score": 10}
+
+    async def run():
+        first = await memo.get_or_grade("q", ["5"], grade)
+        second = await memo.get_or_grade("q", ["5"], grade)
+        return first, second
+
+    (first, hit1), (second, hit2) = asyncio.run(run())
+    assert first == second == {"score": 10}
+    assert (hit1, hit2) == (False, True)
+    assert len(calls) == 1
+
+
+def test_inflight_forms_are_aliased(memo):
+    """A waiter's other spellings join the grading in progress, so a later arrival spelled like it waits too."""
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def grade():
+            calls.append(1)
+            await release.wait()
+            return {"score": 10}
+
+        first = asyncio.create_task(memo.get_or_grade("q", ["x**2"], grade))
+        await asyncio.sleep(0)
+        # same canonical form, different normalized text: waits and aliases "x*x"
+        second = asyncio.create_task(memo.get_or_grade("q", ["x*x", "x**2"], grade))
+        await asyncio.sleep(0)
+        # matches only the alias
+        third = asyncio.create_task(memo.get_or_grade("q", ["x*x"], grade))
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(first, second, third)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert [hit for _, hit in results] == [False, True, True]
+    assert memo.counts["coalesced"] == 2
+    assert not memo._inflight
+
+
+def test_non_cacheable_result_is_regraded(memo):
+    results = iter([{"score": 0, "cacheable": False}, {"score": 10}, {"score": 0}])
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def grade():
+            calls.append(1)
+            if len(calls) == 1:
+                await release.wait()
+            return next(results)
+
+        first = asyncio.create_task(memo.get_or_grade("q", ["5"], grade))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(memo.get_or_grade("q", ["5"], grade))
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(first, waiter), await memo.get_or_grade("q", ["5"], grade)
+
+    (first, waiter), later = asyncio.run(run())
+    # the waiter saw a transient failure and graded for itself; that grade is kept
+    assert first == ({"score": 0, "cacheable": False}, False)
+    assert waiter == ({"score": 10}, False)
+    assert later == ({"score": 10}, True)
+    assert len(calls) == 2
+
+
+def test_failed_grading_releases_waiters(memo):
+    async def run():
+        release = asyncio.Event()
+
+        async def boom():
+            await release.wait()
+            raise RuntimeError("llm down")
+
+        async def grade():
+            return {"score": 7}
+
+        first = asyncio.create_task(memo.get_or_grade("q", ["5"], boom))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(memo.get_or_grade("q", ["5"], grade))
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(first, waiter, return_exceptions=True)
+
+    first, waiter = asyncio.run(run())
+    assert isinstance(first, RuntimeError)
+    assert waiter == ({"score": 7}, False)
+
+
+def test_invalidate_drops_question(memo):
+    memo.put("q1", ["5", "5.0"], {"score": 10})
+    memo.put("q2", ["5"], {"score": 0})
+    assert memo.invalidate("q1") == 2
+    assert memo.get("q1", ["5"]) is None
+    assert memo.get("q2", ["5"]) == {"score": 0}
@@ -0,0 +1,72 @@
+# backend/tests/test_rolling_stats.py
+import math
+import statistics
+
+import pytest
+
+from backend.app.database import rolling_stats
+from backend.app.database.models import TopicStats
+
+
+def fold(scores, mastery_threshold=0.8):
+    stats = TopicStats(student_id="s1", topic="eigen")
+    for score in scores:
+        rolling_stats.update(stats, score, mastery_threshold)
+    return stats
+
+
+def test_first_score_seeds_the_averages():
+    stats = fold([0.6])
+    assert stats.count == 1
+    assert stats.ewma_mean == stats.mean == stats.last_score == 0.6
+    assert stats.ewma_var == stats.m2 == 0.0
+
+
+def test_welford_matches_batch_statistics():
+    scores = [0.2, 0.9, 0.4, 1.0, 0.55, 0.7, 0.05, 0.8]
+    stats = fold(scores)
+    assert stats.count == len(scores)
+    assert stats.mean == pytest.approx(statistics.fmean(scores))
+    assert stats.m2 / stats.count == pytest.approx(statistics.pvariance(scores))
+
+
+def test_ewma_matches_the_recursive_definition():
+    scores = [0.3, 0.9, 0.6, 0.1, 0.8]
+    alpha = rolling_stats.ROLLING_ALPHA
+    mean, var = scores[0], 0.0
+    for x in scores[1:]:
+        diff = x - mean
+        mean = mean + alpha * diff
+        var = (1 - alpha) * (var + alpha * diff * diff)
+    stats = fold(scores)
+    assert stats.ewma_mean == pytest.approx(mean)
+    assert stats.ewma_var == pytest.approx(var)
+
+
+def test_ewma_follows_a_shift_faster_than_the_mean():
+    stats = fold([0.2] * 10 + [0.9] * 3)
+    assert stats.ewma_mean > stats.mean
+    assert stats.ewma_mean == pytest.approx(0.9 - 0.7 * (1 - rolling_stats.ROLLING_ALPHA) ** 3)
+
+
+def test_constant_scores_have_no_spread():
+    stats = fold([0.7] * 6)
+    assert stats.ewma_mean == pytest.approx(0.7)
+    assert math.isclose(stats.ewma_var, 0.0, abs_tol=1e-12)
+    assert math.isclose(stats.m2, 0.0, abs_tol=1e-12)
+
+
+def test_streak_counts_consecutive_mastery():
+    stats = fold([0.9, 0.85, 0.5, 0.8, 0.95], mastery_threshold=0.8)
+    assert stats.streak == 2
+    rolling_stats.update(stats, 0.79, 0.8)
+    assert stats.streak == 0
+    assert stats.last_score == 0.79
+
+
+def test_as_dict_reports_population_std():
+    stats = fold([0.0, 1.0])
+    out = rolling_stats.as_dict(stats)
+    assert out["count"] == 2
+    assert out["mean"] == 0.5
+    assert out["std"] == 0.5